@@ -0,0 +1,309 @@
+# Importing **dependencies** and **modules**
+import zipfile
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from app.cache import normalizeRequest, renderKey
+from app.clash import electiveClashes
+from app.config import BATCH_WORKERS, RENDERER
+from app.dataset import getDataset, reloadDataset, createTimetable, apply2DTransform
+from app.dataset import filesChanged
+from app.dataset import timetableDependencies
+from app.metrics import timed
+from app.renderer import TimeTableCreator, renderPDF, tableStream, assembleNativePDF
+from app.renderer import mergePDFs
+
+# The **REQUEST_FIELDS** are the fields describing a single timetable, in the order expected by
+# ```TimeTableCreator```.
+REQUEST_FIELDS = [
+    "_branch",
+    "_section",
+    "_e1_code",
+    "_e1_teacher",
+    "_e2_code",
+    "_e2_teacher",
+]
+
+# The **pool** of worker processes is only started on the first batch request.
+pool = None
+
+
+def getPool():
+    """
+    ```getPool() -> ProcessPoolExecutor``` <br/>
+    Returns the process pool used to render batches, starting it on first use.
+    """
+    global pool
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+    return pool
+
+
+def parseBatch(body, meta_data):
+    """
+    ```parseBatch(body: dict, meta_data: dict) -> list``` <br/>
+    Turns the JSON body of a batch request into a list of normalized timetable requests (tuples of
+    ```REQUEST_FIELDS```, see ```normalizeRequest```).
+    The body either lists the timetables under ```requests``` or asks for every section of ```_branch``` with
+    the given electives. Raises a ValueError describing the problem when the body is invalid.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("expected a JSON object")
+
+    if "requests" in body:
+        if not isinstance(body["requests"], list):
+            raise ValueError("requests must be a list")
+        requests = []
+        for position, request in enumerate(body["requests"]):
+            if not isinstance(request, dict) or any(
+                field not in request for field in REQUEST_FIELDS
+            ):
+                raise ValueError(
+                    "request %d must have the fields %s"
+                    % (position, ", ".join(REQUEST_FIELDS))
+                )
+            try:
+                requests.append(
+                    normalizeRequest(*(request[field] for field in REQUEST_FIELDS))
+                )
+            except ValueError as error:
+                raise ValueError("request %d : %s" % (position, error))
+        return requests
+
+    missing = [field for field in REQUEST_FIELDS if field not in body]
+    if missing != ["_section"]:
+        raise ValueError(
+            "expected either requests or the fields %s"
+            % ", ".join(field for field in REQUEST_FIELDS if field != "_section")
+        )
+    branch = str(body["_branch"]).strip().upper()
+    if branch not in meta_data["branch_noOfSections"]:
+        raise ValueError("unknown branch %s" % branch)
+    return [
+        normalizeRequest(
+            branch,
+            section,
+            body["_e1_code"],
+            body["_e1_teacher"],
+            body["_e2_code"],
+            body["_e2_teacher"],
+        )
+        for section in range(1, meta_data["branch_noOfSections"][branch] + 1)
+    ]
+
+
+def workerDataset(version):
+    """
+    ```workerDataset(version: str) -> dict``` <br/>
+    Returns the dataset of a worker process, reloading it first when the server has moved on to a newer
+    ```version``` since the worker was started (only when the files changed since the worker last loaded them).
+    Raises a RuntimeError when the worker cannot get that exact ```version``` : the files on disk hold another
+    one, and rendering from them would cache timetables under the keys of data they were not built from.
+    """
+    if getDataset()["version"] != version and filesChanged():
+        reloadDataset()
+    dataset = getDataset()
+    if dataset["version"] != version:
+        raise RuntimeError(
+            "the dataset %s is no longer on disk (the files hold %s), try again"
+            % (version[:12], dataset["version"][:12])
+        )
+    return dataset
+
+
+def clashError(request, clashes):
+    """
+    ```clashError(request: tuple, clashes: list) -> str``` <br/>
+    Returns the error message of a request whose electives meet in the same slots.
+    """
+    return "%s : the electives clash on %s" % (
+        " ".join(request),
+        ", ".join("%s %s" % clash for clash in clashes),
+    )
+
+
+def renderTimetable(request, version):
+    """
+    ```renderTimetable(request: tuple, version: str) -> (str, bytes, str)``` <br/>
+    Renders a single timetable inside a worker process. Returns the name of the pdf and its contents, or the
+    error message when the timetable could not be created (so one bad request does not fail the batch).
+    """
+    try:
+        dataset = workerDataset(version)
+        clashes = electiveClashes(dataset, renderKey(dataset, *request)[-6:])
+        if clashes:
+            return None, None, clashError(request, clashes)
+        pdfName, pdfBytes = TimeTableCreator(*request, dataset)
+    except Exception as error:
+        return None, None, "%s : %r" % (" ".join(request), error)
+    return pdfName, pdfBytes, None
+
+
+def buildTable(request, dataset):
+    """
+    ```buildTable(request: tuple, dataset: dict) -> (list, str)``` <br/>
+    Builds the 2D table of a timetable request (see ```apply2DTransform```). Returns it, or the error message
+    when the timetable could not be created.
+    """
+    _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher = request
+    clashes = electiveClashes(dataset, renderKey(dataset, *request)[-6:])
+    if clashes:
+        return None, clashError(request, clashes)
+    try:
+        _, result = createTimetable(
+            _branch,
+            _section,
+            (_e1_code, _e1_teacher),
+            (_e2_code, _e2_teacher),
+            dataset,
+        )
+    except Exception as error:
+        return None, "%s : %r" % (" ".join(request), error)
+    return apply2DTransform(result), None
+
+
+def renderPages(requests, version):
+    """
+    ```renderPages(requests: list, version: str) -> (object, list)``` <br/>
+    Draws the pages of some timetables inside a worker process. Returns them along with the error messages of
+    the timetables which could not be created : the native renderer returns the pages drawn by ```tableStream```,
+    and the matplotlib one a pdf of these pages (None when there are none). Every timetable fails when the worker
+    cannot get the dataset ```version``` (see ```workerDataset```).
+    """
+    try:
+        dataset = workerDataset(version)
+    except RuntimeError as error:
+        return None, ["%s : %s" % (" ".join(request), error) for request in requests]
+    tables, errors = [], []
+    for request in requests:
+        table, error = buildTable(request, dataset)
+        if error is not None:
+            errors.append(error)
+        else:
+            tables.append(table)
+    if RENDERER == "matplotlib":
+        return (renderPDF(tables) if tables else None), errors
+    return [tableStream(table) for table in tables], errors
+
+
+def renderBatchPDF(requests, cache, dataset):
+    """
+    ```renderBatchPDF(requests: list, cache: RenderCache, dataset: dict) -> (bytes, list)``` <br/>
+    Renders all the given timetables as the pages of a single pdf. Returns the pdf (None when no timetable could
+    be created) along with the error messages of the timetables which could not be. The pages are drawn in
+    parallel by the process pool (see ```renderPages```) and put together here, by ```assembleNativePDF``` or, for
+    the pdf drawn by matplotlib for every chunk of timetables, by ```mergePDFs```. A pdf without errors is cached under the keys of all its
+    timetables, so the same batch asked for again is not rendered twice.
+    """
+    key = ("batch",) + tuple(renderKey(dataset, *request) for request in requests)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached[1], []
+
+    size = max(1, -(-len(requests) // (4 * BATCH_WORKERS)))
+    chunks = [requests[start : start + size] for start in range(0, len(requests), size)]
+    pages, errors = [], []
+    for chunkPages, chunkErrors in getPool().map(
+        renderPages, chunks, repeat(dataset["version"])
+    ):
+        errors += chunkErrors
+        if not chunkPages:
+            continue
+        if RENDERER == "matplotlib":
+            pages.append(chunkPages)
+        else:
+            pages += chunkPages
+    if not pages:
+        return None, errors
+    with timed("pdf_write"):
+        if RENDERER == "matplotlib":
+            pdfBytes = pages[0] if len(pages) == 1 else mergePDFs(pages)
+        else:
+            pdfBytes = assembleNativePDF(pages)
+
+    if not errors:
+        # Reporting the errors needs the timetables to be built again : only complete batches are cached.
+        dependencies = set()
+        for request in requests:
+            dependencies.update(timetableDependencies(dataset, *request))
+        cache.put(key, "timetables.pdf", pdfBytes, dependencies=tuple(dependencies))
+    return pdfBytes, errors
+
+
+def renderBatch(requests, cache, dataset):
+    """
+    ```renderBatch(requests: list, cache: RenderCache, dataset: dict) -> generator``` <br/>
+    Yields ```(name, bytes, error)``` for every request, in order. Timetables already in the **cache** are served
+    from it and the others are rendered in parallel by the process pool (and then added to the cache).
+    """
+    keys = [renderKey(dataset, *request) for request in requests]
+    cached = [cache.get(key) for key in keys]
+    missing = [request for request, hit in zip(requests, cached) if hit is None]
+    rendered = getPool().map(
+        renderTimetable,
+        missing,
+        repeat(dataset["version"]),
+        chunksize=max(1, len(missing) // (4 * BATCH_WORKERS)),
+    )
+
+    for request, key, hit in zip(requests, keys, cached):
+        if hit is not None:
+            yield hit[0], hit[1], None
+            continue
+        pdfName, pdfBytes, error = next(rendered)
+        if error is None:
+            cache.put(
+                key,
+                pdfName,
+                pdfBytes,
+                dependencies=timetableDependencies(dataset, *request),
+            )
+        yield pdfName, pdfBytes, error
+
+
+class ZipStream:
+    """
+    ```ZipStream()``` <br/>
+    Write-only file object collecting what ```zipfile``` writes, so that an archive can be streamed back while
+    it is being built. It has no ```tell``` / ```seek```, which makes ```zipfile``` write it sequentially.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """
+        ```drain() -> bytes``` <br/>
+        Returns (and forgets) everything written since the last call.
+        """
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def streamZip(results):
+    """
+    ```streamZip(results: generator) -> generator``` <br/>
+    Streams a ZIP archive holding one pdf per rendered timetable, chunk by chunk. The timetables which could
+    not be created are listed in an ```errors.txt``` file at the end of the archive.
+    """
+    stream = ZipStream()
+    errors, written = [], set()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for pdfName, pdfBytes, error in results:
+            if error is not None:
+                errors.append(error)
+                continue
+            if pdfName in written:
+                continue
+            written.add(pdfName)
+            archive.writestr(pdfName, pdfBytes)
+            yield stream.drain()
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield stream.drain()
@@ -0,0 +1,461 @@
+# Importing **dependencies** and **modules**
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from app.config import RENDERER, RENDER_LOCK_TIMEOUT, CACHE_DIR_MAX_BYTES
+from app.dataset import dependencyFingerprint, timetableDependencies
+from app.metrics import CACHE_COALESCED, CACHE_EVICTIONS, CACHE_INVALIDATIONS
+from app.metrics import CACHE_DISK_EVICTIONS
+from app.metrics import CACHE_LOOKUPS, timed
+
+# The lock files coalescing renders across workers need **fcntl**, without it (Windows) identical renders are
+# only coalesced within a worker.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# The files of the cache directory end with **CACHE_SUFFIX** (whatever format they hold). Those of older versions
+# ended with **LEGACY_SUFFIX**, and are only kept until the directory is trimmed.
+CACHE_SUFFIX = ".cache"
+LEGACY_SUFFIX = ".pdfcache"
+
+# A cache directory over its cap is trimmed down to **TRIM_RATIO** of it.
+TRIM_RATIO = 0.9
+
+
+def normalizeRequest(_branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher):
+    """
+    ```normalizeRequest(_branch: str, _section: str, _e1_code: str, _e1_teacher: str, _e2_code: str, _e2_teacher: str) -> tuple``` <br/>
+    Returns the fields of a timetable request stripped and uppercased. A request is keyed (see ```renderKey```)
+    and rendered from the same normalized fields, so that ```ci``` and ```CI``` share a key and a timetable.
+    Raises a ValueError naming the fields which are missing (None or blank).
+    """
+    fields = {
+        "_branch": _branch,
+        "_section": _section,
+        "_e1_code": _e1_code,
+        "_e1_teacher": _e1_teacher,
+        "_e2_code": _e2_code,
+        "_e2_teacher": _e2_teacher,
+    }
+    request = tuple(
+        "" if value is None else str(value).strip().upper() for value in fields.values()
+    )
+    missing = [field for field, value in zip(fields, request) if not value]
+    if missing:
+        raise ValueError("missing fields : %s" % ", ".join(missing))
+    return request
+
+
+def renderKey(dataset, _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher):
+    """
+    ```renderKey(dataset: dict, _branch: str, _section: str, _e1_code: str, _e1_teacher: str, _e2_code: str, _e2_teacher: str) -> tuple``` <br/>
+    Builds the normalized **cache key** of a timetable request. The fingerprint of the data the timetable is
+    built from (see ```timetableDependencies```) and the renderer are part of the key, so that changed data (or
+    another renderer) never serves timetables rendered from the older one, while the timetables a reload did not
+    touch keep their key. Every key of the cache starts with the kind of its entry : ```pdf``` here, which the
+    other formats and the batches replace (```("svg", ...) + key[1:]```, ```("batch", key, ...)```), and always
+    ends with the normalized request of a single timetable (```key[-6:]```).
+    """
+    request = normalizeRequest(
+        _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher
+    )
+    return (
+        "pdf",
+        dependencyFingerprint(dataset, timetableDependencies(dataset, *request)),
+        RENDERER,
+    ) + request
+
+
+def keyDigest(key):
+    """
+    ```keyDigest(key: tuple) -> str``` <br/>
+    Returns a stable hash of a cache key, used to name cache files and as a strong **ETag**.
+    """
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def entryLine(name, dependencies):
+    """
+    ```entryLine(name: str, dependencies: tuple) -> bytes``` <br/>
+    Returns the first line of a file of the cache directory : the name of the entry and the ```(kind, code)```
+    dependencies it was built from (see ```timetableDependencies```), so that any worker loading it can
+    invalidate it.
+    """
+    if dependencies is not None:
+        dependencies = sorted(dependencies)
+    return json.dumps({"name": name, "dependencies": dependencies}).encode()
+
+
+def entryHeader(line):
+    """
+    ```entryHeader(line: bytes) -> (str, tuple)``` <br/>
+    Returns the name and the dependencies (None when unknown) of the first line of a file of the cache directory
+    (see ```entryLine```).
+    """
+    try:
+        header = json.loads(line)
+        dependencies = header["dependencies"]
+        return header["name"], (
+            None if dependencies is None else tuple(map(tuple, dependencies))
+        )
+    except (ValueError, TypeError, KeyError):
+        # A file written before the dependencies were kept only holds the name.
+        return line.decode("utf-8", "replace"), None
+
+
+class Flight:
+    """
+    ```Flight()``` <br/>
+    A render in progress, which the requests for the same timetable wait for instead of rendering it again.
+    """
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class RenderCache:
+    """
+    ```RenderCache(maxBytes: int, directory: str, maxDiskBytes: int)``` <br/>
+    Bounded **LRU** cache of rendered timetables. Entries are kept in memory until their total size crosses
+    ```maxBytes```, after which the least recently used ones are evicted. When a ```directory``` is given every
+    entry is also written to disk, and entries evicted from memory are loaded back from there on a hit. The files
+    of the directory (shared by every worker) are kept under ```maxDiskBytes``` in total, the least recently
+    used ones (by modification time, which a hit refreshes) being deleted first. The
+    entries rendered by this worker record the ```(kind, code)``` dependencies they were built from, so that a
+    reload only evicts those it affects (see ```invalidate```).
+    """
+
+    def __init__(self, maxBytes, directory=None, maxDiskBytes=CACHE_DIR_MAX_BYTES):
+        self.maxBytes = maxBytes
+        self.directory = directory
+        self.maxDiskBytes = maxDiskBytes
+        # The bytes written to the directory since it was last measured : it is trimmed (see ```_trim```) once
+        # they could have taken it over its cap, rather than listed on every write.
+        self._written = maxDiskBytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._dependencies = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        """
+        ```_path(key: tuple) -> str``` <br/>
+        Returns the path of the on-disk copy of an entry.
+        """
+        return os.path.join(self.directory, keyDigest(key) + CACHE_SUFFIX)
+
+    def _store(self, key, name, data, dependencies=None):
+        """
+        ```_store(key: tuple, name: str, data: bytes, dependencies: tuple)``` <br/>
+        Adds an entry (and its dependencies, when known) to the in-memory LRU and evicts the oldest entries
+        until it fits in ```maxBytes```. Must be called with the lock held.
+        """
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key)[1])
+        if len(data) > self.maxBytes:
+            self._dependencies.pop(key, None)
+            return
+        self._entries[key] = (name, data)
+        if dependencies is not None:
+            self._dependencies[key] = frozenset(dependencies)
+        self.size += len(data)
+        while self.size > self.maxBytes:
+            oldest, (_, evicted) = self._entries.popitem(last=False)
+            self._dependencies.pop(oldest, None)
+            self.size -= len(evicted)
+            CACHE_EVICTIONS.inc()
+
+    def _read(self, path):
+        """
+        ```_read(path: str) -> (str, tuple, bytes)``` <br/>
+        Reads an entry of the cache directory : its name, its dependencies and its bytes (None when unknown). Returns
+        None when it is not there.
+        """
+        try:
+            with open(path, "rb") as cached:
+                header, data = cached.read().split(b"\n", 1)
+            # A hit makes the file the most recently used one of the directory.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entryHeader(header) + (data,)
+
+    def _trim(self):
+        """
+        ```_trim()``` <br/>
+        Measures the cache directory and, when its files take more than ```maxDiskBytes```, deletes the least
+        recently modified ones until they take at most **TRIM_RATIO** of it, so that the next writes do not
+        trim it again at once.
+        """
+        files, total = [], 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith((CACHE_SUFFIX, LEGACY_SUFFIX)):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        limit = (
+            self.maxDiskBytes
+            if total <= self.maxDiskBytes
+            else self.maxDiskBytes * TRIM_RATIO
+        )
+        for _, size, path in files:
+            if total <= limit:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            CACHE_DISK_EVICTIONS.inc()
+        with self._lock:
+            self._written = total
+
+    def getDigest(self, digest):
+        """
+        ```getDigest(digest: str) -> (str, bytes)``` <br/>
+        Returns a timetable of the cache directory from the digest of its key (see ```keyDigest```), so that a
+        worker can serve timetables rendered by another one without knowing their keys. Returns None when it is
+        not there (or without a cache directory).
+        """
+        if self.directory is None or not re.fullmatch("[0-9a-f]{64}", digest):
+            return None
+        entry = self._read(os.path.join(self.directory, digest + CACHE_SUFFIX))
+        return None if entry is None else (entry[0], entry[2])
+
+    def get(self, key):
+        """
+        ```get(key: tuple) -> (str, bytes)``` <br/>
+        Returns the name and the bytes of a cached timetable, or None when it has not been rendered yet.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="memory")
+                return self._entries[key]
+
+        if self.directory is not None:
+            entry = self._read(self._path(key))
+            if entry is not None:
+                name, dependencies, data = entry
+                with self._lock:
+                    self._store(key, name, data, dependencies)
+                    self.hits += 1
+                CACHE_LOOKUPS.inc(result="disk")
+                return name, data
+
+        with self._lock:
+            self.misses += 1
+        CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    def contains(self, key):
+        """
+        ```contains(key: tuple) -> bool``` <br/>
+        Tells whether a timetable is cached, in memory or in the cache directory, without counting a lookup,
+        reading it or making it the most recently used.
+        """
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.directory is not None and os.path.exists(self._path(key))
+
+    def fits(self, size):
+        """
+        ```fits(size: int) -> bool``` <br/>
+        Tells whether an entry of the given size can be added to memory without evicting older ones.
+        """
+        return self.size + size <= self.maxBytes
+
+    def put(self, key, name, data, memory=True, dependencies=None):
+        """
+        ```put(key: tuple, name: str, data: bytes, memory: bool, dependencies: tuple)``` <br/>
+        Adds a rendered timetable built from the given ```dependencies``` (see ```timetableDependencies```) to
+        the cache (and to the cache directory, when one is configured). With ```memory``` set to False the entry
+        is only written to the cache directory.
+        """
+        if memory:
+            with self._lock:
+                self._store(key, name, data, dependencies)
+
+        if self.directory is not None:
+            # Written to a temporary file first and then renamed, so other workers never read a
+            # partially written entry.
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+            header = entryLine(name, dependencies)
+            with os.fdopen(descriptor, "wb") as cached:
+                cached.write(header + b"\n" + data)
+            os.replace(temporary, self._path(key))
+            with self._lock:
+                self._written += len(header) + 1 + len(data)
+                trim = self._written > self.maxDiskBytes
+            if trim:
+                self._trim()
+
+    def invalidate(self, changes):
+        """
+        ```invalidate(changes: set) -> list``` <br/>
+        Evicts the entries built from any of the changed ```(kind, code)``` dependencies (see
+        ```datasetChanges```), from memory and from the cache directory, and returns their keys. Every entry is
+        evicted when ```changes``` is None. Their keys would not be asked for again anyway (the fingerprint of a
+        timetable changes along with its data) : this frees their room for the timetables still in use.
+        """
+        with self._lock:
+            if changes is None:
+                keys = list(self._entries)
+            else:
+                keys = [
+                    key
+                    for key, dependencies in self._dependencies.items()
+                    if not dependencies.isdisjoint(changes)
+                ]
+            for key in keys:
+                self.size -= len(self._entries.pop(key)[1])
+                self._dependencies.pop(key, None)
+        CACHE_INVALIDATIONS.inc(len(keys))
+
+        if self.directory is not None:
+            for key in keys:
+                try:
+                    os.unlink(self._path(key))
+                except OSError:
+                    pass
+            self._invalidateDirectory(changes)
+        return keys
+
+    def _invalidateDirectory(self, changes):
+        """
+        ```_invalidateDirectory(changes: set)``` <br/>
+        Deletes the files of the cache directory built from any of the changed dependencies (all of them when
+        ```changes``` is None) : those of entries no longer in memory, or rendered by other workers. Only the
+        first line of every file, holding its dependencies, is read.
+        """
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+            if changes is not None:
+                try:
+                    with open(entry.path, "rb") as cached:
+                        _, dependencies = entryHeader(cached.readline().rstrip(b"\n"))
+                except OSError:
+                    continue
+                if dependencies is None or set(dependencies).isdisjoint(changes):
+                    continue
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def _lockFile(self, key, timeout):
+        """
+        ```_lockFile(key: tuple, timeout: float) -> file``` <br/>
+        Takes the lock file of an entry in the cache directory, waiting at most ```timeout``` seconds for the
+        worker holding it. Returns the open lock file, or None when it could not be taken.
+        """
+        path = os.path.join(self.directory, keyDigest(key) + ".lock")
+        try:
+            lock = open(path, "a")
+        except OSError:
+            return None
+        deadline, pause = time.monotonic() + timeout, 0.001
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock
+            except OSError:
+                if time.monotonic() >= deadline:
+                    lock.close()
+                    return None
+            time.sleep(pause)
+            pause = min(pause * 2, 0.05)
+
+    def _renderLocked(self, key, render, timeout, dependencies):
+        """
+        ```_renderLocked(key: tuple, render: function, timeout: float, dependencies: tuple) -> (str, bytes)``` <br/>
+        Renders an entry while holding its lock file, so that the other workers asking for it wait and then read
+        it from the cache directory. A worker which waited reads the entry instead of rendering it, and renders
+        it anyway when the lock was not released within ```timeout``` seconds.
+        """
+        lock = self._lockFile(key, timeout)
+        try:
+            if lock is not None:
+                entry = self._read(self._path(key))
+                if entry is not None:
+                    name, _, data = entry
+                    with self._lock:
+                        self._store(key, name, data, dependencies)
+                    CACHE_COALESCED.inc(scope="workers")
+                    return name, data
+            name, data = render()
+            with timed("cache_store"):
+                self.put(key, name, data, dependencies=dependencies)
+            if lock is not None:
+                # The entry is on disk before the lock file is removed, so a worker taking a newer lock
+                # file finds it there.
+                try:
+                    os.unlink(lock.name)
+                except OSError:
+                    pass
+            return name, data
+        finally:
+            if lock is not None:
+                lock.close()
+
+    def coalesce(self, key, render, timeout=RENDER_LOCK_TIMEOUT, dependencies=None):
+        """
+        ```coalesce(key: tuple, render: function, timeout: float, dependencies: tuple) -> (str, bytes)``` <br/>
+        Renders a timetable missing from the cache with ```render``` (returning its name and bytes) and adds it to
+        the cache along with its ```dependencies```. Concurrent calls for the same key (**single flight**) wait for the first one and share its
+        result instead of rendering it again; with a cache directory so do the calls of other workers, through a
+        lock file next to the entry. Errors of the render are raised to every waiting call.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            CACHE_COALESCED.inc(scope="process")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            if self.directory is not None and fcntl is not None:
+                flight.result = self._renderLocked(key, render, timeout, dependencies)
+            else:
+                flight.result = render()
+                with timed("cache_store"):
+                    self.put(key, *flight.result, dependencies=dependencies)
+            return flight.result
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,184 @@
+# Importing **dependencies** and **modules**
+import threading
+
+# This module finds the elective sections which cannot be taken together because they meet in the same slot.
+# It needs **numpy**, which is only imported the first time a clash is looked for, so that importing the app
+# stays cheap.
+
+# The **ELECTIVE_SLOTS** are the slot columns electives meet in.
+ELECTIVE_SLOTS = ("3 TO 4", "4 TO 5", "5 TO 6")
+
+# The **clash_data** dictionary holds the slot masks (and the clash matrix of every branch asked for so far)
+# built for a dataset version : version -> {"codes", "masks", "branches"}.
+clash_data = {}
+clash_lock = threading.Lock()
+
+
+def electiveSectionCode(dataset, branch, elective, DEId):
+    """
+    ```electiveSectionCode(dataset: dict, branch: str, elective: str, DEId) -> str``` <br/>
+    Returns the code of an elective section as written in the schedule, e.g. CRP, 4 of CSE -> CRP_CS-4.
+    """
+    return "%s_%s-%s" % (
+        elective,
+        dataset["meta_data"]["branch_to_elective"][branch],
+        DEId,
+    )
+
+
+def buildElectiveMasks(dataset):
+    """
+    ```buildElectiveMasks(dataset: dict) -> (dict, numpy.ndarray)``` <br/>
+    Builds one boolean mask over the (day, elective slot) pairs of the week for every elective section, with
+    the slots it meets in set. Returns the row of every elective section code along with the masks. The
+    columns of the schedule are compared as whole integer arrays, without decoding a single row.
+    """
+    import numpy
+
+    rows, header_map = dataset["rows"], dataset["header_map"]
+    days = {day: number for number, day in enumerate(dataset["index"]["days"])}
+    codes = {
+        code: number
+        for number, code in enumerate(
+            code for code in dataset["index"]["electives"] if code != "X"
+        )
+    }
+
+    def column(name):
+        return numpy.frombuffer(
+            rows.column(header_map[name]), dtype=rows.cells.typecode
+        )
+
+    # Symbols which are not elective sections (X) or days are mapped to -1 and dropped.
+    symbol_codes = numpy.array(
+        [codes.get(symbol, -1) for symbol in rows.symbols], dtype=numpy.int64
+    )
+    symbol_days = numpy.array(
+        [days.get(symbol, -1) for symbol in rows.symbols], dtype=numpy.int64
+    )
+    section = symbol_codes[column("SECTION(DE)")]
+    day = symbol_days[column("DAY")]
+    empty = rows.codes.get("X", -1)
+    booked = numpy.stack([column(slot) != empty for slot in ELECTIVE_SLOTS], axis=1)
+
+    keep = (section >= 0) & (day >= 0)
+    masks = numpy.zeros((len(codes), len(days) * len(ELECTIVE_SLOTS)), dtype=bool)
+    slots = day[keep, None] * len(ELECTIVE_SLOTS) + numpy.arange(len(ELECTIVE_SLOTS))
+    numpy.logical_or.at(masks, (section[keep, None], slots), booked[keep])
+    return codes, masks
+
+
+def clashData(dataset):
+    """
+    ```clashData(dataset: dict) -> dict``` <br/>
+    Returns the elective masks of the dataset, building them only the first time they are asked for with the
+    current dataset version.
+    """
+    data = clash_data.get(dataset["version"])
+    if data is not None:
+        return data
+
+    codes, masks = buildElectiveMasks(dataset)
+    data = {"codes": codes, "masks": masks, "branches": {}}
+    with clash_lock:
+        # Masks of older dataset versions are never asked for again.
+        clash_data.clear()
+        clash_data[dataset["version"]] = data
+    return data
+
+
+def branchClashMatrix(dataset, branch):
+    """
+    ```branchClashMatrix(dataset: dict, branch: str) -> (list, numpy.ndarray)``` <br/>
+    Returns the elective sections offered to a branch, as ```(elective code, DEID)``` pairs, along with their
+    clash matrix : entry [i][j] is True when sections i and j meet in the same slot. Returns None for an
+    unknown branch.
+    """
+    data = clashData(dataset)
+    matrix = data["branches"].get(branch)
+    if matrix is not None:
+        return matrix
+
+    electives = dataset["meta_data"]["branch_electives"].get(branch)
+    if electives is None:
+        return None
+    sections = [
+        (elective.replace("(DE)", ""), DEId)
+        for elective, electiveData in electives["electives"].items()
+        for DEId in sorted(electiveData["teachers"])
+    ]
+    rows = [
+        data["codes"].get(electiveSectionCode(dataset, branch, *section), -1)
+        for section in sections
+    ]
+    masks = data["masks"][rows].astype("uint8")
+    # Sections which are not found in the schedule never meet, so they clash with nothing.
+    masks[[row < 0 for row in rows]] = 0
+    matrix = (sections, (masks @ masks.T) > 0)
+    with clash_lock:
+        data["branches"][branch] = matrix
+    return matrix
+
+
+def compatibleElectives(dataset, branch, elective, DEId):
+    """
+    ```compatibleElectives(dataset: dict, branch: str, elective: str, DEId: str) -> dict``` <br/>
+    Returns the sections of the other electives of a branch which can be taken along with the given elective
+    section (```compatible```) and those which cannot (```clashing```). Returns None when the branch or the
+    elective section is unknown.
+    """
+    branch, elective, DEId = branch.upper(), elective.upper(), str(DEId).strip()
+    matrix = branchClashMatrix(dataset, branch)
+    if matrix is None:
+        return None
+    sections, clashes = matrix
+    names = [(code, str(number)) for code, number in sections]
+    if (elective, DEId) not in names:
+        return None
+
+    row = clashes[names.index((elective, DEId))]
+    # The teachers, in the same order as the sections of the clash matrix.
+    teachers = [
+        electiveData["teachers"][number]
+        for electiveData in dataset["meta_data"]["branch_electives"][branch][
+            "electives"
+        ].values()
+        for number in sorted(electiveData["teachers"])
+    ]
+    result = {"compatible": [], "clashing": []}
+    for (code, number), teacher, clash in zip(sections, teachers, row.tolist()):
+        if code == elective:
+            continue
+        result["clashing" if clash else "compatible"].append(
+            {"code": code, "DEID": number, "teacher": teacher}
+        )
+    return result
+
+
+def electiveClashes(dataset, request):
+    """
+    ```electiveClashes(dataset: dict, request: tuple) -> list``` <br/>
+    Returns the ```(day, slot)``` pairs in which the two elective sections of a normalized request (see
+    ```renderKey```) both meet. The list is empty when they are compatible, or when either is unknown (the
+    timetable is then left to report the problem).
+    """
+    branch, _, e1_code, e1_teacher, e2_code, e2_teacher = request
+    if (e1_code, e1_teacher) == (e2_code, e2_teacher):
+        return []
+    try:
+        first = electiveSectionCode(dataset, branch, e1_code, e1_teacher)
+        second = electiveSectionCode(dataset, branch, e2_code, e2_teacher)
+    except KeyError:
+        return []
+    data = clashData(dataset)
+    if first not in data["codes"] or second not in data["codes"]:
+        return []
+
+    import numpy
+
+    both = data["masks"][data["codes"][first]] & data["masks"][data["codes"][second]]
+    days = dataset["index"]["days"]
+    return [
+        (days[bit // len(ELECTIVE_SLOTS)], ELECTIVE_SLOTS[bit % len(ELECTIVE_SLOTS)])
+        for bit in numpy.flatnonzero(both).tolist()
+    ]
@@ -0,0 +1,111 @@
+# Importing **dependencies** and **modules**
+import os
+import datetime
+
+# All the **configuration** of the server is read from environment variables so that it can be
+# changed per deployment (Procfile / gunicorn) without touching the code.
+
+# The **SCHEDULE_PATH** and **TEACHER_PATH** variables point to the CSV files holding the class schedules and
+# the teachers. They default to the files shipped next to this module.
+SCHEDULE_PATH = os.environ.get(
+    "DHUNDO_SCHEDULE_CSV", os.path.join(os.path.dirname(__file__), "dhundo_db.csv")
+)
+TEACHER_PATH = os.environ.get(
+    "DHUNDO_TEACHER_CSV",
+    os.path.join(os.path.dirname(__file__), "dhundo_teacher_db.csv"),
+)
+
+# The **BRANCH_PATH** variable optionally points to a CSV file of ```BRANCH,CODE``` rows mapping every branch to
+# the code used in its elective section codes (CSE,CS for CRP_CS-4). The four built-in branches are used when
+# it is empty.
+BRANCH_PATH = os.environ.get("DHUNDO_BRANCH_CSV") or None
+
+# The **LOG_LEVEL** variable is the level of the messages logged by the server (DEBUG, INFO, WARNING ...). The
+# timetables and requests are only logged at the DEBUG level.
+LOG_LEVEL = os.environ.get("DHUNDO_LOG_LEVEL", "WARNING").upper()
+
+# The **SNAPSHOT_PATH** variable is an optional dataset snapshot compiled from the CSV files (python -m
+# app.snapshot), loaded instead of them as long as it was compiled from their current contents. With **PRELOAD**
+# the gunicorn master (see gunicorn.conf.py) loads the dataset once before forking, so the workers share it.
+SNAPSHOT_PATH = os.environ.get("DHUNDO_SNAPSHOT") or None
+PRELOAD = os.environ.get("DHUNDO_PRELOAD", "0") == "1"
+
+# The **WATCH_INTERVAL** variable is how often (in seconds) the CSV files are checked for changes, which are
+# then reloaded without restarting the server. Disabled when 0.
+WATCH_INTERVAL = float(os.environ.get("DHUNDO_WATCH_INTERVAL", 0))
+
+# The **CACHE_MAX_BYTES** variable caps the total size of the rendered timetables kept in memory.
+CACHE_MAX_BYTES = int(os.environ.get("DHUNDO_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# The **CACHE_DIR** variable is an optional directory where rendered timetables are also stored on
+# disk, so that they can be shared between workers and survive restarts. Disabled when empty. Its files are capped
+# to **CACHE_DIR_MAX_BYTES** in total, the least recently used ones being deleted first.
+CACHE_DIR = os.environ.get("DHUNDO_CACHE_DIR") or None
+CACHE_DIR_MAX_BYTES = int(
+    os.environ.get("DHUNDO_CACHE_DIR_MAX_BYTES", 1024 * 1024 * 1024)
+)
+
+# Identical timetables asked for at the same time are rendered once : the other requests wait for that render,
+# those of other workers (through a lock file in **CACHE_DIR**) for at most **RENDER_LOCK_TIMEOUT** seconds.
+RENDER_LOCK_TIMEOUT = float(os.environ.get("DHUNDO_RENDER_LOCK_TIMEOUT", 30))
+
+# The **RENDERER** variable selects how timetables are drawn : **native** writes the pdf directly, while
+# **matplotlib** draws it as a matplotlib figure (slower, kept as a fallback).
+RENDERER = os.environ.get("DHUNDO_RENDERER", "native").lower()
+
+# With the matplotlib renderer, the web workers hand their tables to **RENDER_WORKERS** long lived render
+# processes (none when 0 : every worker then draws its own figures), each replaced after **RENDER_MAX_JOBS**
+# renders or once its memory grew by more than **RENDER_MAX_GROWTH** megabytes. A render process which did not
+# answer within **RENDER_TIMEOUT** seconds is killed and replaced, and a render waits as long for an idle one.
+RENDER_WORKERS = int(os.environ.get("DHUNDO_RENDER_WORKERS", 2))
+RENDER_MAX_JOBS = int(os.environ.get("DHUNDO_RENDER_MAX_JOBS", 1000))
+RENDER_MAX_GROWTH = float(os.environ.get("DHUNDO_RENDER_MAX_GROWTH", 100))
+RENDER_TIMEOUT = float(os.environ.get("DHUNDO_RENDER_TIMEOUT", 60))
+
+# Calendar exports (```format=ics```) repeat every class weekly from the **TERM_START** date (YYYY-MM-DD, the
+# Monday of the current week when empty) until the **TERM_END** date (for ever when empty), at the local time of
+# the university : the **TIMEZONE** named, **UTC_OFFSET** (+HH:MM) away from UTC.
+TERM_START = os.environ.get("DHUNDO_TERM_START") or None
+TERM_START = datetime.date.fromisoformat(TERM_START) if TERM_START else None
+TERM_END = os.environ.get("DHUNDO_TERM_END") or None
+TERM_END = datetime.date.fromisoformat(TERM_END) if TERM_END else None
+TIMEZONE = os.environ.get("DHUNDO_TIMEZONE", "Asia/Kolkata")
+UTC_OFFSET = os.environ.get("DHUNDO_UTC_OFFSET", "+05:30")
+
+# The **JSON_MAX_AGE** variable is how long (in seconds) browsers and CDNs may reuse a JSON timetable
+# before revalidating it with its ETag.
+JSON_MAX_AGE = int(os.environ.get("DHUNDO_JSON_MAX_AGE", 300))
+
+# The **META_MAX_AGE** variable is how long (in seconds) browsers and CDNs may reuse the branch, section
+# and elective lists before revalidating them with their ETag.
+META_MAX_AGE = int(os.environ.get("DHUNDO_META_MAX_AGE", 86400))
+
+# The **BATCH_WORKERS** variable is the number of processes rendering batch requests, and
+# **BATCH_MAX_REQUESTS** the maximum number of timetables a single batch request may ask for.
+BATCH_WORKERS = int(os.environ.get("DHUNDO_BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_MAX_REQUESTS = int(os.environ.get("DHUNDO_BATCH_MAX_REQUESTS", 5000))
+
+# Render jobs (POST /jobs) are run by **JOB_WORKERS** processes. At most **JOB_QUEUE_MAX** jobs may be queued or
+# running at once (more are refused with 503), finished jobs are kept for **JOB_TTL** seconds, and a status
+# request waits at most **JOB_MAX_WAIT** seconds for its job to finish.
+JOB_WORKERS = int(
+    os.environ.get("DHUNDO_JOB_WORKERS", max(1, (os.cpu_count() or 1) // 2))
+)
+JOB_QUEUE_MAX = int(os.environ.get("DHUNDO_JOB_QUEUE_MAX", 256))
+JOB_TTL = float(os.environ.get("DHUNDO_JOB_TTL", 300))
+JOB_MAX_WAIT = float(os.environ.get("DHUNDO_JOB_MAX_WAIT", 30))
+
+# The **ADMIN_TOKEN** variable protects the /admin endpoints (sent in the X-Admin-Token header). The admin
+# endpoints are disabled when it is not set.
+ADMIN_TOKEN = os.environ.get("DHUNDO_ADMIN_TOKEN") or None
+
+# Pre-warming renders every valid timetable into the render cache in the background, with
+# **PREWARM_WORKERS** processes. It runs when a worker starts if **PREWARM_ON_START** is set, and then
+# again every **PREWARM_INTERVAL** seconds (never when 0). The request counts used to render the most
+# popular timetables first are kept in the **POPULARITY_PATH** file (not kept across restarts when empty).
+PREWARM_WORKERS = int(
+    os.environ.get("DHUNDO_PREWARM_WORKERS", max(1, (os.cpu_count() or 1) // 2))
+)
+PREWARM_ON_START = os.environ.get("DHUNDO_PREWARM_ON_START", "") not in ["", "0"]
+PREWARM_INTERVAL = float(os.environ.get("DHUNDO_PREWARM_INTERVAL", 0))
+POPULARITY_PATH = os.environ.get("DHUNDO_POPULARITY_PATH") or None
@@ -0,0 +1,836 @@
+# Importing **dependencies** and **modules**
+import os
+import csv
+import time
+import logging
+import hashlib
+import threading
+from itertools import chain
+from types import MappingProxyType
+from app.config import SCHEDULE_PATH, TEACHER_PATH, BRANCH_PATH, SNAPSHOT_PATH
+from app.snapshot import readSnapshot
+from app.table import ScheduleTable
+
+logger = logging.getLogger(__name__)
+
+# This module is the single place where the **dhundo_db.csv** and **dhundo_teacher_db.csv** files are
+# loaded and turned into the structures used to create timetables. It is shared by the Flask app
+# (main.py) and the command line tool (dhundo.py), and deliberately imports nothing heavy.
+
+# The **BRANCH_TO_ELECTIVE** and **ELECTIVE_TO_BRANCH** dictionaries map branch names to the branch codes
+# used in elective section codes (CRP_CS-4) and back. They are the default when no branch CSV file is
+# configured (see **BRANCH_PATH**).
+BRANCH_TO_ELECTIVE = {"CSE": "CS", "IT": "IT", "CSCE": "CE", "CSSE": "SE"}
+ELECTIVE_TO_BRANCH = {"CS": "CSE", "IT": "IT", "CE": "CSCE", "SE": "CSSE"}
+
+# The **ROOM_SLOTS** dictionary maps every room column to the slot columns it is the room of : ROOM1 and
+# ROOM2 hold the rooms of the morning and afternoon blocks of a section, ROOM3 to ROOM5 those of the electives.
+ROOM_SLOTS = {
+    "ROOM1": ("8 TO 9", "9 TO 10", "10 TO 11"),
+    "ROOM2": ("11 TO 12", "12 TO 1", "1 TO 2"),
+    "ROOM3": ("3 TO 4",),
+    "ROOM4": ("4 TO 5",),
+    "ROOM5": ("5 TO 6",),
+}
+
+
+def listUpperTransform(l):
+    """
+    ```listUpperTransform(l: list) -> list``` <br/>
+    Takes a list of strings and converts all the constituent elements in it to uppercase
+    """
+    return [elem.upper() for elem in l]
+
+
+def readCSV(path):
+    """
+    ```readCSV(path: str) -> list``` <br/>
+    Reads a CSV file as a 2D list. The file is closed as soon as it has been read.
+    """
+    with open(path, newline="") as data:
+        return list(csv.reader(data))
+
+
+def readBranchMap(path):
+    """
+    ```readBranchMap(path: str) -> dict``` <br/>
+    Reads the branch CSV file (```BRANCH,CODE``` rows, e.g. ```CSE,CS```) into a dictionary mapping every
+    (uppercase) branch to its code. Returns the built-in **BRANCH_TO_ELECTIVE** map when ```path``` is None.
+    """
+    if path is None:
+        return dict(BRANCH_TO_ELECTIVE)
+    branch_to_elective = {}
+    for row in readCSV(path):
+        if len(row) < 2 or not row[0].strip() or row[0].strip().startswith("#"):
+            continue
+        branch_to_elective[row[0].strip().upper()] = row[1].strip().upper()
+    return branch_to_elective
+
+
+def datasetPaths():
+    """
+    ```datasetPaths() -> list``` <br/>
+    Returns the paths of the configured files the dataset is loaded from.
+    """
+    return [SCHEDULE_PATH, TEACHER_PATH] + ([BRANCH_PATH] if BRANCH_PATH else [])
+
+
+def datasetVersion(paths):
+    """
+    ```datasetVersion(paths: list) -> str``` <br/>
+    Returns a hash of the contents of the given files, identifying the dataset loaded from them. Rendered
+    timetables are cached against the **fingerprints** of the data they are built from instead (see
+    ```buildFingerprints```), so a change only invalidates the timetables it affects.
+    """
+    version = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as data:
+            version.update(data.read())
+    return version.hexdigest()
+
+
+def getBranches(meta_data):
+    """
+    ```getBranches(meta_data: dict) -> list``` <br/>
+    Returns a list of all the available branches in the database.
+    """
+    return list(meta_data["branch_noOfSections"].keys())
+
+
+def getSections(meta_data, branch):
+    """
+    ```getSections(meta_data: dict, branch: str) -> list``` <br/>
+    Returns a list of all the available sections under a particular branch in the database.
+    """
+    branch = branch.upper()
+    if branch not in meta_data["branch_noOfSections"]:
+        return None
+    return meta_data["branch_noOfSections"][branch]
+
+
+def buildTeacherIndex(teacherData, elective_to_branch):
+    """
+    ```buildTeacherIndex(teacherData: list, elective_to_branch: dict) -> dict``` <br/>
+    Builds the **teacher index** once : ```codes``` maps every (uppercase) teacher code (CRP_CS1) to the teacher,
+    ```names``` maps every (normalized) teacher name back to their codes, and ```sections``` maps every teacher
+    code to the elective section it teaches (CRP_CS-1) along with its elective and branch.
+    """
+    teachers = {"codes": {}, "names": {}, "sections": {}}
+    for row in teacherData:
+        if len(row) < 2:
+            continue
+        code, name = row[0].strip().upper(), row[1].strip()
+        # The first row of a code wins, like the linear scan this index replaces.
+        if code in teachers["codes"]:
+            continue
+        teachers["codes"][code] = name
+        teachers["names"].setdefault(normalizeName(name), []).append(code)
+
+        elective, _, details = code.partition("_")
+        elBranch = details.rstrip("0123456789")
+        DEId = details[len(elBranch) :]
+        if elective and elBranch and DEId:
+            teachers["sections"][code] = {
+                "elective": elective,
+                "branch": elective_to_branch.get(elBranch),
+                "section": elective + "_" + elBranch + "-" + str(int(DEId)),
+            }
+    return teachers
+
+
+def normalizeName(name):
+    """
+    ```normalizeName(name: str) -> str``` <br/>
+    Normalizes a teacher name for lookups : uppercase with single spaces.
+    """
+    return " ".join(name.upper().split())
+
+
+def findTeacher(branch, elective, DEId, teachers, meta_data):
+    """
+    ```findTeacher(branch: str, elective: str, DEId: str, teachers: dict, meta_data: dict) -> str``` <br/>
+    Find a given teacher given the branch name (branch), elective name (elective), department elective (DEId)
+    and the teacher index (teachers, see ```buildTeacherIndex```)
+    """
+    try:
+        code = (
+            elective.replace("(DE)", "")
+            + "_"
+            + meta_data["branch_to_elective"][branch]
+            + str(DEId)
+        )
+        return teachers["codes"].get(code.upper())
+    except Exception as error:
+        logger.debug("no teacher for %s %s %s : %r", branch, elective, DEId, error)
+        return None
+
+
+def teacherSchedule(code, dataset):
+    """
+    ```teacherSchedule(code: str, dataset: dict) -> dict``` <br/>
+    Returns the weekly schedule of the teacher with the given code : the elective section they teach and every
+    (day, slot, room, subject) it meets in. Returns None for an unknown code.
+    """
+    teachers, header_map = dataset["teachers"], dataset["header_map"]
+    code = code.strip().upper()
+    if code not in teachers["codes"]:
+        return None
+
+    schedule = {"code": code, "teacher": teachers["codes"][code], "slots": []}
+    schedule.update(teachers["sections"].get(code, {}))
+    if "section" not in schedule:
+        return schedule
+
+    header, rows = dataset["header"], dataset["rows"]
+    slots = [
+        (header_map[room], header_map[slot])
+        for room, slot in [
+            ("ROOM3", "3 TO 4"),
+            ("ROOM4", "4 TO 5"),
+            ("ROOM5", "5 TO 6"),
+        ]
+    ]
+    for day, positions in (
+        dataset["index"]["electives"].get(schedule["section"], {}).items()
+    ):
+        for position in positions:
+            row = rows[position]
+            for room, slot in slots:
+                if row[slot] != "X":
+                    schedule["slots"].append(
+                        {
+                            "day": day,
+                            "slot": header[slot],
+                            "room": row[room],
+                            "subject": row[slot],
+                        }
+                    )
+    return schedule
+
+
+def electiveTeachers(branch, electives, dataset):
+    """
+    ```electiveTeachers(branch: str, electives: list, dataset: dict) -> dict``` <br/>
+    Returns the names of the teachers of the given ```(elective code, DEID)``` sections of a branch, by the subject
+    their classes have in the timetable (```CRP(DE)```). Sections without a known teacher are left out.
+    """
+    teachers = dataset["teachers"]
+    code = dataset["meta_data"]["branch_to_elective"].get(str(branch).upper())
+    names = {}
+    for elective, DEId in electives:
+        elective = str(elective).strip().upper()
+        teacher = "%s_%s%s" % (elective, code, str(DEId).strip())
+        if code is not None and teacher in teachers["codes"]:
+            names[elective + "(DE)"] = teachers["codes"][teacher]
+    return names
+
+
+def buildHeaderMap(header):
+    """
+    ```buildHeaderMap(header: list) -> dict``` <br/>
+    Maps every column header name to its index.
+    """
+    header_map = {}
+    for index in range(len(header)):
+        header_map[header[index]] = index
+    return header_map
+
+
+def parseSection(section):
+    """
+    ```parseSection(section: str) -> (str, int)``` <br/>
+    Splits a section code (CSE-21) into its branch and number, or returns None when it is not one.
+    """
+    if section == "X":
+        return None
+    split_section = section.split("-")
+    if len(split_section) != 2:
+        return None
+    return split_section[0], int(split_section[1])
+
+
+def parseElectiveSection(section):
+    """
+    ```parseElectiveSection(section: str) -> (str, int)``` <br/>
+    Splits an elective section code (CRP_CS-4) into its branch code and DEID, or returns None when it is not one.
+    """
+    if section == "X":
+        return None
+    split_section_1 = section.split("_")
+    if len(split_section_1) != 2:
+        return None
+    split_section_2 = split_section_1[1].split("-")
+    if len(split_section_2) != 2:
+        return None
+    return split_section_2[0], int(split_section_2[1])
+
+
+def buildMetaData(rows, header_map, teachers, branch_to_elective=BRANCH_TO_ELECTIVE):
+    """
+    ```buildMetaData(rows: ScheduleTable, header_map: dict, teachers: dict, branch_to_elective: dict) -> dict``` <br/>
+    Builds the **meta_data** dictionary : the number of sections under each branch and the electives (along
+    with their DEIDs and teachers, resolved with the teacher index) offered to each branch.
+
+    It works on the columns of the table rather than on its rows : every distinct section code is split only
+    once, and the rows repeating the (elective section, electives) of an earlier row are skipped, so only the
+    distinct values are handled in Python. Branches, electives and DEIDs keep the order in which they first
+    appear in the schedule.
+    """
+    meta_data = {}
+    meta_data["branch_noOfSections"] = {}
+    meta_data["branch_electives"] = {}
+    meta_data["branch_to_elective"] = dict(branch_to_elective)
+    meta_data["elective_to_branch"] = {
+        code: branch for branch, code in branch_to_elective.items()
+    }
+    symbols = rows.symbols
+
+    # Finding **branches** and calculating the count of **sections** under each **branch**, from the distinct
+    # section codes in the order they first appear.
+    noOfSections = meta_data["branch_noOfSections"]
+    for code in dict.fromkeys(rows.column(header_map["SECTION"])):
+        parsed = parseSection(symbols[code])
+        if parsed is None:
+            continue
+        branch, section = parsed
+        noOfSections[branch] = max(section, noOfSections.get(branch, section))
+
+    # For getting the **elective** data under each **branch**, from the distinct (elective section, elective)
+    # pairs of the 3 TO 4, 4 TO 5 and 5 TO 6 columns, in the order they first appear row after row.
+    sections = rows.column(header_map["SECTION(DE)"])
+    pairs = dict.fromkeys(
+        chain.from_iterable(
+            zip(
+                zip(sections, rows.column(header_map["3 TO 4"])),
+                zip(sections, rows.column(header_map["4 TO 5"])),
+                zip(sections, rows.column(header_map["5 TO 6"])),
+            )
+        )
+    )
+    # Every distinct elective section is split once, listing its branch from its first elective section on (even
+    # without any elective).
+    electiveSections = {}
+    for section in dict.fromkeys(sections):
+        parsed = parseElectiveSection(symbols[section])
+        if parsed is None:
+            continue
+        elBranch, DEId = parsed
+        branch = meta_data["elective_to_branch"].get(elBranch)
+        if branch is None:
+            logger.debug("elective section of an unknown branch : %s", elBranch)
+            continue
+        meta_data["branch_electives"].setdefault(branch, {"electives": {}})
+        electiveSections[section] = branch, DEId
+
+    empty = rows.codes.get("X")
+    for section, slot in pairs:
+        if slot == empty or section not in electiveSections:
+            continue
+        branch, DEId = electiveSections[section]
+        elective = symbols[slot]
+        electives = meta_data["branch_electives"][branch]["electives"]
+        if elective not in electives:
+            electives[elective] = {"DEIDs": DEId, "teachers": {}}
+        elif DEId > electives[elective]["DEIDs"]:
+            electives[elective]["DEIDs"] = DEId
+        if DEId not in electives[elective]["teachers"]:
+            electives[elective]["teachers"][DEId] = findTeacher(
+                branch, elective, DEId, teachers, meta_data
+            )
+
+    return meta_data
+
+
+def buildTimetableIndex(rows, header_map):
+    """
+    ```buildTimetableIndex(rows: ScheduleTable, header_map: dict) -> MappingProxyType``` <br/>
+    Builds the read-only **index** used by ```createTimetable```. It maps every section code (CSE-4) to the
+    position of its row for each day, and every elective section code (CRP_CS-4) to the positions of its rows
+    for each day, so that a lookup costs O(days) irrespective of the number of rows in the database.
+    """
+    day_column = header_map["DAY"]
+    section_column = header_map["SECTION"]
+    elective_column = header_map["SECTION(DE)"]
+
+    days = {}
+    sections = {}
+    electives = {}
+    for position, row in enumerate(rows):
+        day = row[day_column]
+        days[day] = None
+        sections.setdefault(row[section_column], {})[day] = position
+        # Elective rows are kept in order so that two electives can be merged in the same order
+        # in which they appear in the database.
+        electives.setdefault(row[elective_column], {}).setdefault(day, []).append(
+            position
+        )
+
+    return MappingProxyType(
+        {
+            "days": tuple(days),
+            "sections": MappingProxyType(
+                {code: MappingProxyType(data) for code, data in sections.items()}
+            ),
+            "electives": MappingProxyType(
+                {
+                    code: MappingProxyType(
+                        {day: tuple(positions) for day, positions in data.items()}
+                    )
+                    for code, data in electives.items()
+                }
+            ),
+        }
+    )
+
+
+def buildRoomIndex(rows, header_map):
+    """
+    ```buildRoomIndex(rows: ScheduleTable, header_map: dict) -> MappingProxyType``` <br/>
+    Builds the read-only **rooms** index. Every (day, slot) pair is given a bit, and every room an occupancy
+    bitmap with the bits of the slots it is booked in set, so finding the free rooms of a slot is a single AND
+    per room. The bookings of every room (day, slot, section and subject, in the order of the week) are kept as
+    well.
+    """
+    day_column = header_map["DAY"]
+    section_column = header_map["SECTION"]
+    elective_column = header_map["SECTION(DE)"]
+    columns = [
+        (header_map[room], header_map[slot], room in ("ROOM1", "ROOM2"))
+        for room, slots in ROOM_SLOTS.items()
+        for slot in slots
+    ]
+    slots = tuple(
+        sorted((header_map[slot] for slots in ROOM_SLOTS.values() for slot in slots))
+    )
+    slot_bits = {column: bit for bit, column in enumerate(slots)}
+
+    days = {}
+    for row in rows:
+        days.setdefault(row[day_column], len(days))
+
+    occupancy = {}
+    bookings = {}
+    for row in rows:
+        first = days[row[day_column]] * len(slots)
+        for room_column, slot_column, morning in columns:
+            room, subject = row[room_column], row[slot_column]
+            if room == "X" or subject == "X":
+                continue
+            occupancy.setdefault(room, 0)
+            bookings.setdefault(room, {})
+            bit = first + slot_bits[slot_column]
+            # An elective meets in the same room for every section taking it : it is booked only once.
+            section = row[section_column] if morning else row[elective_column]
+            bookings[room].setdefault(bit, {})[section] = subject
+            occupancy[room] |= 1 << bit
+
+    day_names = tuple(days)
+    slot_names = tuple(rows.header[column] for column in slots)
+    return MappingProxyType(
+        {
+            "days": day_names,
+            "slots": slot_names,
+            "occupancy": MappingProxyType(dict(sorted(occupancy.items()))),
+            "bookings": MappingProxyType(
+                {
+                    room: tuple(
+                        {
+                            "day": day_names[bit // len(slots)],
+                            "slot": slot_names[bit % len(slots)],
+                            "section": section,
+                            "subject": subject,
+                        }
+                        for bit in sorted(booked)
+                        for section, subject in booked[bit].items()
+                    )
+                    for room, booked in sorted(bookings.items())
+                }
+            ),
+        }
+    )
+
+
+# The **DEPENDENCY_KINDS** of data a timetable is built from : the rows of its section (CSE-4), those of its
+# elective sections (CRP_CS-4) and its teachers (CRP_CS4).
+DEPENDENCY_KINDS = ("section", "elective", "teacher")
+
+
+def fingerprint(*values):
+    """
+    ```fingerprint(*values) -> str``` <br/>
+    Returns a short hash of the given values (strings, and lists or tuples of them).
+    """
+    return hashlib.sha256(repr(values).encode()).hexdigest()[:16]
+
+
+def buildFingerprints(header, rows, header_map, index, teachers, branch_to_elective):
+    """
+    ```buildFingerprints(header: list, rows: ScheduleTable, header_map: dict, index: MappingProxyType, teachers: MappingProxyType, branch_to_elective: dict) -> MappingProxyType``` <br/>
+    Builds the read-only **fingerprints** of the data timetables are built from : one per section code (the
+    columns of its rows read by ```createTimetable```), per elective section code (the elective columns of its
+    rows) and per teacher code, along with the ```layout``` (header, days and branch codes) every timetable
+    depends on. Two datasets giving a code the same fingerprint give it the same timetables.
+    """
+    symbols = rows.symbols
+
+    def texts(first, last):
+        # The cells of columns first to last (excluded) of every row, joined : one string per row.
+        return [
+            "\x1f".join([symbols[code] for code in codes])
+            for codes in zip(*[rows.column(column) for column in range(first, last)])
+        ]
+
+    sections = texts(header_map["SECTION"], header_map["SECTION(DE)"])
+    electives = texts(header_map["ROOM3"], header_map["5 TO 6"] + 1)
+    return MappingProxyType(
+        {
+            "layout": fingerprint(
+                header, index["days"], sorted(branch_to_elective.items())
+            ),
+            "section": MappingProxyType(
+                {
+                    code: fingerprint(
+                        [(day, sections[position]) for day, position in days.items()]
+                    )
+                    for code, days in index["sections"].items()
+                }
+            ),
+            "elective": MappingProxyType(
+                {
+                    code: fingerprint(
+                        [
+                            (day, [electives[position] for position in positions])
+                            for day, positions in days.items()
+                        ]
+                    )
+                    for code, days in index["electives"].items()
+                }
+            ),
+            "teacher": MappingProxyType(
+                {
+                    code: fingerprint(
+                        name, sorted(teachers["sections"].get(code, {}).items())
+                    )
+                    for code, name in teachers["codes"].items()
+                }
+            ),
+        }
+    )
+
+
+def timetableDependencies(
+    dataset, _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher
+):
+    """
+    ```timetableDependencies(dataset: dict, _branch: str, _section: str, _e1_code: str, _e1_teacher: str, _e2_code: str, _e2_teacher: str) -> tuple``` <br/>
+    Returns the ```(kind, code)``` pairs (see **DEPENDENCY_KINDS**) of the data a timetable request is built
+    from : its section, its two elective sections and their teachers.
+    """
+    branch = str(_branch).strip().upper()
+    code = dataset["meta_data"]["branch_to_elective"].get(branch, "")
+    dependencies = [("section", "%s-%s" % (branch, str(_section).strip().upper()))]
+    for elective, DEId in ((_e1_code, _e1_teacher), (_e2_code, _e2_teacher)):
+        elective, DEId = str(elective).strip().upper(), str(DEId).strip().upper()
+        dependencies.append(("elective", "%s_%s-%s" % (elective, code, DEId)))
+        dependencies.append(("teacher", "%s_%s%s" % (elective, code, DEId)))
+    return tuple(dependencies)
+
+
+def dependencyFingerprint(dataset, dependencies):
+    """
+    ```dependencyFingerprint(dataset: dict, dependencies: tuple) -> str``` <br/>
+    Returns the fingerprint of the data behind the given dependencies (see ```timetableDependencies```). It
+    only changes when that data does, whatever else changed in the dataset.
+    """
+    fingerprints = dataset["fingerprints"]
+    return fingerprint(
+        fingerprints["layout"],
+        [(kind, code, fingerprints[kind].get(code)) for kind, code in dependencies],
+    )
+
+
+def datasetChanges(older, newer):
+    """
+    ```datasetChanges(older: dict, newer: dict) -> set``` <br/>
+    Diffs the fingerprints of two datasets. Returns the ```(kind, code)``` dependencies whose data changed (or
+    which were added or removed), or None when the layout changed, which affects every timetable.
+    """
+    older, newer = older["fingerprints"], newer["fingerprints"]
+    if older["layout"] != newer["layout"]:
+        return None
+    changes = set()
+    for kind in DEPENDENCY_KINDS:
+        before, after = older[kind], newer[kind]
+        changes.update(
+            (kind, code)
+            for code in before.keys() | after.keys()
+            if before.get(code) != after.get(code)
+        )
+    return changes
+
+
+def freeRooms(rooms, day, slot):
+    """
+    ```freeRooms(rooms: MappingProxyType, day: str, slot: str) -> list``` <br/>
+    Returns the rooms which are not booked on the given day (TUE) and slot (11 TO 12), or None when either of
+    them is unknown.
+    """
+    day, slot = " ".join(day.upper().split()), " ".join(slot.upper().split())
+    if day not in rooms["days"] or slot not in rooms["slots"]:
+        return None
+    bit = 1 << (
+        rooms["days"].index(day) * len(rooms["slots"]) + rooms["slots"].index(slot)
+    )
+    return [room for room, booked in rooms["occupancy"].items() if not booked & bit]
+
+
+def readSchedule(path):
+    """
+    ```readSchedule(path: str) -> (list, ScheduleTable)``` <br/>
+    Reads the schedule CSV file row by row straight into the compact table, without holding the whole file as
+    lists of strings first. Returns the (uppercase) header along with the rows.
+    """
+    with open(path, newline="") as data:
+        csvreader = csv.reader(data)
+        header = listUpperTransform(next(csvreader))
+        return header, ScheduleTable(
+            header, (listUpperTransform(row) for row in csvreader if row)
+        )
+
+
+def loadDataset(
+    schedulePath=SCHEDULE_PATH, teacherPath=TEACHER_PATH, branchPath=BRANCH_PATH
+):
+    """
+    ```loadDataset(schedulePath: str, teacherPath: str, branchPath: str) -> dict``` <br/>
+    Loads the schedule, the teacher and the (optional) branch CSV files and builds everything derived from
+    them. Returns the **dataset** dictionary holding the header, rows, header_map, teacherData, meta_data,
+    index, teachers, rooms, fingerprints and version.
+    """
+    dataset = {}
+    # The **header** is used to store the names of all the column headers in the CSV file.
+    # The **rows** store only the rows without storing the column headers.
+    dataset["header"], dataset["rows"] = readSchedule(schedulePath)
+    # The **teacherData** list contains the entire data related to teachers as a 2D List
+    dataset["teacherData"] = readCSV(teacherPath)
+    dataset["header_map"] = buildHeaderMap(dataset["header"])
+    branch_to_elective = readBranchMap(branchPath)
+    # The **teachers** index resolves teacher codes (and names) without scanning teacherData.
+    dataset["teachers"] = buildTeacherIndex(
+        dataset["teacherData"],
+        {code: branch for branch, code in branch_to_elective.items()},
+    )
+    # The **meta_data** dictionary acts as a cache for frequently accessed data.
+    dataset["meta_data"] = buildMetaData(
+        dataset["rows"], dataset["header_map"], dataset["teachers"], branch_to_elective
+    )
+    dataset["index"] = buildTimetableIndex(dataset["rows"], dataset["header_map"])
+    dataset["rooms"] = buildRoomIndex(dataset["rows"], dataset["header_map"])
+    dataset["fingerprints"] = buildFingerprints(
+        dataset["header"],
+        dataset["rows"],
+        dataset["header_map"],
+        dataset["index"],
+        dataset["teachers"],
+        branch_to_elective,
+    )
+    dataset["version"] = datasetVersion(
+        [schedulePath, teacherPath] + ([branchPath] if branchPath else [])
+    )
+    return dataset
+
+
+def createTimetable(branch, section, elective1, elective2, dataset):
+    """
+    ```createTimetable(branch: str, section: str, elective1: str, elective2: str, dataset: dict) -> (str, list)``` <br/>
+    Creates the timetable based on the branch and electives passed to it along with the loaded **dataset**
+    (see ```loadDataset```)
+    """
+    header, header_map, rows = dataset["header"], dataset["header_map"], dataset["rows"]
+    meta_data, index = dataset["meta_data"], dataset["index"]
+    timetable = {}
+
+    class_code = str(branch + "-" + str(section)).upper()
+
+    timetable["HEAD"] = (
+        header[header_map["DAY"] : header_map["SECTION(DE)"]]
+        + header[header_map["ROOM3"] : header_map["5 TO 6"] + 1]
+    )
+
+    for day, position in index["sections"].get(class_code, {}).items():
+        timetable[day] = rows[position][
+            header_map["SECTION"] : header_map["SECTION(DE)"]
+        ]
+
+    elective1_code = (
+        elective1[0]
+        + "_"
+        + meta_data["branch_to_elective"][branch]
+        + "-"
+        + str(elective1[1])
+    )
+    elective2_code = (
+        elective2[0]
+        + "_"
+        + meta_data["branch_to_elective"][branch]
+        + "-"
+        + str(elective2[1])
+    )
+
+    elective1_data = index["electives"].get(elective1_code, {})
+    elective2_data = (
+        index["electives"].get(elective2_code, {})
+        if elective2_code != elective1_code
+        else {}
+    )
+
+    for day in index["days"]:
+        elective_schedule = ["X"] * 6
+        for position in sorted(
+            elective1_data.get(day, ()) + elective2_data.get(day, ())
+        ):
+            schedule = rows[position][header_map["ROOM3"] : header_map["5 TO 6"] + 1]
+            for slot in range(0, 6, 2):
+                if elective_schedule[slot] != "X":
+                    continue
+                if schedule[slot] != "X":
+                    elective_schedule[slot] = schedule[slot]
+                    elective_schedule[slot + 1] = schedule[slot + 1]
+        timetable[day] += elective_schedule
+
+    return " ".join([class_code, elective1_code, elective2_code]) + ".pdf", timetable
+
+
+def apply2DTransform(timetable):
+    """
+    ```apply2DTransform(timetable: list) -> list``` <br/>
+    Creates the actual transformed timetable based on the raw dictionary based timetable passed to it.
+    """
+    transformedList = []
+    for key in timetable.keys():
+        if key == "HEAD":
+            transformedList.append(timetable[key])
+        else:
+            transformedList.append([key] + timetable[key])
+    return transformedList
+
+
+def datasetStamp(paths):
+    """
+    ```datasetStamp(paths: list) -> tuple``` <br/>
+    Returns the modification time and size of the given files, used to cheaply notice that they changed.
+    """
+    stamp = []
+    for path in paths:
+        status = os.stat(path)
+        stamp.append((status.st_mtime_ns, status.st_size))
+    return tuple(stamp)
+
+
+def loadInitialDataset(snapshotPath=SNAPSHOT_PATH):
+    """
+    ```loadInitialDataset(snapshotPath: str) -> dict``` <br/>
+    Loads the dataset from the compiled snapshot (see snapshot.py) when one is configured and was compiled from
+    the current contents of the CSV files, and from the CSV files otherwise (also when the snapshot is missing,
+    of another format or corrupt, see ```readSnapshot```).
+    """
+    if snapshotPath is not None:
+        try:
+            header, dataset = readSnapshot(snapshotPath)
+            if header["version"] == datasetVersion(datasetPaths()):
+                logger.info("dataset loaded from the snapshot %s", snapshotPath)
+                return dataset
+            logger.warning(
+                "the snapshot %s is older than the CSV files, loading them instead",
+                snapshotPath,
+            )
+        except (OSError, ValueError) as error:
+            logger.warning(
+                "the snapshot %s could not be loaded (%s), loading the CSV files instead",
+                snapshotPath,
+                error,
+            )
+    return loadDataset()
+
+
+# The **current_dataset** is loaded when the module is first imported and shared by every request. It is
+# never modified : a reload builds a whole new dataset and then swaps it in with a single assignment, so a
+# request which took it with ```getDataset()``` keeps a consistent snapshot until it finishes.
+current_dataset = loadInitialDataset()
+current_stamp = datasetStamp(datasetPaths())
+reload_lock = threading.Lock()
+
+# The **reload_listeners** are called with the older and the newer dataset whenever a reload swaps in changed
+# data (see ```onReload```).
+reload_listeners = []
+
+
+def getDataset():
+    """
+    ```getDataset() -> dict``` <br/>
+    Returns the current **dataset**. Callers should take it once per request and use that snapshot throughout.
+    """
+    return current_dataset
+
+
+def onReload(listener):
+    """
+    ```onReload(listener: function) -> function``` <br/>
+    Registers a function called as ```listener(older, newer)``` after every reload which changed the data, e.g.
+    to invalidate what was built from the older dataset. Errors of the listeners are logged, never raised.
+    """
+    reload_listeners.append(listener)
+    return listener
+
+
+def filesChanged():
+    """
+    ```filesChanged() -> bool``` <br/>
+    Tells whether the CSV files changed since the dataset was last loaded from them (see ```datasetStamp```).
+    """
+    return datasetStamp(datasetPaths()) != current_stamp
+
+
+def reloadDataset():
+    """
+    ```reloadDataset() -> bool``` <br/>
+    Loads the CSV files again and swaps the new dataset in. Returns whether the data actually changed. When the
+    files cannot be loaded the error is raised and the current dataset is kept.
+    """
+    global current_dataset, current_stamp
+    with reload_lock:
+        stamp = datasetStamp(datasetPaths())
+        dataset = loadDataset()
+        current_stamp = stamp
+        if dataset["version"] == current_dataset["version"]:
+            return False
+        older, current_dataset = current_dataset, dataset
+        for listener in reload_listeners:
+            try:
+                listener(older, dataset)
+            except Exception:
+                logger.exception("dataset reload listener failed")
+        return True
+
+
+def watchDataset(interval):
+    """
+    ```watchDataset(interval: float)``` <br/>
+    Starts a background thread checking the CSV files every ```interval``` seconds and reloading the dataset
+    when they change. As every worker runs its own watcher, a correction reaches all of them without a restart.
+    """
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                if not filesChanged():
+                    continue
+                if reloadDataset():
+                    logger.info(
+                        "dataset reloaded, version : %s", current_dataset["version"]
+                    )
+            except Exception:
+                logger.exception("dataset reload failed")
+
+    threading.Thread(target=watch, name="dataset-watcher", daemon=True).start()
@@ -0,0 +1,193 @@
+# Importing **dependencies** and **modules**
+import re
+import datetime
+from app.config import TERM_START, TERM_END, TIMEZONE, UTC_OFFSET
+
+# A timetable exported as an **iCalendar** file (RFC 5545) holds one weekly recurring event per class, with its
+# room (and teacher, for the electives), so that students can import it in their calendar app. It is plain text
+# built from the rows of ```apply2DTransform```, without drawing anything.
+
+# The **SLOT_PATTERN** matches the slot columns of the schedule (```8 TO 9``` ... ```5 TO 6```). Their hours are on a
+# 12 hour clock : those before **FIRST_HOUR** are in the afternoon.
+SLOT_PATTERN = re.compile(r"^(\d{1,2}) TO (\d{1,2})$")
+FIRST_HOUR = 8
+
+# The **WEEKDAYS** numbers of the days of the schedule, as ```datetime.date.weekday``` counts them.
+WEEKDAYS = {"MON": 0, "TUE": 1, "WED": 2, "THU": 3, "FRI": 4, "SAT": 5, "SUN": 6}
+
+# The **PRODID** naming the application which wrote the calendar.
+PRODID = "-//Class Dhundo//Timetable//EN"
+
+
+def slotHour(hour):
+    """
+    ```slotHour(hour: str) -> int``` <br/>
+    Turns an hour of a slot column (```3``` in ```3 TO 4```) into an hour of the day (15).
+    """
+    hour = int(hour)
+    return hour + 12 if hour < FIRST_HOUR else hour
+
+
+def utcOffset(offset=UTC_OFFSET):
+    """
+    ```utcOffset(offset: str) -> datetime.timedelta``` <br/>
+    Parses a UTC offset (```+05:30```, ```+0530``` or ```-3```). Raises a ValueError when it is not one.
+    """
+    match = re.match(r"^([+-])(\d{1,2}):?(\d{2})?$", offset.strip())
+    if match is None:
+        raise ValueError("invalid UTC offset %r" % offset)
+    sign, hours, minutes = match.groups()
+    delta = datetime.timedelta(hours=int(hours), minutes=int(minutes or 0))
+    return -delta if sign == "-" else delta
+
+
+def termStart(today=None):
+    """
+    ```termStart(today: datetime.date) -> datetime.date``` <br/>
+    Returns the date the weekly events start from : **TERM_START** when it is set, and the Monday of the current
+    week otherwise.
+    """
+    if TERM_START is not None:
+        return TERM_START
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=today.weekday())
+
+
+def timetableEvents(table, teachers):
+    """
+    ```timetableEvents(table: list, teachers: dict) -> list``` <br/>
+    Returns the classes of a 2D timetable (the output of ```apply2DTransform```) as events : dictionaries with
+    the ```day```, the ```start``` and ```end``` hours, the ```subject```, the ```room``` and the ```teacher```
+    (looked up by subject in ```teachers```, None when unknown). A class lasting several consecutive slots of the
+    same room (a lab) is a single event.
+    """
+    header, events = table[0], []
+    for row in table[1:]:
+        room, event = "X", None
+        for name, cell in zip(header, row):
+            if name.startswith("ROOM"):
+                room, event = cell, None
+                continue
+            hours = SLOT_PATTERN.match(name)
+            if hours is None:
+                continue
+            if cell == "X":
+                event = None
+                continue
+            start, end = slotHour(hours.group(1)), slotHour(hours.group(2))
+            if event is not None and event["subject"] == cell and event["end"] == start:
+                event["end"] = end
+                continue
+            event = {
+                "day": row[0],
+                "start": start,
+                "end": end,
+                "subject": cell,
+                "room": room if room != "X" else None,
+                "teacher": teachers.get(cell),
+            }
+            events.append(event)
+    return events
+
+
+def escapeText(text):
+    """
+    ```escapeText(text: str) -> str``` <br/>
+    Escapes a string so that it can be written as an iCalendar TEXT value.
+    """
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def foldLine(line):
+    """
+    ```foldLine(line: str) -> str``` <br/>
+    Folds a content line longer than 75 octets into continuation lines (starting with a space), without
+    splitting a UTF-8 character.
+    """
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # A continuation byte (10xxxxxx) never starts a part.
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74
+    return "\r\n ".join(parts)
+
+
+def renderICS(name, table, teachers, uid, start=None, end=TERM_END):
+    """
+    ```renderICS(name: str, table: list, teachers: dict, uid: str, start: datetime.date, end: datetime.date) -> bytes``` <br/>
+    Writes a 2D timetable as an iCalendar file named ```name```, with one weekly event per class (see
+    ```timetableEvents```) from the first of its days on or after ```start``` (see ```termStart```) and until
+    ```end``` (for ever when None). The ids of the events are ```uid``` followed by their day and hour, so that
+    importing the file again updates them rather than adding them twice.
+    """
+    start = start or termStart()
+    offset = utcOffset()
+    tzOffset = "%s%02d%02d" % (
+        "-" if offset < datetime.timedelta(0) else "+",
+        abs(offset).seconds // 3600,
+        abs(offset).seconds // 60 % 60,
+    )
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    rule = "FREQ=WEEKLY"
+    if end is not None:
+        # With a local start time, the end of the recurrence has to be given in UTC.
+        until = datetime.datetime.combine(end, datetime.time(23, 59, 59)) - offset
+        rule += ";UNTIL=" + until.strftime("%Y%m%dT%H%M%SZ")
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:" + PRODID,
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:" + escapeText(name),
+        "X-WR-TIMEZONE:" + TIMEZONE,
+        "BEGIN:VTIMEZONE",
+        "TZID:" + TIMEZONE,
+        "BEGIN:STANDARD",
+        "DTSTART:19700101T000000",
+        "TZOFFSETFROM:" + tzOffset,
+        "TZOFFSETTO:" + tzOffset,
+        "END:STANDARD",
+        "END:VTIMEZONE",
+    ]
+    for event in timetableEvents(table, teachers):
+        if event["day"] not in WEEKDAYS:
+            continue
+        date = start + datetime.timedelta(
+            days=(WEEKDAYS[event["day"]] - start.weekday()) % 7
+        )
+        day = date.strftime("%Y%m%d")
+        description = [event["subject"]]
+        if event["room"] is not None:
+            description.append("Room : " + event["room"])
+        if event["teacher"] is not None:
+            description.append("Teacher : " + event["teacher"])
+        lines += [
+            "BEGIN:VEVENT",
+            "UID:%s-%s-%02d@dhundo" % (uid, event["day"], event["start"]),
+            "DTSTAMP:" + stamp,
+            "DTSTART;TZID=%s:%sT%02d0000" % (TIMEZONE, day, event["start"]),
+            "DTEND;TZID=%s:%sT%02d0000" % (TIMEZONE, day, event["end"]),
+            "RRULE:" + rule,
+            "SUMMARY:" + escapeText(event["subject"]),
+        ]
+        if event["room"] is not None:
+            lines.append("LOCATION:" + escapeText(event["room"]))
+        lines += [
+            "DESCRIPTION:" + escapeText("\n".join(description)),
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(foldLine(line) for line in lines) + "\r\n").encode()
@@ -0,0 +1,665 @@
+# Importing **dependencies** and **modules**
+import os
+import re
+import csv
+import tempfile
+from itertools import chain
+from app.config import SCHEDULE_PATH, TEACHER_PATH
+
+# This module turns the raw timetable sheets of the university (Excel workbooks or CSV exports) into the
+# **dhundo_db.csv** and **dhundo_teacher_db.csv** files the app is served from. The sheets are read row by row and
+# every row is written out as soon as it is checked, so even a whole university workbook is ingested in bounded
+# memory. Columns are found by their header (in any order, under any of their usual names) rather than by
+# position, and every rejected or suspicious row is listed in an error report instead of stopping the ingestion.
+
+# The **SCHEDULE_HEADER** is the header of the schedule file written, exactly as in **dhundo_db.csv**.
+SCHEDULE_HEADER = [
+    "DAY",
+    "Section",
+    "ROOM1",
+    "8 to 9",
+    "9 to 10",
+    "10 to 11",
+    "ROOM2",
+    "11 to 12",
+    "12 to 1",
+    "1 to 2",
+    "Section(DE)",
+    "ROOM3",
+    "3 to 4",
+    "ROOM4",
+    "4 to 5",
+    "ROOM5",
+    "5 to 6",
+]
+
+# The **SCHEDULE_COLUMNS** are the normalized names of the columns (see ```normalizeHeader```).
+SCHEDULE_COLUMNS = [
+    " ".join(column.upper().replace("(", " (").split()).replace(" (", "(")
+    for column in SCHEDULE_HEADER
+]
+
+# The **SCHEDULE_ALIASES** list the other names (normalized, see ```normalizeHeader```) under which the columns of
+# the schedule are found in the sheets of the university. The slot columns are also found from any spelling of
+# their hours (08:00 - 08:55, 8-9 AM ...).
+SCHEDULE_ALIASES = {
+    "DAY": ["DAYS", "WEEKDAY", "WEEK DAY"],
+    "SECTION": ["CLASS", "SECTION NAME", "SEC"],
+    "ROOM1": ["ROOM", "MORNING ROOM", "ROOM (MORNING)"],
+    "ROOM2": ["AFTERNOON ROOM", "ROOM (AFTERNOON)"],
+    "SECTION(DE)": ["DE SECTION", "SECTION DE", "ELECTIVE SECTION", "DE"],
+    "ROOM3": ["DE ROOM1", "ELECTIVE ROOM1"],
+    "ROOM4": ["DE ROOM2", "ELECTIVE ROOM2"],
+    "ROOM5": ["DE ROOM3", "ELECTIVE ROOM3"],
+}
+
+# The **TEACHER_HEADER** names the two columns of the teacher file (which itself has no header), and the
+# **TEACHER_ALIASES** their other names.
+TEACHER_HEADER = ["CODE", "NAME"]
+TEACHER_ALIASES = {
+    "CODE": ["TEACHER CODE", "FACULTY CODE", "SECTION CODE", "ELECTIVE SECTION"],
+    "NAME": ["TEACHER", "TEACHER NAME", "FACULTY", "FACULTY NAME"],
+}
+
+# The **ROOM_BLOCKS** pair every room column with the slot columns it is the room of (see **ROOM_SLOTS**).
+ROOM_BLOCKS = [
+    ("ROOM1", ["8 TO 9", "9 TO 10", "10 TO 11"]),
+    ("ROOM2", ["11 TO 12", "12 TO 1", "1 TO 2"]),
+    ("ROOM3", ["3 TO 4"]),
+    ("ROOM4", ["4 TO 5"]),
+    ("ROOM5", ["5 TO 6"]),
+]
+ELECTIVE_SLOTS = ["3 TO 4", "4 TO 5", "5 TO 6"]
+
+# The **DAYS** of the week, by any of their names.
+DAYS = {
+    "MON": "MON",
+    "MONDAY": "MON",
+    "TUE": "TUE",
+    "TUES": "TUE",
+    "TUESDAY": "TUE",
+    "WED": "WED",
+    "WEDNESDAY": "WED",
+    "THU": "THU",
+    "THUR": "THU",
+    "THURS": "THU",
+    "THURSDAY": "THU",
+    "FRI": "FRI",
+    "FRIDAY": "FRI",
+    "SAT": "SAT",
+    "SATURDAY": "SAT",
+}
+
+SECTION_PATTERN = re.compile(r"([A-Z]+)\s*[-_ ]?\s*(\d+)")
+ELECTIVE_SECTION_PATTERN = re.compile(r"([A-Z0-9]+)\s*_\s*([A-Z]+)\s*-?\s*(\d+)")
+TEACHER_CODE_PATTERN = re.compile(r"([A-Z0-9]+)\s*_\s*([A-Z]+)\s*-?\s*(\d+)")
+HOURS_PATTERN = re.compile(
+    r"(\d{1,2})(?:[:.](\d{2}))?\s*(?:AM|PM)?\s*(?:-|TO)\s*(\d{1,2})(?:[:.](\d{2}))?\s*(?:AM|PM)?"
+)
+
+# A header row is looked for among the first **HEADER_SEARCH_ROWS** rows of a sheet, as the sheets of the
+# university often start with a title.
+HEADER_SEARCH_ROWS = 20
+
+
+class IngestError(Exception):
+    """
+    ```IngestError``` <br/>
+    Raised when a sheet cannot be ingested at all (unreadable file, no header row, missing optional dependency).
+    Problems of single rows are reported instead (see ```Report```).
+    """
+
+
+# The **REPORT_FIELDS** are the columns of the error report, and **REPORT_SAMPLE** the number of problems kept in
+# memory (to be printed) : the others are only written to the report file, if any.
+REPORT_FIELDS = ["level", "source", "row", "column", "value", "message"]
+REPORT_SAMPLE = 20
+
+
+class Report:
+    """
+    ```Report(path: str)``` <br/>
+    The row level report of an ingestion : every rejected row (**error**) or accepted but suspicious row
+    (**warning**), along with the number of rows read and written per file. The problems are written to the CSV
+    file ```path``` (if given) as they are found, only their counts and the first **REPORT_SAMPLE** of them being
+    kept in memory, so that the report of a whole university workbook stays small. Must be closed (or used as a
+    context manager) when given a ```path```.
+    """
+
+    def __init__(self, path=None):
+        self.problems = []
+        self.counts = {}
+        self.errors = self.warnings = 0
+        self.path, self._file, self._writer = path, None, None
+        if path is not None:
+            self._file = open(path, "w", newline="")
+            self._writer = csv.DictWriter(self._file, REPORT_FIELDS)
+            self._writer.writeheader()
+
+    def add(self, level, source, row, column, value, message):
+        problem = dict(zip(REPORT_FIELDS, (level, source, row, column, value, message)))
+        if level == "error":
+            self.errors += 1
+        else:
+            self.warnings += 1
+        if self._writer is not None:
+            self._writer.writerow(problem)
+        if len(self.problems) < REPORT_SAMPLE:
+            self.problems.append(problem)
+
+    def count(self, output, read, written):
+        self.counts[output] = {"read": read, "written": written}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def normalizeHeader(text):
+    """
+    ```normalizeHeader(text: str) -> str``` <br/>
+    Normalizes a column header for matching : uppercase with single spaces, ```ROOM 1``` as ```ROOM1```,
+    ```Section (DE)``` as ```SECTION(DE)``` and the hours of a slot as ```8 TO 9``` (rounded to the hour, on a 12
+    hour clock).
+    """
+    text = str(text).upper().replace("–", "-")
+    text = " ".join(re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text).split())
+    text = re.sub(r"\s+\(", "(", text)
+    text = re.sub(r"\bROOM\s+(\d)", r"ROOM\1", text)
+    hours = HOURS_PATTERN.fullmatch(text)
+    if hours is not None:
+        start, startMinutes, end, endMinutes = hours.groups()
+        start = int(start) + (1 if startMinutes and int(startMinutes) >= 30 else 0)
+        end = int(end) + (1 if endMinutes and int(endMinutes) >= 30 else 0)
+        text = "%d TO %d" % ((start - 1) % 12 + 1, (end - 1) % 12 + 1)
+    return text
+
+
+def normalizeCell(value):
+    """
+    ```normalizeCell(value: object) -> str``` <br/>
+    Turns a cell of a sheet into text : numbers without a useless ```.0```, surrounding spaces removed and an empty
+    cell as ```X```, the way the schedule marks free slots.
+    """
+    if value is None:
+        return "X"
+    if type(value) is not str:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value)
+    text = " ".join(value.split())
+    return text if text and text != "-" else "X"
+
+
+def readSheetRows(path, sheet=None):
+    """
+    ```readSheetRows(path: str, sheet: str) -> iterator``` <br/>
+    Yields the rows of a sheet one at a time, as lists of cell values. CSV files are read as they are, while Excel
+    workbooks (.xlsx) are streamed with **openpyxl** in read only mode, from the given ```sheet``` or the first one.
+    """
+    if os.path.splitext(path)[1].lower() not in (".xlsx", ".xlsm"):
+        with open(path, newline="", encoding="utf-8-sig") as data:
+            yield from csv.reader(data)
+        return
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise IngestError(
+            "reading Excel workbooks needs openpyxl (pip install openpyxl)"
+        )
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet is not None and sheet not in workbook.sheetnames:
+            raise IngestError("%s has no sheet named %s" % (path, sheet))
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        for row in worksheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def sheetNames(path):
+    """
+    ```sheetNames(path: str) -> list``` <br/>
+    Returns the names of the sheets of an Excel workbook, or ```[None]``` for a CSV file (which is a single sheet).
+    """
+    if os.path.splitext(path)[1].lower() not in (".xlsx", ".xlsm"):
+        return [None]
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise IngestError(
+            "reading Excel workbooks needs openpyxl (pip install openpyxl)"
+        )
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def mapColumns(header, columns, aliases, overrides=None):
+    """
+    ```mapColumns(header: list, columns: list, aliases: dict, overrides: dict) -> dict``` <br/>
+    Maps every (normalized) column of ```columns``` to its index in a header row of a sheet, through its own name,
+    its ```aliases``` or the header given for it in ```overrides```. Columns which are not found are left out.
+    """
+    positions = {}
+    for index, text in enumerate(header):
+        if text is not None and normalizeHeader(text) not in positions:
+            positions[normalizeHeader(text)] = index
+    overrides = {
+        normalizeHeader(column): normalizeHeader(name)
+        for column, name in (overrides or {}).items()
+    }
+
+    column_map = {}
+    for column in columns:
+        column = normalizeHeader(column)
+        names = [overrides[column]] if column in overrides else []
+        names += [column] + [
+            normalizeHeader(alias) for alias in aliases.get(column, [])
+        ]
+        for name in names:
+            if name in positions and positions[name] not in column_map.values():
+                column_map[column] = positions[name]
+                break
+    return column_map
+
+
+def findHeader(rows, columns, aliases, overrides=None):
+    """
+    ```findHeader(rows: iterator, columns: list, aliases: dict, overrides: dict) -> (int, dict)``` <br/>
+    Reads rows until the header row, the first one where every column is found (see ```mapColumns```). Returns its
+    (1 based) row number and the column map, the rows after it being left in ```rows```. Raises an IngestError
+    naming the missing columns when no header is found among the first **HEADER_SEARCH_ROWS** rows.
+    """
+    best = {}
+    for number, row in enumerate(rows, 1):
+        column_map = mapColumns(row, columns, aliases, overrides)
+        if len(column_map) == len(columns):
+            return number, column_map
+        if len(column_map) > len(best):
+            best = column_map
+        if number >= HEADER_SEARCH_ROWS:
+            break
+    missing = [
+        column
+        for column in (normalizeHeader(column) for column in columns)
+        if column not in best
+    ]
+    raise IngestError(
+        "no header row found, missing the columns %s" % ", ".join(missing)
+    )
+
+
+def normalizeScheduleRow(cells, report, source, number):
+    """
+    ```normalizeScheduleRow(cells: dict, report: Report, source: str, number: int) -> list``` <br/>
+    Checks and normalizes a row of the schedule (the cells of every normalized column) : full day names are
+    shortened (MONDAY -> MON), section codes are spelled like ```CSE-21``` and ```CRP_CS-4```, and elective slots
+    end with ```(DE)```. Returns the row in the order of **SCHEDULE_HEADER**, or None when it is rejected, the
+    reasons being added to the ```report```.
+    """
+    rejected = False
+
+    def problem(level, column, message):
+        report.add(level, source, number, column, cells[column], message)
+
+    day = DAYS.get(cells["DAY"].upper())
+    if day is None:
+        problem("error", "DAY", "unknown day")
+        rejected = True
+    cells["DAY"] = day
+
+    section = cells["SECTION"].upper()
+    if section != "X":
+        match = SECTION_PATTERN.fullmatch(section)
+        if match is None:
+            problem("error", "SECTION", "not a section (e.g. CSE-21)")
+            rejected = True
+        else:
+            section = "%s-%d" % (match.group(1), int(match.group(2)))
+    cells["SECTION"] = section
+
+    electiveSection = cells["SECTION(DE)"].upper()
+    if electiveSection != "X":
+        match = ELECTIVE_SECTION_PATTERN.fullmatch(electiveSection)
+        if match is None:
+            problem("error", "SECTION(DE)", "not an elective section (e.g. CRP_CS-4)")
+            rejected = True
+        else:
+            electiveSection = "%s_%s-%d" % (
+                match.group(1),
+                match.group(2),
+                int(match.group(3)),
+            )
+    cells["SECTION(DE)"] = electiveSection
+
+    if section == "X" and electiveSection == "X":
+        problem("error", "SECTION", "neither a section nor an elective section")
+        rejected = True
+
+    for slot in ELECTIVE_SLOTS:
+        elective = cells[slot].upper()
+        if elective != "X" and not elective.endswith("(DE)"):
+            elective = elective + "(DE)"
+        cells[slot] = elective
+    if electiveSection == "X" and any(cells[slot] != "X" for slot in ELECTIVE_SLOTS):
+        problem("error", "SECTION(DE)", "electives without an elective section")
+        rejected = True
+
+    for room, slots in ROOM_BLOCKS:
+        if room in ("ROOM1", "ROOM2") and section == "X":
+            if any(cells[slot] != "X" for slot in slots):
+                problem("error", "SECTION", "classes without a section")
+                rejected = True
+        booked = any(cells[slot] != "X" for slot in slots)
+        if booked and cells[room] == "X":
+            problem("warning", room, "classes without a room")
+        elif not booked and cells[room] != "X":
+            problem("warning", room, "a room without classes")
+
+    if rejected:
+        return None
+    return [cells[column] for column in SCHEDULE_COLUMNS]
+
+
+def normalizeTeacherRow(cells, report, source, number):
+    """
+    ```normalizeTeacherRow(cells: dict, report: Report, source: str, number: int) -> list``` <br/>
+    Checks and normalizes a row of the teacher sheet : the code of the elective section spelled like
+    ```CRP_CS4``` and the name of its teacher. Returns the row, or None when it is rejected.
+    """
+    match = TEACHER_CODE_PATTERN.fullmatch(cells["CODE"].upper())
+    if match is None:
+        report.add(
+            "error",
+            source,
+            number,
+            "CODE",
+            cells["CODE"],
+            "not a teacher code (e.g. CRP_CS4)",
+        )
+        return None
+    if cells["NAME"] == "X":
+        report.add("error", source, number, "NAME", cells["NAME"], "no teacher name")
+        return None
+    return [
+        "%s_%s%d" % (match.group(1), match.group(2), int(match.group(3))),
+        cells["NAME"],
+    ]
+
+
+def teacherColumns(row):
+    """
+    ```teacherColumns(row: list) -> dict``` <br/>
+    Returns the column map of a teacher sheet without a header (like the teacher file itself), whose first
+    ```row``` already holds a teacher code and a name, or None when the row is not one.
+    """
+    if len(row) < 2 or row[1] is None:
+        return None
+    if TEACHER_CODE_PATTERN.fullmatch(normalizeCell(row[0]).upper()) is None:
+        return None
+    return {"CODE": 0, "NAME": 1}
+
+
+def ingestSheets(
+    sources,
+    output,
+    columns,
+    aliases,
+    normalizeRow,
+    uniqueKeys,
+    report,
+    header=None,
+    overrides=None,
+    strict=False,
+    headerless=None,
+):
+    """
+    ```ingestSheets(sources: list, output: str, columns: list, aliases: dict, normalizeRow: function, uniqueKeys: function, report: Report, header: list, overrides: dict, strict: bool, headerless: function) -> int``` <br/>
+    Streams the rows of every ```(path, sheet)``` of ```sources``` into the CSV file ```output``` (after an optional
+    ```header```), through ```normalizeRow```. A sheet whose first row gets a column map from ```headerless``` has no
+    header : that row is read as data. Rows with one of their ```uniqueKeys``` already written are rejected
+    as duplicates. The file is written next to ```output``` and only replaces it once complete, and with
+    ```strict``` only when no row was rejected. Returns the number of rows written.
+    """
+    errors = report.errors
+    read = written = 0
+    seen = set()
+    directory = os.path.dirname(os.path.abspath(output))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".csv")
+    try:
+        with os.fdopen(descriptor, "w", newline="") as data:
+            writer = csv.writer(data, lineterminator="\n")
+            if header is not None:
+                writer.writerow(header)
+            for path, sheet in sources:
+                source = os.path.basename(path) + (":" + sheet if sheet else "")
+                sheetRows = readSheetRows(path, sheet)
+                # The sheet (an openpyxl workbook) is closed along with its rows, even when they are not all read.
+                try:
+                    first = next(sheetRows, None)
+                    column_map = None
+                    if headerless is not None and first is not None:
+                        column_map = headerless(first)
+                    # The first row is put back in front of the others, to be read as data or searched for a header.
+                    rows = chain([first] if first is not None else [], sheetRows)
+                    if column_map is not None:
+                        start = 0
+                    else:
+                        try:
+                            start, column_map = findHeader(
+                                rows, columns, aliases, overrides
+                            )
+                        except IngestError as error:
+                            report.add("error", source, None, None, None, str(error))
+                            continue
+                    positions = list(column_map.items())
+                    width = max(column_map.values()) + 1
+                    for number, row in enumerate(rows, start + 1):
+                        if len(row) < width:
+                            row = list(row) + [None] * (width - len(row))
+                        cells = {
+                            column: normalizeCell(row[index])
+                            for column, index in positions
+                        }
+                        # Blank rows (or rows with values only outside of the columns) are skipped.
+                        if all(value == "X" for value in cells.values()):
+                            continue
+                        read += 1
+                        normalized = normalizeRow(cells, report, source, number)
+                        if normalized is None:
+                            continue
+                        keys = uniqueKeys(normalized)
+                        duplicates = [key for key in keys if key in seen]
+                        if duplicates:
+                            report.add(
+                                "error",
+                                source,
+                                number,
+                                None,
+                                " ".join(duplicates[0]),
+                                "listed twice",
+                            )
+                            continue
+                        seen.update(keys)
+                        writer.writerow(normalized)
+                        written += 1
+                finally:
+                    sheetRows.close()
+        if strict and report.errors > errors:
+            raise IngestError("%s left unchanged, rows were rejected" % output)
+        if not written:
+            raise IngestError("%s left unchanged, no row was read" % output)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, output)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    finally:
+        report.count(output, read, written)
+    return written
+
+
+def scheduleKeys(row):
+    """
+    ```scheduleKeys(row: list) -> list``` <br/>
+    Returns the keys a normalized schedule row may not share with another one : a day lists every section and
+    every elective section once.
+    """
+    day, section, electiveSection = row[0], row[1], row[10]
+    return [(day, code) for code in (section, electiveSection) if code != "X"]
+
+
+def ingestSchedule(
+    sources, output=SCHEDULE_PATH, report=None, overrides=None, strict=False
+):
+    """
+    ```ingestSchedule(sources: list, output: str, report: Report, overrides: dict, strict: bool) -> Report``` <br/>
+    Ingests the ```(path, sheet)``` schedule sheets of ```sources``` into the schedule file ```output``` (see
+    ```ingestSheets```).
+    """
+    report = report if report is not None else Report()
+    ingestSheets(
+        sources,
+        output,
+        SCHEDULE_COLUMNS,
+        SCHEDULE_ALIASES,
+        normalizeScheduleRow,
+        scheduleKeys,
+        report,
+        header=SCHEDULE_HEADER,
+        overrides=overrides,
+        strict=strict,
+    )
+    return report
+
+
+def ingestTeachers(
+    sources, output=TEACHER_PATH, report=None, overrides=None, strict=False
+):
+    """
+    ```ingestTeachers(sources: list, output: str, report: Report, overrides: dict, strict: bool) -> Report``` <br/>
+    Ingests the ```(path, sheet)``` teacher sheets of ```sources``` into the teacher file ```output```, every
+    teacher code being listed once (see ```ingestSheets```). Sheets without a header, like the teacher file
+    itself, are read as code and name columns (see ```teacherColumns```).
+    """
+    report = report if report is not None else Report()
+    ingestSheets(
+        sources,
+        output,
+        TEACHER_HEADER,
+        TEACHER_ALIASES,
+        normalizeTeacherRow,
+        lambda row: [(row[0],)],
+        report,
+        overrides=overrides,
+        strict=strict,
+        headerless=teacherColumns,
+    )
+    return report
+
+
+def parseSources(path, sheets):
+    """
+    ```parseSources(path: str, sheets: list) -> list``` <br/>
+    Returns the ```(path, sheet)``` sources of a file : the given ```sheets```, or every sheet of a workbook.
+    """
+    return [(path, sheet) for sheet in (sheets or sheetNames(path))]
+
+
+# Ingests the raw sheets into the files the app is served from :
+# python -m app.ingest --schedule timetable.xlsx --teachers teachers.xlsx --errors errors.csv
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Checks and normalizes raw schedule and teacher sheets (.xlsx or .csv) into the CSV files of the app."
+    )
+    parser.add_argument("--schedule", help="schedule workbook or CSV file")
+    parser.add_argument(
+        "--schedule-sheet",
+        action="append",
+        help="sheet of the schedule workbook (repeatable, default : every sheet)",
+    )
+    parser.add_argument("--teachers", help="teacher workbook or CSV file")
+    parser.add_argument(
+        "--teacher-sheet",
+        action="append",
+        help="sheet of the teacher workbook (repeatable, default : every sheet)",
+    )
+    parser.add_argument(
+        "--schedule-output", default=SCHEDULE_PATH, help="default : DHUNDO_SCHEDULE_CSV"
+    )
+    parser.add_argument(
+        "--teacher-output", default=TEACHER_PATH, help="default : DHUNDO_TEACHER_CSV"
+    )
+    parser.add_argument(
+        "--column",
+        action="append",
+        default=[],
+        metavar="COLUMN=HEADER",
+        help="header of a column in the sheets, e.g. '8 to 9=First Period' (repeatable)",
+    )
+    parser.add_argument("--errors", help="CSV file for the row level report")
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="leave the files unchanged and exit with status 1 when any row is rejected",
+    )
+    arguments = parser.parse_args()
+    if not arguments.schedule and not arguments.teachers:
+        parser.error("nothing to ingest, give --schedule and / or --teachers")
+    overrides = dict(column.split("=", 1) for column in arguments.column)
+
+    report, failure = Report(arguments.errors), None
+    try:
+        if arguments.schedule:
+            ingestSchedule(
+                parseSources(arguments.schedule, arguments.schedule_sheet),
+                arguments.schedule_output,
+                report,
+                overrides,
+                arguments.strict,
+            )
+        if arguments.teachers:
+            ingestTeachers(
+                parseSources(arguments.teachers, arguments.teacher_sheet),
+                arguments.teacher_output,
+                report,
+                overrides,
+                arguments.strict,
+            )
+    except (IngestError, OSError) as error:
+        failure = "ingestion failed : %s" % error
+    finally:
+        report.close()
+
+    for output, counts in report.counts.items():
+        print(
+            "%s : %d of %d rows written" % (output, counts["written"], counts["read"])
+        )
+    print("%d errors, %d warnings" % (report.errors, report.warnings))
+    if arguments.errors:
+        print("report written to", arguments.errors)
+    else:
+        for problem in report.problems:
+            print(
+                "  %(level)s %(source)s row %(row)s %(column)s %(value)r : %(message)s"
+                % problem
+            )
+    if failure is not None:
+        raise SystemExit(failure)
+    if arguments.strict and report.errors:
+        sys.exit(1)
@@ -0,0 +1,211 @@
+# Importing **dependencies** and **modules**
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.batch import renderTimetable
+from app.cache import keyDigest, renderKey
+from app.config import JOB_WORKERS, JOB_QUEUE_MAX, JOB_TTL
+from app.dataset import timetableDependencies
+from app.metrics import Counter, Gauge
+from app.prewarm import recordRequest
+
+# Render **jobs** let a client ask for a timetable without holding a web worker while it is rendered : the job
+# is queued, rendered by a bounded pool of processes, and its result is fetched once it is done. The id of a
+# job is the digest of its cache key, so identical requests share one job, and the result of a job can be read
+# from the cache directory by any worker.
+
+JOBS = Counter(
+    "dhundo_jobs_total",
+    "Render jobs by outcome : accepted, deduplicated, cached, rejected, done and failed.",
+    ("result",),
+)
+JOBS_PENDING = Gauge(
+    "dhundo_jobs_pending", "Render jobs queued or running in this worker."
+)
+
+
+class QueueFull(Exception):
+    """
+    ```QueueFull``` <br/>
+    Raised when a job is submitted while **JOB_QUEUE_MAX** jobs are already queued or running.
+    """
+
+
+class Job:
+    """
+    ```Job(id: str, key: tuple, dependencies: tuple)``` <br/>
+    A render job : its state (```queued```, ```running```, ```done``` or ```failed```), and once it is over the
+    name and bytes of the pdf or the error message.
+    """
+
+    def __init__(self, id, key, dependencies):
+        self.id = id
+        self.key = key
+        self.dependencies = dependencies
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def state(self):
+        if self.done.is_set():
+            return "failed" if self.error is not None else "done"
+        return (
+            "running" if self.future is not None and self.future.running() else "queued"
+        )
+
+    def describe(self):
+        """
+        ```describe() -> dict``` <br/>
+        Returns the job as JSON friendly data.
+        """
+        description = {"id": self.id, "state": self.state, "created": self.created}
+        if self.finished is not None:
+            description["finished"] = self.finished
+            description["seconds"] = self.finished - self.created
+        if self.error is not None:
+            description["error"] = self.error
+        if self.result is not None:
+            description["name"] = self.result[0]
+        return description
+
+
+class JobQueue:
+    """
+    ```JobQueue(cache: RenderCache, workers: int, maxPending: int, ttl: float)``` <br/>
+    Queue of render jobs run by a pool of ```workers``` processes (started on the first job). At most
+    ```maxPending``` jobs are queued or running at once, a job identical to a pending one is not queued again,
+    and finished jobs are forgotten ```ttl``` seconds later (their pdf stays in the **cache**).
+    """
+
+    def __init__(
+        self, cache, workers=JOB_WORKERS, maxPending=JOB_QUEUE_MAX, ttl=JOB_TTL
+    ):
+        self.cache = cache
+        self.workers = workers
+        self.maxPending = maxPending
+        self.ttl = ttl
+        self.jobs = {}
+        self.pending = 0
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, request, dataset):
+        """
+        ```submit(request: tuple, dataset: dict) -> (Job, bool)``` <br/>
+        Submits a render job for a timetable request (a tuple of ```REQUEST_FIELDS```). Returns the job along
+        with whether it is a new one : the job already pending (or done) for the same timetable is returned
+        instead of queueing it again, while a failed one is tried again. Raises QueueFull when too many jobs are
+        pending.
+        """
+        key = renderKey(dataset, *request)
+        id = keyDigest(key)
+        # The cache (which may read from the disk) is looked up before taking the lock, so that it never holds up
+        # the other submissions.
+        cached = self.cache.get(key)
+        with self._lock:
+            self._purge()
+            job = self.jobs.get(id)
+            if job is not None and job.error is None:
+                JOBS.inc(result="deduplicated")
+                return job, False
+
+            job = Job(id, key, timetableDependencies(dataset, *request))
+            if cached is not None:
+                JOBS.inc(result="cached")
+                self._finish(job, cached, None)
+                self.jobs[id] = job
+                return job, True
+
+            if self.pending >= self.maxPending:
+                JOBS.inc(result="rejected")
+                raise QueueFull()
+            try:
+                pool = self.getPool()
+                job.future = pool.submit(renderTimetable, request, dataset["version"])
+            except BrokenProcessPool:
+                # A render process died while the pool was idle : it is replaced.
+                self.pool = None
+                pool = self.getPool()
+                job.future = pool.submit(renderTimetable, request, dataset["version"])
+            self.jobs[id] = job
+            self.pending += 1
+            JOBS_PENDING.set(self.pending)
+            JOBS.inc(result="accepted")
+        job.future.add_done_callback(lambda future: self._completed(job, future, pool))
+        return job, True
+
+    def getPool(self):
+        """
+        ```getPool() -> ProcessPoolExecutor``` <br/>
+        Returns the pool of render processes, starting it on first use. Must be called with the lock held.
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def _completed(self, job, future, pool):
+        """
+        ```_completed(job: Job, future: Future, pool: ProcessPoolExecutor)``` <br/>
+        Stores the result of a rendered job in the cache (counting its request, see ```recordRequest```) and wakes
+        up the requests waiting for it.
+        """
+        try:
+            pdfName, pdfBytes, error = future.result()
+        except Exception as failure:
+            pdfName, pdfBytes, error = None, None, "render failed : %r" % failure
+            if isinstance(failure, BrokenProcessPool):
+                # A render process died : the next job starts a new pool.
+                with self._lock:
+                    if self.pool is pool:
+                        self.pool = None
+                pool.shutdown(wait=False)
+        if error is None:
+            self.cache.put(job.key, pdfName, pdfBytes, dependencies=job.dependencies)
+            recordRequest(job.key[-6:])
+        with self._lock:
+            self.pending -= 1
+            JOBS_PENDING.set(self.pending)
+            self._finish(job, (pdfName, pdfBytes) if error is None else None, error)
+
+    def _finish(self, job, result, error):
+        """
+        ```_finish(job: Job, result: tuple, error: str)``` <br/>
+        Marks a job as over. Must be called with the lock held.
+        """
+        job.result, job.error = result, error
+        job.finished = time.time()
+        JOBS.inc(result="failed" if error is not None else "done")
+        job.done.set()
+
+    def _purge(self):
+        """
+        ```_purge()``` <br/>
+        Forgets the jobs which finished more than ```ttl``` seconds ago. Must be called with the lock held.
+        """
+        expired = time.time() - self.ttl
+        for id in [
+            id
+            for id, job in self.jobs.items()
+            if job.finished is not None and job.finished < expired
+        ]:
+            del self.jobs[id]
+
+    def get(self, id):
+        """
+        ```get(id: str) -> Job``` <br/>
+        Returns a job of this worker, or None when it is unknown (or was forgotten).
+        """
+        with self._lock:
+            return self.jobs.get(id)
+
+    def wait(self, job, timeout):
+        """
+        ```wait(job: Job, timeout: float) -> bool``` <br/>
+        Waits at most ```timeout``` seconds for a job to be over. Returns whether it is.
+        """
+        return job.done.wait(max(0.0, timeout))
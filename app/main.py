@@ -1,383 +1,681 @@
 # Importing **dependencies** and **modules**
 import os
-import csv
-import glob
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-from flask import Flask, send_file, request, redirect
+import hmac
+import time
+import logging
+import multiprocessing
+from io import BytesIO
+from flask import Flask, Response, send_file, request, redirect, stream_with_context
+from flask import g, jsonify
+from app.batch import REQUEST_FIELDS, parseBatch, renderBatch, renderBatchPDF
+from app.batch import streamZip
+from app.cache import RenderCache, keyDigest, renderKey, normalizeRequest
+from app.clash import compatibleElectives, electiveClashes
+from app.config import CACHE_MAX_BYTES, CACHE_DIR, BATCH_MAX_REQUESTS, ADMIN_TOKEN
+from app.config import PREWARM_ON_START, PREWARM_INTERVAL, WATCH_INTERVAL, JSON_MAX_AGE
+from app.config import META_MAX_AGE, LOG_LEVEL, JOB_MAX_WAIT, PRELOAD
+from app.dataset import getDataset, reloadDataset, watchDataset, onReload
+from app.dataset import DEPENDENCY_KINDS, datasetChanges, timetableDependencies
+from app.dataset import (
+    createTimetable,
+    apply2DTransform,
+    freeRooms,
+    normalizeName,
+    teacherSchedule,
+)
+from app.jobs import JobQueue, QueueFull
+from app.metadata import serializedMetadata
+from app.metrics import REQUESTS, REQUEST_SECONDS, CACHE_HIT_RATIO, CACHE_BYTES
+from app.metrics import CACHE_ENTRIES, DATASET_INFO, DATASET_ROWS, exposition, timed
+from app.prewarm import progress, recordRequest, startPrewarm
+from app.ical import termStart
+from app.renderer import EXPORT_FORMATS, TimeTableExporter
+
+# The messages of the app are logged at the level set by **DHUNDO_LOG_LEVEL** (the debug messages of the
+# request path are off by default), those of the libraries only from WARNING up.
+logging.basicConfig(format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+logging.getLogger("app").setLevel(LOG_LEVEL)
+logger = logging.getLogger(__name__)
 
 # Initializing **Flask App**
 app = Flask(__name__)
 
+# The **render_cache** keeps the most recently requested timetables as rendered PDF bytes.
+render_cache = RenderCache(CACHE_MAX_BYTES, CACHE_DIR)
 
-@app.route("/generateTimeTable")
-def generatePDF():
-    """
-    ```generatePDF(), URL: {BASE}/generateTimetable``` <br/>
-    Flask **API** Endpoint for generating the timetable 
-    """
-    _branch = request.args.get("_branch")
-    _section = request.args.get("_section")
-    _e1_code = request.args.get("_e1_code")
-    _e1_teacher = request.args.get("_e1_teacher")
-    _e2_code = request.args.get("_e2_code")
-    _e2_teacher = request.args.get("_e2_teacher")
-
-    # Removing the **older PDF files** which were generated as a result of repeated runs.
-    for parent, dirnames, filenames in os.walk("."):
-        for fn in filenames:
-            if fn.lower().endswith(".pdf"):
-                os.remove(os.path.join(parent, fn))
-
-    pdfName = TimeTableCreator(
-        _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher, rows
-    )
-    print("pdfName : ", pdfName)
-    print(os.listdir())
-    return send_file("../" + pdfName, as_attachment=True)
+# The **job_queue** renders the timetables asked for through ```/jobs``` in the background.
+job_queue = JobQueue(render_cache)
 
 
-@app.route("/download")
-def downloadFile():
+def startBackground():
     """
-    ```downloadFile(), URL: {BASE}/download``` <br/>
-    Dummy **API** Endpoint for testing file download from server. 
+    ```startBackground()``` <br/>
+    Starts the background threads of a worker : pre-warming the **render_cache** (see prewarm.py) and reloading
+    the dataset whenever the CSV files change.
     """
-    path = "Examples.pdf"
-    print("root path : ", path)
-    path = os.path.join(app.root_path, path)
-    print("root path : ", path)
-    return send_file("check.pdf", as_attachment=True)
+    if PREWARM_ON_START:
+        startPrewarm(getDataset, render_cache, PREWARM_INTERVAL)
+    if WATCH_INTERVAL:
+        watchDataset(WATCH_INTERVAL)
 
 
-@app.route("/form-data", methods=["POST"])
-def formData():
+@onReload
+def invalidateCache(older, newer):
     """
-    ```formData(), URL: {BASE}/form-data``` <br/>
-    Flask **API** Endpoint for form data submissions. Redirects user to the ```/generateTimetable``` 
-    URL based on given inputs. 
+    ```invalidateCache(older: dict, newer: dict)``` <br/>
+    Evicts from the **render_cache** the timetables built from data a reload changed (see ```datasetChanges```),
+    keeping all the others. With pre-warming enabled, the evicted pdfs (which were being asked for) are then
+    rendered again in the background from the newer data.
     """
-    _class = request.form.get("class")
-    _elective1 = request.form.get("elective1")
-    _elective2 = request.form.get("elective2")
+    changes = datasetChanges(older, newer)
+    evicted = render_cache.invalidate(changes)
+    if changes is None:
+        logger.info(
+            "dataset layout changed : %d cached timetables evicted", len(evicted)
+        )
+    else:
+        logger.info(
+            "dataset changed : %d sections, %d elective sections and %d teachers, %d cached timetables evicted",
+            *(
+                sum(kind == changed for changed, _ in changes)
+                for kind in DEPENDENCY_KINDS
+            ),
+            len(evicted),
+        )
+    # The processes of the batch and pre-warm pools reload their own dataset : only a web worker renders again.
+    if PREWARM_ON_START and multiprocessing.parent_process() is None:
+        startPrewarm(
+            getDataset,
+            render_cache,
+            # Only the pdf of single timetables are rendered again, not the other formats or the batches.
+            requests=[key[-6:] for key in evicted if key[0] == "pdf"],
+        )
 
-    if (
-        _class == "Select Class . . ."
-        or _elective1 == "Select Elective 1 . . ."
-        or _elective2 == "Select Elective 2 . . ."
-    ):
-        _class = "CSE 21"
-        _elective1 = "CI_CS 2"
-        _elective2 = "CRP_CS 4"
 
-    _branch, _section = _class.split()
-    _elective1, _elective2 = _elective1.split(), _elective2.split()
-    print("elective 1 :", _elective1, " elective 2 :", _elective2)
-    _e1_teacher, _e2_teacher = _elective1[1], _elective2[1]
-    _e1_code, _e2_code = _elective1[0].split("_")[0], _elective2[0].split("_")[0]
+# With **PRELOAD** this module is imported by the gunicorn master, where no thread may run when the workers are
+# forked : gunicorn.conf.py starts them in every worker instead.
+if not PRELOAD:
+    startBackground()
 
-    return redirect(
-        f"http://127.0.0.1:5000/generateTimeTable?_branch={_branch}&_section={_section}&_e1_code={_e1_code}&_e1_teacher={_e1_teacher}&_e2_code={_e2_code}&_e2_teacher={_e2_teacher}",
-        code=302,
+
+@app.before_request
+def startTimer():
+    g.start = time.perf_counter()
+
+
+@app.after_request
+def countRequest(response):
+    """
+    ```countRequest(response: Response) -> Response``` <br/>
+    Counts every answered request and its latency, by route (not by URL, so the number of series stays bounded).
+    """
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if "start" in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.start, endpoint=endpoint)
+    return response
+
+
+def isAdmin():
+    """
+    ```isAdmin() -> bool``` <br/>
+    Checks the ```X-Admin-Token``` header of the current request against **DHUNDO_ADMIN_TOKEN**.
+    """
+    return ADMIN_TOKEN is not None and hmac.compare_digest(
+        request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN
     )
 
 
-def listUpperTransform(l):
+def clashResponse(dataset, key):
     """
-    ```listUpperTransform(l: list) -> list``` <br/>
-    Takes a list of strings and converts all the constituent elements in it to uppercase
+    ```clashResponse(dataset: dict, key: tuple) -> (dict, int)``` <br/>
+    Returns the 409 response rejecting a request whose two electives meet in the same slot, before anything is
+    rendered, or None when they do not clash.
     """
-    return [elem.upper() for elem in l]
+    clashes = electiveClashes(dataset, key[-6:])
+    if not clashes:
+        return None
+    return {
+        "error": "the electives clash",
+        "clashes": [{"day": day, "slot": slot} for day, slot in clashes],
+    }, 409
 
-# The raw data containing all the class schedules is present in the **dhundo_db.csv** file
-# which is loaded onto the server and manipulated in order to create the timetable
-central_db = open("app/dhundo_db.csv")
-csvreader = csv.reader(central_db)
 
-# The raw data containing all the information of all the available teachers is present in
-# the **dhundo_teacher_db.csv** file which is loaded onto the server.
-teacher_db = open("app/dhundo_teacher_db.csv")
-teacher_csvreader = csv.reader(teacher_db)
+def unknownResponse(dataset=None, request=None):
+    """
+    ```unknownResponse(dataset: dict, request: tuple) -> (dict, int)``` <br/>
+    Returns the 404 response of a (normalized) request for a timetable which does not exist, because its branch
+    or section is unknown, or None when it exists. Without a request, returns the response itself, for the
+    timetables which could not be created.
+    """
+    if request is not None:
+        branch, section = request[:2]
+        if branch in dataset["meta_data"]["branch_to_elective"] and (
+            "%s-%s" % (branch, section) in dataset["index"]["sections"]
+        ):
+            return None
+    return {"error": "unknown branch, section or elective"}, 404
 
-# The **teacherData** list contains the entire data related to teachers as a 2D List
-teacherData = []
-for row in teacher_csvreader:
-    teacherData.append(row)
 
-# The **header** variable is used to store the names of all the column headers in the CSV file.
-header = listUpperTransform(next(csvreader))
+def exportFormat():
+    """
+    ```exportFormat() -> (str, bool)``` <br/>
+    Returns the format a timetable is asked for in (one of the **EXPORT_FORMATS**) : the ```format``` argument, or
+    else the best match of the ```Accept``` header (pdf for browsers and clients accepting anything), along with
+    whether it was chosen from the header. Returns None for an unknown ```format```.
+    """
+    _format = request.args.get("format")
+    if _format is not None:
+        _format = _format.strip().lower()
+        return (_format if _format in EXPORT_FORMATS else None), False
+    mimetype = request.accept_mimetypes.best_match(
+        list(EXPORT_FORMATS.values()), EXPORT_FORMATS["pdf"]
+    )
+    return next(name for name, type in EXPORT_FORMATS.items() if type == mimetype), True
 
-# The **rows** variable stores only the rows without storing the column headers.
-rows = []
-for row in csvreader:
-    rows.append(listUpperTransform(row))
 
-# The **header_map** variable is used to map indices to header names.
-header_map = {}
+@app.route("/generateTimeTable")
+def generatePDF():
+    """
+    ```generatePDF(), URL: {BASE}/generateTimetable``` <br/>
+    Flask **API** Endpoint for generating the timetable, as a pdf or in another of the **EXPORT_FORMATS**
+    (```format=ics```, ```svg``` or ```png```, or the ```Accept``` header).
+    """
+    with timed("parse"):
+        _format, negotiated = exportFormat()
+        if _format is None:
+            return {
+                "error": "unknown format",
+                "formats": list(EXPORT_FORMATS),
+            }, 400
+        # The timetable is keyed and rendered from the same normalized fields.
+        try:
+            (
+                _branch,
+                _section,
+                _e1_code,
+                _e1_teacher,
+                _e2_code,
+                _e2_teacher,
+            ) = normalizeRequest(*(request.args.get(field) for field in REQUEST_FIELDS))
+        except ValueError as error:
+            return {"error": str(error)}, 400
+        dataset = getDataset()
+
+        key = renderKey(
+            dataset,
+            _branch,
+            _section,
+            _e1_code,
+            _e1_teacher,
+            _e2_code,
+            _e2_teacher,
+        )
+    with timed("clash_check"):
+        clash = unknownResponse(dataset, key[-6:]) or clashResponse(dataset, key)
+    if clash is not None:
+        return clash
+    if _format == "ics":
+        # The dates of the events depend on the week the term starts in.
+        key = ("ics", termStart().isoformat()) + key[1:]
+    elif _format != "pdf":
+        key = (_format,) + key[1:]
+
+    # Serving the timetable straight from the **render_cache** when it was already rendered.
+    with timed("cache_lookup"):
+        cached = render_cache.get(key)
+    if cached is None:
+        # The timetable is rendered into memory, so concurrent requests (and workers) never
+        # share or delete each other's files. Identical requests arriving while it is rendered
+        # wait for this render instead of starting their own.
+        try:
+            fileName, fileBytes = render_cache.coalesce(
+                key,
+                lambda: TimeTableExporter(
+                    _format,
+                    _branch,
+                    _section,
+                    _e1_code,
+                    _e1_teacher,
+                    _e2_code,
+                    _e2_teacher,
+                    dataset,
+                ),
+                dependencies=timetableDependencies(dataset, *key[-6:]),
+            )
+        except (KeyError, TypeError):
+            return unknownResponse()
+        logger.debug("served %s", fileName)
+    else:
+        fileName, fileBytes = cached
+    # Only timetables which were served count towards their popularity.
+    recordRequest(key[-6:])
+
+    with timed("send"):
+        # The calendar and the pdf are downloaded, the images shown in the page.
+        response = send_file(
+            BytesIO(fileBytes),
+            mimetype=EXPORT_FORMATS[_format],
+            as_attachment=_format in ("pdf", "ics"),
+            download_name=fileName,
+        )
+        if negotiated:
+            response.vary.add("Accept")
+        return response
 
 
-# The **meta_data** dictionary acts as a cache for frequently accessed data.
-meta_data = {}
-meta_data["branch_noOfSections"] = {}
-meta_data["branch_electives"] = {}
-meta_data["branch_to_elective"] = {"CSE": "CS", "IT": "IT", "CSCE": "CE", "CSSE": "SE"}
-meta_data["elective_to_branch"] = {"CS": "CSE", "IT": "IT", "CE": "CSCE", "SE": "CSSE"}
+@app.route("/teachers/<code>")
+def teacher(code):
+    """
+    ```teacher(code: str), URL: {BASE}/teachers/<code>``` <br/>
+    Flask **API** Endpoint looking up a teacher by code (CRP_CS1) : returns the teacher, the elective section
+    they teach and their weekly schedule.
+    """
+    schedule = teacherSchedule(code, getDataset())
+    if schedule is None:
+        return {"error": "unknown teacher code"}, 404
+    return schedule
 
 
-def getBranches(meta_data):
+@app.route("/teachers")
+def teacherByName():
     """
-    ```getBranches(meta_data: dict) -> list``` <br/>
-    Returns a list of all the available branches in the database.
+    ```teacherByName(), URL: {BASE}/teachers?name=``` <br/>
+    Flask **API** Endpoint looking up a teacher by name : returns the weekly schedule of every elective section
+    they teach.
     """
-    return list(meta_data["branch_noOfSections"].keys())
+    dataset = getDataset()
+    codes = dataset["teachers"]["names"].get(
+        normalizeName(request.args.get("name", ""))
+    )
+    if codes is None:
+        return {"error": "unknown teacher"}, 404
+    return {
+        "teacher": dataset["teachers"]["codes"][codes[0]],
+        "electives": [teacherSchedule(code, dataset) for code in codes],
+    }
 
 
-def getSections(meta_data, branch):
+@app.route("/rooms/free")
+def roomsFree():
     """
-    ```getSections(meta_data: dict, branch: str) -> list``` <br/>
-    Returns a list of all the available sections under a particular branch in the database.
+    ```roomsFree(), URL: {BASE}/rooms/free?day=&slot=``` <br/>
+    Flask **API** Endpoint returning the rooms which are free on a day (TUE) in a slot (11 to 12).
     """
-    branch = branch.upper()
-    if branch not in meta_data["branch_noOfSections"]:
-        return None
-    return meta_data["branch_noOfSections"][branch]
+    rooms = getDataset()["rooms"]
+    day, slot = request.args.get("day", ""), request.args.get("slot", "")
+    free = freeRooms(rooms, day, slot)
+    if free is None:
+        return {
+            "error": "unknown day or slot",
+            "days": list(rooms["days"]),
+            "slots": list(rooms["slots"]),
+        }, 400
+    return {"day": day.upper(), "slot": slot.upper(), "rooms": free}
+
+
+@app.route("/rooms/<room>")
+def roomBookings(room):
+    """
+    ```roomBookings(room: str), URL: {BASE}/rooms/<room>``` <br/>
+    Flask **API** Endpoint returning every booking of a room (C-LH-201) during the week.
+    """
+    bookings = getDataset()["rooms"]["bookings"].get(room.strip().upper())
+    if bookings is None:
+        return {"error": "unknown room"}, 404
+    return {"room": room.strip().upper(), "bookings": list(bookings)}
 
 
-def findTeacher(branch, elective, DEId, teacherData):
+@app.route("/timetable")
+def timetableJSON():
     """
-    ```findTeacher(branch: str, elective: str, DEId: str, teacherData: dict) -> str``` <br/>
-    Find a given teacher given the branch name (branch), elective name (elective), department elective (DEId)
-    and the teacherData database (teacherData)
+    ```timetableJSON(), URL: {BASE}/timetable``` <br/>
+    Flask **API** Endpoint returning the timetable as JSON (the rows of ```apply2DTransform```), with the same
+    arguments as ```/generateTimeTable```. Responses carry a strong **ETag** derived from the request and the
+    fingerprint of its data (see ```renderKey```), so a request with a matching ```If-None-Match``` header is
+    answered with 304 without any work, even after reloads which did not touch its timetable.
     """
+    # The timetable is keyed and rendered from the same normalized fields.
     try:
-        code = (
-            elective.replace("(DE)", "")
-            + "_"
-            + meta_data["branch_to_elective"][branch]
-            + str(DEId)
+        (
+            _branch,
+            _section,
+            _e1_code,
+            _e1_teacher,
+            _e2_code,
+            _e2_teacher,
+        ) = normalizeRequest(*(request.args.get(field) for field in REQUEST_FIELDS))
+    except ValueError as error:
+        return {"error": str(error)}, 400
+    dataset = getDataset()
+
+    key = renderKey(
+        dataset,
+        _branch,
+        _section,
+        _e1_code,
+        _e1_teacher,
+        _e2_code,
+        _e2_teacher,
+    )
+    clash = unknownResponse(dataset, key[-6:]) or clashResponse(dataset, key)
+    if clash is not None:
+        return clash
+    etag = keyDigest(("json",) + key[1:])
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        try:
+            pdfName, result = createTimetable(
+                _branch,
+                _section,
+                (_e1_code, _e1_teacher),
+                (_e2_code, _e2_teacher),
+                dataset,
+            )
+        except (KeyError, TypeError):
+            return unknownResponse()
+        response = jsonify(
+            {"name": pdfName[: -len(".pdf")], "timetable": apply2DTransform(result)}
         )
-        for teacher in teacherData:
-            if teacher[0].upper() == code.upper():
-                return teacher[1]
-    except Exception as error:
-        print(error)
-        return None
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = JSON_MAX_AGE
+    return response
 
 
-def createTimetable(branch, section, elective1, elective2, totalData):
+def metadataResponse(name):
     """
-    ```createTimetable(branch: str, section: str, elective1: str, elective2: str, totalData: dict) -> (str, list)``` <br/>
-    Creates the timetable based on the branch and electives passed to it along with the complete data database (totalData)
+    ```metadataResponse(name: str) -> Response``` <br/>
+    Serves the pre-serialized JSON body of a metadata endpoint (see metadata.py) with long lived cache headers
+    and its ETag, answering 304 when the client already has it.
     """
-    timetable = {}
+    entry = serializedMetadata(getDataset(), name)
+    if entry is None:
+        return {"error": "unknown branch"}, 404
+    body, etag = entry
 
-    days = set()
-    for row in totalData:
-        days.add(row[header_map["DAY"]])
-    days = list(days)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = META_MAX_AGE
+    return response
 
-    class_code = str(branch + "-" + str(section)).upper()
 
-    timetable["HEAD"] = (
-        header[header_map["DAY"] : header_map["SECTION(DE)"]]
-        + header[header_map["ROOM3"] : header_map["5 TO 6"] + 1]
-    )
+@app.route("/meta")
+def metaData():
+    """
+    ```metaData(), URL: {BASE}/meta``` <br/>
+    Flask **API** Endpoint returning every branch along with its number of sections and its electives.
+    """
+    return metadataResponse("meta")
 
-    for row in totalData:
-        if row[header_map["SECTION"]] == class_code:
-            timetable[row[header_map["DAY"]]] = row[
-                header_map["SECTION"] : header_map["SECTION(DE)"]
-            ]
-
-    elective1_code = (
-        elective1[0]
-        + "_"
-        + meta_data["branch_to_elective"][branch]
-        + "-"
-        + str(elective1[1])
-    )
-    elective2_code = (
-        elective2[0]
-        + "_"
-        + meta_data["branch_to_elective"][branch]
-        + "-"
-        + str(elective2[1])
+
+@app.route("/branches")
+def branches():
+    """
+    ```branches(), URL: {BASE}/branches``` <br/>
+    Flask **API** Endpoint returning all the available branches.
+    """
+    return metadataResponse("branches")
+
+
+@app.route("/branches/<branch>/sections")
+def sections(branch):
+    """
+    ```sections(branch: str), URL: {BASE}/branches/<branch>/sections``` <br/>
+    Flask **API** Endpoint returning the sections of a branch.
+    """
+    return metadataResponse("sections:" + branch.upper())
+
+
+@app.route("/branches/<branch>/electives")
+def electives(branch):
+    """
+    ```electives(branch: str), URL: {BASE}/branches/<branch>/electives``` <br/>
+    Flask **API** Endpoint returning the electives offered to a branch, with their DEIDs and teachers.
+    """
+    return metadataResponse("electives:" + branch.upper())
+
+
+@app.route("/jobs", methods=["POST"])
+def submitJob():
+    """
+    ```submitJob(), URL: {BASE}/jobs``` <br/>
+    Flask **API** Endpoint queueing the rendering of a timetable, with the same fields as ```/generateTimeTable```
+    (as a JSON body, a form or query arguments). Answers at once with the job (202, or 200 when the timetable was
+    already rendered) and its URLs : poll ```/jobs/<id>``` and then fetch ```/jobs/<id>/result```. Answers 404
+    for an unknown branch or section (see ```unknownResponse```) and 503 when too many jobs are already pending.
+    """
+    fields = request.get_json(silent=True)
+    if not isinstance(fields, dict):
+        fields = request.values
+    try:
+        timetable = normalizeRequest(*(fields.get(field) for field in REQUEST_FIELDS))
+    except ValueError as error:
+        return {"error": str(error)}, 400
+    dataset = getDataset()
+
+    key = renderKey(dataset, *timetable)
+    clash = unknownResponse(dataset, timetable) or clashResponse(dataset, key)
+    if clash is not None:
+        return clash
+    try:
+        job, _ = job_queue.submit(timetable, dataset)
+    except QueueFull:
+        return (
+            {"error": "too many pending jobs, retry later"},
+            503,
+            {"Retry-After": "1"},
+        )
+
+    if job.done.is_set() and job.error is None:
+        # A job still rendering counts its request once it is done (see ```JobQueue._completed```).
+        recordRequest(key[-6:])
+    description = job.describe()
+    description["status"] = "/jobs/%s" % job.id
+    description["result"] = "/jobs/%s/result" % job.id
+    return (
+        description,
+        200 if job.done.is_set() else 202,
+        {"Location": description["status"]},
     )
 
-    elective_data = {}
-    for row in totalData:
-        if row[header_map["DAY"]] not in elective_data:
-            elective_data[row[header_map["DAY"]]] = []
-        if (
-            row[header_map["SECTION(DE)"]] == elective1_code
-            or row[header_map["SECTION(DE)"]] == elective2_code
-        ):
-            elective_data[row[header_map["DAY"]]].append(
-                row[header_map["ROOM3"] : header_map["5 TO 6"] + 1]
-            )
 
-    for day in elective_data.keys():
-        elective_schedule = ["X"] * 6
-        for schedule in elective_data[day]:
-            for index in range(0, 6, 2):
-                if elective_schedule[index] != "X":
-                    continue
-                if schedule[index] != "X":
-                    elective_schedule[index] = schedule[index]
-                    elective_schedule[index + 1] = schedule[index + 1]
-        timetable[day] += elective_schedule
-
-    return " ".join([class_code, elective1_code, elective2_code]) + ".pdf", timetable
-
-
-def apply2DTransform(timetable):
-    """
-    ```apply2DTransform(timetable: list) -> list``` <br/>
-    Creates the actual transformed timetable based on the raw dictionary based timetable passed to it.
-    """
-    transformedList = []
-    for key in timetable.keys():
-        if key == "HEAD":
-            transformedList.append(timetable[key])
-        else:
-            transformedList.append([key] + timetable[key])
-    return transformedList
-
-# Initializing **header_map** with indices corresponding to header names
-for index in range(len(header)):
-    header_map[header[index]] = index
-
-# Finding **branches** and calculating the count of **sections** under each **branch**
-for row in rows:
-    if row[header_map["SECTION"]] == "X":
-        continue
-    split_section = row[header_map["SECTION"]].split("-")
-    if len(split_section) != 2:
-        continue
-
-    branch, section = split_section[0], int(split_section[1])
-
-    if branch not in meta_data["branch_noOfSections"]:
-        meta_data["branch_noOfSections"][branch] = section
+@app.route("/jobs/<id>")
+def jobStatus(id):
+    """
+    ```jobStatus(id: str), URL: {BASE}/jobs/<id>?wait=``` <br/>
+    Flask **API** Endpoint returning the state of a job. With ```wait``` (seconds, at most **DHUNDO_JOB_MAX_WAIT**)
+    the answer is held until the job is over or the time is up (long polling).
+    """
+    job = job_queue.get(id)
+    if job is None:
+        # The job may have been run by another worker : its result is then in the cache directory.
+        if render_cache.getDigest(id) is not None:
+            return {"id": id, "state": "done", "result": "/jobs/%s/result" % id}
+        return {"error": "unknown job"}, 404
+
+    try:
+        wait = min(float(request.args.get("wait", 0)), JOB_MAX_WAIT)
+    except ValueError:
+        return {"error": "wait must be a number of seconds"}, 400
+    if wait > 0:
+        job_queue.wait(job, wait)
+    description = job.describe()
+    description["result"] = "/jobs/%s/result" % job.id
+    return description
+
+
+@app.route("/jobs/<id>/result")
+def jobResult(id):
+    """
+    ```jobResult(id: str), URL: {BASE}/jobs/<id>/result``` <br/>
+    Flask **API** Endpoint returning the pdf rendered by a job : 202 while it is still pending, 422 when it
+    failed.
+    """
+    job = job_queue.get(id)
+    if job is None:
+        entry = render_cache.getDigest(id)
+        if entry is None:
+            return {"error": "unknown job"}, 404
+    elif not job.done.is_set():
+        return job.describe(), 202, {"Retry-After": "1"}
+    elif job.error is not None:
+        return job.describe(), 422
     else:
-        meta_data["branch_noOfSections"][branch] = max(
-            section, meta_data["branch_noOfSections"][branch]
+        entry = job.result
+
+    pdfName, pdfBytes = entry
+    return send_file(BytesIO(pdfBytes), as_attachment=True, download_name=pdfName)
+
+
+@app.route("/branches/<branch>/electives/<elective>/<DEId>/compatible")
+def compatible(branch, elective, DEId):
+    """
+    ```compatible(branch: str, elective: str, DEId: str), URL: {BASE}/branches/<branch>/electives/<elective>/<DEId>/compatible``` <br/>
+    Flask **API** Endpoint returning the sections of the other electives of a branch which can be taken along
+    with the given elective section (e.g. CSE, CRP, 1), and those which clash with it.
+    """
+    electives = compatibleElectives(getDataset(), branch, elective, DEId)
+    if electives is None:
+        return {"error": "unknown branch or elective"}, 404
+    return {
+        "branch": branch.upper(),
+        "elective": {"code": elective.upper(), "DEID": int(DEId)},
+        **electives,
+    }
+
+
+@app.route("/generateTimeTable/batch", methods=["POST"])
+def generateBatch():
+    """
+    ```generateBatch(), URL: {BASE}/generateTimeTable/batch``` <br/>
+    Flask **API** Endpoint for generating many timetables at once. Takes a JSON body with either a list of
+    ```requests``` (each with the same fields as ```/generateTimeTable```) or the fields of a single request
+    without ```_section```, meaning every section of ```_branch```. The timetables are rendered in parallel and
+    streamed back as a ZIP archive, or as a single multi-page pdf when ```format``` is ```pdf```.
+    """
+    body = request.get_json(silent=True)
+    dataset = getDataset()
+    try:
+        timetables = parseBatch(body, dataset["meta_data"])
+    except ValueError as error:
+        return {"error": str(error)}, 400
+    if len(timetables) > BATCH_MAX_REQUESTS:
+        return {"error": "at most %d timetables per batch" % BATCH_MAX_REQUESTS}, 400
+
+    if str(body.get("format", "zip")).lower() == "pdf":
+        pdfBytes, errors = renderBatchPDF(timetables, render_cache, dataset)
+        if pdfBytes is None:
+            return {"error": "no timetable could be created", "errors": errors}, 400
+        return send_file(
+            BytesIO(pdfBytes), as_attachment=True, download_name="timetables.pdf"
         )
 
-# For getting the **elective** data under each **branch**
-for row in rows:
-    if row[header_map["SECTION(DE)"]] == "X":
-        continue
+    results = renderBatch(timetables, render_cache, dataset)
+    return Response(
+        stream_with_context(streamZip(results)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="timetables.zip"'},
+    )
 
-    split_section_1 = row[header_map["SECTION(DE)"]].split("_")
-    if len(split_section_1) != 2:
-        continue
 
-    elective, details = split_section_1[0], split_section_1[1]
-    split_section_2 = details.split("-")
-    if len(split_section_2) != 2:
-        continue
-    elBranch, DEId = split_section_2[0], int(split_section_2[1])
+@app.route("/admin/prewarm", methods=["GET", "POST"])
+def prewarmCache():
+    """
+    ```prewarmCache(), URL: {BASE}/admin/prewarm``` <br/>
+    Admin **API** Endpoint reporting the progress of pre-warming (GET), or starting it in the background (POST).
+    """
+    if not isAdmin():
+        return {"error": "forbidden"}, 403
+    if request.method == "POST" and not startPrewarm(getDataset, render_cache):
+        return {"error": "pre-warming is already running", "progress": progress}, 409
+    return {"progress": progress}, 202 if request.method == "POST" else 200
 
-    slot_3_to_4 = row[header_map["3 TO 4"]]
-    slot_4_to_5 = row[header_map["4 TO 5"]]
-    slot_5_to_6 = row[header_map["5 TO 6"]]
 
+@app.route("/admin/reload", methods=["POST"])
+def reloadData():
+    """
+    ```reloadData(), URL: {BASE}/admin/reload``` <br/>
+    Admin **API** Endpoint reloading the CSV files of this worker. The new dataset is built while the older one
+    keeps serving requests, and is then swapped in atomically.
+    """
+    if not isAdmin():
+        return {"error": "forbidden"}, 403
     try:
-        branch = meta_data["elective_to_branch"][elBranch]
+        changed = reloadDataset()
     except Exception as error:
-        print(error)
-        continue
-
-    if branch not in meta_data["branch_electives"]:
-        meta_data["branch_electives"][branch] = {}
-        meta_data["branch_electives"][branch]["electives"] = {}
-        for elective in [slot_3_to_4, slot_4_to_5, slot_5_to_6]:
-            if elective == "X":
-                continue
-            if elective not in meta_data["branch_electives"][branch]["electives"]:
-                meta_data["branch_electives"][branch]["electives"][elective] = {
-                    "DEIDs": DEId
-                }
-                meta_data["branch_electives"][branch]["electives"][elective][
-                    "teachers"
-                ] = {DEId: findTeacher(branch, elective, DEId, teacherData)}
-            else:
-                meta_data["branch_electives"][branch]["electives"][elective][
-                    "DEIDs"
-                ] = max(
-                    DEId,
-                    meta_data["branch_electives"][branch]["electives"][elective][
-                        "DEIDs"
-                    ],
-                )
-                if (
-                    DEId
-                    not in meta_data["branch_electives"][branch]["electives"][elective][
-                        "teachers"
-                    ]
-                ):
-                    meta_data["branch_electives"][branch]["electives"][elective][
-                        "teachers"
-                    ][DEId] = findTeacher(branch, elective, DEId, teacherData)
-    else:
-        for elective in [slot_3_to_4, slot_4_to_5, slot_5_to_6]:
-            if elective == "X":
-                continue
-            if elective not in meta_data["branch_electives"][branch]["electives"]:
-                meta_data["branch_electives"][branch]["electives"][elective] = {
-                    "DEIDs": DEId
-                }
-                meta_data["branch_electives"][branch]["electives"][elective][
-                    "teachers"
-                ] = {DEId: findTeacher(branch, elective, DEId, teacherData)}
-            else:
-                meta_data["branch_electives"][branch]["electives"][elective][
-                    "DEIDs"
-                ] = max(
-                    DEId,
-                    meta_data["branch_electives"][branch]["electives"][elective][
-                        "DEIDs"
-                    ],
-                )
-                if (
-                    DEId
-                    not in meta_data["branch_electives"][branch]["electives"][elective][
-                        "teachers"
-                    ]
-                ):
-                    meta_data["branch_electives"][branch]["electives"][elective][
-                        "teachers"
-                    ][DEId] = findTeacher(branch, elective, DEId, teacherData)
-
-
-def TimeTableCreator(
-    _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher, rows
-):
-    """
-    ```TimeTableCreator(_branch: str, _section: str, _e1_code: str, _e1_teacher: str, _e2_code: str, _e2_teacher: str, rows: list") -> str``` <br/>
-    Generates the actual timetable as a **matplotlib** figure and then saves the figure to a pdf file and returns the name of the generated pdf file.
-    """
-    pdfName, result = createTimetable(
-        _branch, _section, (_e1_code, _e1_teacher), (_e2_code, _e2_teacher), rows
-    )
-    result2D = apply2DTransform(result)
-    DFresult2D = pd.DataFrame(result2D)
-    pd.set_option("display.max_columns", None)
-    print(DFresult2D)
-
-    fig, ax = plt.subplots(figsize=(12, 4))
-    ax.axis("tight")
-    ax.axis("off")
-    the_table = ax.table(
-        cellText=DFresult2D.values, colLabels=DFresult2D.columns, loc="center"
+        return {"error": "reload failed : %s" % error}, 500
+    return {"changed": changed, "version": getDataset()["version"]}
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    ```metrics(), URL: {BASE}/metrics``` <br/>
+    Flask **API** Endpoint exposing the metrics of this worker in the Prometheus text format : requests and
+    latencies by endpoint, the time spent in every stage of generating a timetable, the render cache hit rate
+    and the dataset version.
+    """
+    dataset = getDataset()
+    lookups = render_cache.hits + render_cache.misses
+    CACHE_HIT_RATIO.set(render_cache.hits / lookups if lookups else 0.0)
+    CACHE_BYTES.set(render_cache.size)
+    CACHE_ENTRIES.set(len(render_cache))
+    DATASET_INFO.set(1, replace=True, version=dataset["version"])
+    DATASET_ROWS.set(len(dataset["rows"]))
+    return Response(exposition(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/download")
+def downloadFile():
+    """
+    ```downloadFile(), URL: {BASE}/download``` <br/>
+    Dummy **API** Endpoint for testing file download from server.
+    """
+    path = "Examples.pdf"
+    logger.debug("root path : %s", path)
+    path = os.path.join(app.root_path, path)
+    logger.debug("root path : %s", path)
+    return send_file("check.pdf", as_attachment=True)
+
+
+@app.route("/form-data", methods=["POST"])
+def formData():
+    """
+    ```formData(), URL: {BASE}/form-data``` <br/>
+    Flask **API** Endpoint for form data submissions. Redirects user to the ```/generateTimetable```
+    URL based on given inputs.
+    """
+    _class = request.form.get("class")
+    _elective1 = request.form.get("elective1")
+    _elective2 = request.form.get("elective2")
+
+    if (
+        _class == "Select Class . . ."
+        or _elective1 == "Select Elective 1 . . ."
+        or _elective2 == "Select Elective 2 . . ."
+    ):
+        _class = "CSE 21"
+        _elective1 = "CI_CS 2"
+        _elective2 = "CRP_CS 4"
+
+    _branch, _section = _class.split()
+    _elective1, _elective2 = _elective1.split(), _elective2.split()
+    logger.debug("elective 1 : %s elective 2 : %s", _elective1, _elective2)
+    _e1_teacher, _e2_teacher = _elective1[1], _elective2[1]
+    _e1_code, _e2_code = _elective1[0].split("_")[0], _elective2[0].split("_")[0]
+
+    return redirect(
+        f"http://127.0.0.1:5000/generateTimeTable?_branch={_branch}&_section={_section}&_e1_code={_e1_code}&_e1_teacher={_e1_teacher}&_e2_code={_e2_code}&_e2_teacher={_e2_teacher}",
+        code=302,
     )
 
-    pp = PdfPages(pdfName)
-    pp.savefig(fig, bbox_inches="tight")
-    pp.close()
-    return pdfName
 
 # Start / Run the Flask App
 if __name__ == "__main__":
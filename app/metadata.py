@@ -0,0 +1,83 @@
+# Importing **dependencies** and **modules**
+import json
+import threading
+from app.cache import keyDigest
+from app.dataset import getBranches, getSections
+
+# The **serialized** dictionary holds the JSON bodies of the metadata endpoints, serialized once per dataset
+# version, along with their ETags : (version, name) -> (body, etag).
+serialized = {}
+serialized_lock = threading.Lock()
+
+
+def branchElectives(meta_data, branch):
+    """
+    ```branchElectives(meta_data: dict, branch: str) -> list``` <br/>
+    Returns the electives offered to a branch, with their DEIDs and teachers, as JSON friendly data.
+    """
+    electives = meta_data["branch_electives"].get(branch, {"electives": {}})
+    return [
+        {
+            "name": elective,
+            "code": elective.replace("(DE)", ""),
+            "DEIDs": data["DEIDs"],
+            "teachers": {
+                str(DEId): teacher for DEId, teacher in data["teachers"].items()
+            },
+        }
+        for elective, data in electives["electives"].items()
+    ]
+
+
+def buildMetadata(meta_data, name):
+    """
+    ```buildMetadata(meta_data: dict, name: str) -> dict``` <br/>
+    Builds the body of a metadata endpoint : ```branches```, ```meta``` (everything at once),
+    ```sections:<BRANCH>``` or ```electives:<BRANCH>``` (branch in uppercase). Returns None for an unknown branch.
+    """
+    if name == "branches":
+        return {"branches": getBranches(meta_data)}
+    if name == "meta":
+        return {
+            "branches": {
+                branch: {
+                    "sections": getSections(meta_data, branch),
+                    "electives": branchElectives(meta_data, branch),
+                }
+                for branch in getBranches(meta_data)
+            }
+        }
+
+    kind, branch = name.split(":", 1)
+    sections = getSections(meta_data, branch)
+    if sections is None:
+        return None
+    if kind == "sections":
+        return {"branch": branch, "sections": list(range(1, sections + 1))}
+    return {"branch": branch, "electives": branchElectives(meta_data, branch)}
+
+
+def serializedMetadata(dataset, name):
+    """
+    ```serializedMetadata(dataset: dict, name: str) -> (bytes, str)``` <br/>
+    Returns the JSON body of a metadata endpoint along with its ETag, serializing it only the first time it is
+    asked for with the current dataset version. Returns None for an unknown branch.
+    """
+    key = (dataset["version"], name)
+    entry = serialized.get(key)
+    if entry is not None:
+        return entry
+
+    body = buildMetadata(dataset["meta_data"], name)
+    if body is None:
+        return None
+    body = json.dumps(body, separators=(",", ":")).encode()
+    # The ETag is derived from the body itself, so the copies held by clients stay valid across reloads which
+    # did not change it.
+    entry = (body, keyDigest((name, body)))
+    with serialized_lock:
+        # Bodies of older dataset versions are never asked for again.
+        for older in [older for older in serialized if older[0] != key[0]]:
+            del serialized[older]
+        serialized[key] = entry
+    return entry
@@ -0,0 +1,274 @@
+# Importing **dependencies** and **modules**
+import time
+import threading
+from contextlib import contextmanager
+
+# This module keeps the **metrics** of a worker process (counters, gauges and latency histograms) and writes
+# them in the Prometheus text format served by ```/metrics```. Every worker counts its own requests, so each of
+# them is scraped (or summed) separately.
+
+# The **registry** lists every metric, in the order in which they are exposed.
+registry = []
+
+# The **BUCKETS** (upper bounds, in seconds) of the latency histograms : from 100us to 10s.
+BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def formatLabels(names, values, extra=()):
+    """
+    ```formatLabels(names: tuple, values: tuple, extra: tuple) -> str``` <br/>
+    Formats the labels of a sample : ```{stage="render",le="0.1"}```, or an empty string without labels.
+    """
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '%s="%s"'
+            % (
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace("\n", "\\n")
+                .replace('"', '\\"'),
+            )
+            for name, value in pairs
+        )
+        + "}"
+    )
+
+
+def formatValue(value):
+    """
+    ```formatValue(value: float) -> str``` <br/>
+    Formats a sample value the way Prometheus reads it.
+    """
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    ```Metric(name: str, help: str, labels: tuple)``` <br/>
+    Base of the metric types : one value (or histogram) per combination of label values, registered in the
+    **registry** when created.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """
+        ```samples() -> list``` <br/>
+        Returns the ```(name suffix, label values, extra labels, value)``` samples of the metric.
+        """
+        with self._lock:
+            return [("", key, (), value) for key, value in self._values.items()]
+
+    def expose(self):
+        """
+        ```expose() -> str``` <br/>
+        Returns the metric in the Prometheus text format.
+        """
+        lines = [
+            "# HELP %s %s" % (self.name, self.help),
+            "# TYPE %s %s" % (self.name, self.kind),
+        ]
+        for suffix, key, extra, value in self.samples():
+            lines.append(
+                "%s%s%s %s"
+                % (
+                    self.name,
+                    suffix,
+                    formatLabels(self.labels, key, extra),
+                    formatValue(value),
+                )
+            )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    ```Counter(name: str, help: str, labels: tuple)``` <br/>
+    A value which only goes up, e.g. the number of requests.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        # A counter without labels is exposed (as 0) before its first increment.
+        if not self.labels:
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    ```Gauge(name: str, help: str, labels: tuple)``` <br/>
+    A value which can go up and down, e.g. the size of the cache. Setting a gauge replaces every earlier value
+    when ```replace``` is True, which is how the info gauges (dataset version) forget older versions.
+    """
+
+    kind = "gauge"
+
+    def set(self, value, replace=False, **labels):
+        key = self._key(labels)
+        with self._lock:
+            if replace:
+                self._values.clear()
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    ```Histogram(name: str, help: str, labels: tuple, buckets: tuple)``` <br/>
+    Counts observations (latencies, in seconds) into cumulative buckets, along with their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][position] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    samples.append(
+                        (
+                            "_bucket",
+                            key,
+                            (("le", formatValue(float(bound))),),
+                            cumulative,
+                        )
+                    )
+                samples.append(("_sum", key, (), total))
+                samples.append(("_count", key, (), count))
+        return samples
+
+
+# The **metrics** of the pipeline and of the HTTP requests.
+STAGE_SECONDS = Histogram(
+    "dhundo_stage_seconds",
+    "Time spent in every stage of generating a timetable.",
+    ("stage",),
+)
+REQUESTS = Counter(
+    "dhundo_requests_total",
+    "HTTP requests answered, by endpoint and status.",
+    ("endpoint", "method", "status"),
+)
+REQUEST_SECONDS = Histogram(
+    "dhundo_request_seconds",
+    "Time taken to answer HTTP requests, by endpoint.",
+    ("endpoint",),
+)
+
+CACHE_LOOKUPS = Counter(
+    "dhundo_render_cache_lookups_total",
+    "Lookups of rendered timetables : hits in memory, hits in the cache directory and misses.",
+    ("result",),
+)
+CACHE_EVICTIONS = Counter(
+    "dhundo_render_cache_evictions_total",
+    "Rendered timetables evicted from memory to make room for newer ones.",
+)
+CACHE_DISK_EVICTIONS = Counter(
+    "dhundo_render_cache_disk_evictions_total",
+    "Rendered timetables deleted from the cache directory to keep it under its size cap.",
+)
+CACHE_INVALIDATIONS = Counter(
+    "dhundo_render_cache_invalidations_total",
+    "Rendered timetables evicted because the data they were built from changed.",
+)
+CACHE_COALESCED = Counter(
+    "dhundo_render_cache_coalesced_total",
+    "Timetables not rendered because the same one was being rendered, by this worker (process) or another one (workers).",
+    ("scope",),
+)
+CACHE_HIT_RATIO = Gauge(
+    "dhundo_render_cache_hit_ratio",
+    "Share of the lookups of rendered timetables which were hits.",
+)
+CACHE_BYTES = Gauge(
+    "dhundo_render_cache_bytes", "Size of the rendered timetables kept in memory."
+)
+CACHE_ENTRIES = Gauge(
+    "dhundo_render_cache_entries", "Number of rendered timetables kept in memory."
+)
+DATASET_INFO = Gauge(
+    "dhundo_dataset_info", "Version of the dataset being served.", ("version",)
+)
+DATASET_ROWS = Gauge("dhundo_dataset_rows", "Rows of the schedule being served.")
+
+
+@contextmanager
+def timed(stage):
+    """
+    ```timed(stage: str)``` <br/>
+    Context manager observing the time spent in the ```with``` block as a **stage** of the pipeline.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def exposition():
+    """
+    ```exposition() -> str``` <br/>
+    Returns every registered metric in the Prometheus text format.
+    """
+    return "\n".join(metric.expose() for metric in registry) + "\n"
@@ -0,0 +1,322 @@
+# Importing **dependencies** and **modules**
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from app.batch import renderTimetable
+from app.cache import renderKey
+from app.clash import electiveClashes
+from app.config import POPULARITY_PATH, PREWARM_WORKERS
+from app.dataset import timetableDependencies
+
+logger = logging.getLogger(__name__)
+
+# Workers sharing a cache directory elect the one pre-warming it through the **PREWARM_LOCK** file, which needs
+# **fcntl** : without it (Windows) every worker pre-warms.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+PREWARM_LOCK = "prewarm.lock"
+
+# The **popularity** counter records how many times every timetable (the normalized request tuple) was
+# asked for since it was last saved to **POPULARITY_PATH**. Pre-warming renders the most popular first. Only
+# timetables which were served are counted, and at most **POPULARITY_LIMIT** of them between two saves.
+popularity = Counter()
+POPULARITY_LIMIT = 10000
+popularity_lock = threading.Lock()
+
+# The **progress** dictionary describes the last (or current) pre-warming run. The **queued** timetables were
+# asked for while a run was going on, and are rendered by that run once it is over.
+progress = {"state": "idle", "total": 0, "done": 0, "failed": 0, "seconds": 0.0}
+progress_lock = threading.Lock()
+queued = []
+
+
+def recordRequest(request):
+    """
+    ```recordRequest(request: tuple)``` <br/>
+    Counts one more request for the given timetable (normalized request tuple), once it was served. A new
+    timetable is not counted when **POPULARITY_LIMIT** timetables already are.
+    """
+    with popularity_lock:
+        if request in popularity or len(popularity) < POPULARITY_LIMIT:
+            popularity[request] += 1
+
+
+def loadPopularity():
+    """
+    ```loadPopularity() -> Counter``` <br/>
+    Returns the historical popularity saved in **POPULARITY_PATH** (empty when it is not configured).
+    """
+    if POPULARITY_PATH is None:
+        return Counter()
+    try:
+        with open(POPULARITY_PATH) as saved:
+            return Counter(
+                {
+                    tuple(key.split("|")): count
+                    for key, count in json.load(saved).items()
+                }
+            )
+    except (OSError, ValueError):
+        return Counter()
+
+
+def savePopularity():
+    """
+    ```savePopularity()``` <br/>
+    Adds the requests counted since the last save to **POPULARITY_PATH**. The file is read again before
+    writing, so several workers can share it without losing each other's counts.
+    """
+    if POPULARITY_PATH is None:
+        return
+    with popularity_lock:
+        pending = popularity.copy()
+        popularity.clear()
+    total = loadPopularity() + pending
+
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(POPULARITY_PATH))
+    )
+    with os.fdopen(descriptor, "w") as saved:
+        json.dump({"|".join(key): count for key, count in total.items()}, saved)
+    os.replace(temporary, POPULARITY_PATH)
+
+
+atexit.register(savePopularity)
+
+
+def electiveSections(meta_data, branch):
+    """
+    ```electiveSections(meta_data: dict, branch: str) -> list``` <br/>
+    Returns the elective sections offered to a branch, grouped by elective : a list of
+    ```[(elective code, DEID), ...]``` lists, e.g. ```[[("CRP", 1), ("CRP", 2)], [("AI", 1)]]```.
+    """
+    electives = meta_data["branch_electives"].get(branch, {"electives": {}})
+    return [
+        [(elective.replace("(DE)", ""), DEId) for DEId in sorted(data["teachers"])]
+        for elective, data in electives["electives"].items()
+    ]
+
+
+def allRequests(meta_data):
+    """
+    ```allRequests(meta_data: dict) -> generator``` <br/>
+    Walks every timetable users can ask for : each section of each branch, with every pair of elective
+    sections belonging to two different electives offered to that branch.
+    """
+    for branch, sections in meta_data["branch_noOfSections"].items():
+        electives = electiveSections(meta_data, branch)
+        for section in range(1, sections + 1):
+            for first in range(len(electives)):
+                for second in range(first + 1, len(electives)):
+                    for e1_code, e1_teacher in electives[first]:
+                        for e2_code, e2_teacher in electives[second]:
+                            yield (
+                                branch,
+                                str(section),
+                                e1_code,
+                                str(e1_teacher),
+                                e2_code,
+                                str(e2_teacher),
+                            )
+
+
+def prewarmOrder(meta_data):
+    """
+    ```prewarmOrder(meta_data: dict) -> list``` <br/>
+    Returns every timetable to pre-render : the historically popular ones first (most requested first),
+    followed by all the remaining combinations.
+    """
+    history = loadPopularity()
+    with popularity_lock:
+        history.update(popularity)
+    ordered = [request for request, _ in history.most_common()]
+    seen = set(ordered)
+    ordered += [request for request in allRequests(meta_data) if request not in seen]
+    return ordered
+
+
+def prewarm(dataset, cache, workers=PREWARM_WORKERS, requests=None):
+    """
+    ```prewarm(dataset: dict, cache: RenderCache, workers: int, requests: list)``` <br/>
+    Renders every timetable (or only the given ```requests```) which is not cached yet into the **cache**, using
+    a bounded pool of worker processes. Only a few renders per worker are in flight at any time, and the **progress** dictionary is
+    updated (and logged every 10%) as they complete. Every timetable is looked up in the cache again right before
+    it is rendered, as requests (or other workers) may have rendered it meanwhile. Once the memory of the cache is
+    full, the remaining timetables only go to the cache directory (or are skipped when there is none).
+    """
+    requests = [
+        request
+        for request in (
+            prewarmOrder(dataset["meta_data"]) if requests is None else requests
+        )
+        if not cache.contains(renderKey(dataset, *request))
+        # Timetables with clashing electives are refused, there is nothing to render.
+        and not electiveClashes(dataset, request)
+    ]
+    with progress_lock:
+        progress.update(
+            state="running", total=len(requests), done=0, failed=0, seconds=0.0
+        )
+    logger.info("prewarm : rendering %d timetables", len(requests))
+    start = time.perf_counter()
+
+    pending, room = {}, True
+    requests = iter(requests)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            for request in requests:
+                # Without a cache directory, rendering more than fits in memory would only evict
+                # the (more popular) timetables rendered earlier.
+                if cache.directory is None and not room:
+                    break
+                if cache.contains(renderKey(dataset, *request)):
+                    with progress_lock:
+                        progress["done"] += 1
+                    continue
+                pending[pool.submit(renderTimetable, request, dataset["version"])] = (
+                    request
+                )
+                if len(pending) >= 4 * workers:
+                    break
+            if not pending:
+                break
+
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                request = pending.pop(future)
+                pdfName, pdfBytes, error = future.result()
+                if error is None:
+                    room = room and cache.fits(len(pdfBytes))
+                    cache.put(
+                        renderKey(dataset, *request),
+                        pdfName,
+                        pdfBytes,
+                        memory=room,
+                        dependencies=timetableDependencies(dataset, *request),
+                    )
+                with progress_lock:
+                    progress["done"] += 1
+                    progress["failed"] += error is not None
+                    progress["seconds"] = time.perf_counter() - start
+                    done, total = progress["done"], progress["total"]
+                if done * 10 // total != (done - 1) * 10 // total:
+                    logger.info("prewarm : %d / %d timetables rendered", done, total)
+
+    with progress_lock:
+        progress["total"] = progress["done"]
+        progress["seconds"] = time.perf_counter() - start
+    savePopularity()
+
+
+@contextmanager
+def elected(cache):
+    """
+    ```elected(cache: RenderCache) -> bool``` <br/>
+    Context manager telling whether this process is the one pre-warming the **cache** : with a cache directory
+    (shared by the workers), only the process holding its **PREWARM_LOCK** file is, until the block ends.
+    Without one, every worker pre-warms its own memory.
+    """
+    if cache.directory is None or fcntl is None:
+        yield True
+        return
+    with open(os.path.join(cache.directory, PREWARM_LOCK), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        yield True
+
+
+def runPrewarm(getDataset, cache, requests=None):
+    """
+    ```runPrewarm(getDataset: function, cache: RenderCache, requests: list)``` <br/>
+    Runs pre-warming (see ```prewarm```) when this process is elected to (see ```elected```), followed by the
+    **queued** timetables asked for meanwhile. The **progress** must already be in the ```running``` state.
+    """
+    with elected(cache) as leader:
+        while leader:
+            try:
+                prewarm(getDataset(), cache, requests=requests)
+            except Exception:
+                logger.exception("prewarm failed")
+                with progress_lock:
+                    progress["state"] = "failed"
+                return
+            with progress_lock:
+                if not queued:
+                    break
+                requests = queued[:]
+                del queued[:]
+    with progress_lock:
+        if not leader:
+            # The worker pre-warming the directory renders the timetables its own reload evicted.
+            del queued[:]
+        progress["state"] = "finished"
+    if not leader:
+        logger.info(
+            "prewarm : skipped, another worker is pre-warming the cache directory"
+        )
+
+
+def startPrewarm(getDataset, cache, interval=0, requests=None):
+    """
+    ```startPrewarm(getDataset: function, cache: RenderCache, interval: float, requests: list) -> bool``` <br/>
+    Starts pre-warming (every timetable, or only the given ```requests```) in a background thread (see
+    ```runPrewarm```), again every ```interval``` seconds when it is not 0. Returns False when a pre-warming run
+    is already going on : the given ```requests``` are then queued for it, while a run of every timetable is
+    left to it.
+    """
+    with progress_lock:
+        if progress["state"] == "running":
+            if requests is not None:
+                queued.extend(requests)
+                logger.info(
+                    "prewarm : already running, %d timetables queued", len(requests)
+                )
+            return False
+        progress["state"] = "running"
+
+    def run():
+        runPrewarm(getDataset, cache, requests)
+        while interval:
+            time.sleep(interval)
+            # A run started meanwhile (by /admin/prewarm or a reload) is not run twice at once.
+            with progress_lock:
+                if progress["state"] == "running":
+                    continue
+                progress["state"] = "running"
+            runPrewarm(getDataset, cache)
+
+    threading.Thread(target=run, name="prewarm", daemon=True).start()
+    return True
+
+
+# Pre-warms the on-disk cache (**DHUNDO_CACHE_DIR**) from the command line, e.g. right after a data drop
+# and before the workers are restarted : python -m app.prewarm
+if __name__ == "__main__":
+    from app.cache import RenderCache
+    from app.config import CACHE_DIR
+    from app.dataset import getDataset
+
+    if CACHE_DIR is None:
+        raise SystemExit(
+            "DHUNDO_CACHE_DIR must be set to pre-warm from the command line"
+        )
+    # The progress is the output of the command : it is logged at the INFO level.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Nothing is kept in memory : every render goes straight to the cache directory.
+    cache = RenderCache(0, CACHE_DIR)
+    with elected(cache) as leader:
+        if not leader:
+            raise SystemExit("another process is pre-warming %s" % CACHE_DIR)
+        prewarm(getDataset(), cache)
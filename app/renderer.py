@@ -0,0 +1,487 @@
+# Importing **dependencies** and **modules**
+import re
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+from app.config import RENDERER
+from app.dataset import createTimetable, apply2DTransform, electiveTeachers
+from app.ical import renderICS
+from app.metrics import timed
+from app.renderpool import render_pool, usePool
+
+logger = logging.getLogger(__name__)
+
+# The **PAGE_WIDTH** and **PAGE_HEIGHT** variables hold the size (in points) of the page produced by the
+# **matplotlib** renderer for a ```figsize=(12, 4)``` figure saved with ```bbox_inches="tight"```. The native
+# renderer reproduces the same layout : a table spanning TABLE_WIDTH points, centered on the page.
+PAGE_WIDTH = 684
+PAGE_HEIGHT = 236.16
+TABLE_WIDTH = 669.6
+ROW_HEIGHT = 12
+FONT_SIZE = 6
+LINE_WIDTH = 1
+
+# The text inside a cell is padded by **CELL_PAD** times the width of the cell (same as matplotlib).
+CELL_PAD = 0.1
+
+# The **HELVETICA_WIDTHS** variable holds the widths (per 1000 units of font size) of the printable ASCII
+# characters (32 to 126) of the standard **Helvetica** font, used to align the text inside the cells.
+HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 222, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    222, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]  # fmt: skip
+
+
+def textWidth(text, fontSize):
+    """
+    ```textWidth(text: str, fontSize: float) -> float``` <br/>
+    Returns the width (in points) of the given text when drawn in **Helvetica** at the given font size.
+    """
+    width = 0
+    for char in text:
+        code = ord(char)
+        width += HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+    return width * fontSize / 1000
+
+
+def escapeText(text):
+    """
+    ```escapeText(text: str) -> str``` <br/>
+    Escapes a string so that it can be written as a literal string inside a pdf content stream.
+    """
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def tableStream(table):
+    """
+    ```tableStream(table: list) -> (bytes, float)``` <br/>
+    Draws a 2D table (the output of ```apply2DTransform```) as pdf drawing operators. Like the **matplotlib**
+    renderer, the first row holds the column numbers and is centered while every other cell is right aligned.
+    Returns the content stream along with the height of the page it needs.
+    """
+    cells = [[str(column) for column in range(len(table[0]))]] + [
+        [str(cell) for cell in row] for row in table
+    ]
+    columnWidth = TABLE_WIDTH / len(cells[0])
+    pageHeight = max(PAGE_HEIGHT, ROW_HEIGHT * (len(cells) + 2))
+    left = (PAGE_WIDTH - TABLE_WIDTH) / 2
+    top = (pageHeight + ROW_HEIGHT * len(cells)) / 2
+
+    operators = ["%g w" % LINE_WIDTH]
+    for rowIndex, row in enumerate(cells):
+        y = top - ROW_HEIGHT * (rowIndex + 1)
+        for columnIndex in range(len(row)):
+            x = left + columnWidth * columnIndex
+            operators.append("%.3f %.3f %.3f %g re" % (x, y, columnWidth, ROW_HEIGHT))
+    operators.append("S")
+
+    operators.append("BT /F1 %g Tf" % FONT_SIZE)
+    cursor = (0, 0)
+    for rowIndex, row in enumerate(cells):
+        y = top - ROW_HEIGHT * (rowIndex + 1) + (ROW_HEIGHT - FONT_SIZE * 0.718) / 2
+        for columnIndex, text in enumerate(row):
+            width = textWidth(text, FONT_SIZE)
+            if rowIndex == 0:
+                x = left + columnWidth * columnIndex + (columnWidth - width) / 2
+            else:
+                x = left + columnWidth * (columnIndex + 1 - CELL_PAD) - width
+            # Text positions are relative to the previous one inside a text object.
+            operators.append(
+                "%.3f %.3f Td (%s) Tj"
+                % (x - cursor[0], y - cursor[1], escapeText(text))
+            )
+            cursor = (x, y)
+    operators.append("ET")
+
+    return "\n".join(operators).encode("latin-1", "replace"), pageHeight
+
+
+def renderNativePDF(tables):
+    """
+    ```renderNativePDF(tables: list) -> bytes``` <br/>
+    Writes the given 2D tables (one per page) directly as a pdf document, without going through
+    **matplotlib**. Uses the standard **Helvetica** font, so nothing has to be embedded in the file.
+    """
+    return assembleNativePDF([tableStream(table) for table in tables])
+
+
+def assembleNativePDF(pages):
+    """
+    ```assembleNativePDF(pages: list) -> bytes``` <br/>
+    Writes a pdf document from the ```(stream, pageHeight)``` pages drawn by ```tableStream```, which may have
+    been drawn by other processes.
+    """
+    # Objects 1, 2 and 3 are the catalog, the page tree and the font. Every page then needs two
+    # objects : the page itself and its content stream.
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (
+            b" ".join(b"%d 0 R" % (4 + 2 * page) for page in range(len(pages))),
+            len(pages),
+        ),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    for page, (stream, pageHeight) in enumerate(pages):
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %g %g] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, pageHeight, 5 + 2 * page)
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+    return writePDF(objects)
+
+
+def writePDF(objects):
+    """
+    ```writePDF(objects: list) -> bytes``` <br/>
+    Writes a pdf document from the contents of its objects, numbered from 1 in order : the first one must be
+    the catalog.
+    """
+    pdf = BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, content in enumerate(objects, 1):
+        offsets.append(pdf.tell())
+        pdf.write(b"%d 0 obj\n%s\nendobj\n" % (number, content))
+
+    xref = pdf.tell()
+    pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        pdf.write(b"%010d 00000 n \n" % offset)
+    pdf.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return pdf.getvalue()
+
+
+# The **PDF_REFERENCE** pattern matches the references to other objects inside a pdf object (```12 0 R```).
+PDF_REFERENCE = re.compile(rb"(\d+) 0 R\b")
+
+
+def pdfObjects(document):
+    """
+    ```pdfObjects(document: bytes) -> (dict, int)``` <br/>
+    Splits a pdf document with a plain cross-reference table (as written by ```writePDF``` and by **matplotlib**)
+    into the contents of its objects, by number, and returns them along with the number of its catalog.
+    """
+    xref = int(document[document.rindex(b"startxref") + 9 :].split()[0])
+    trailer = document.index(b"trailer", xref)
+    fields = document[xref:trailer].split()[1:]
+    offsets, position = {}, 0
+    while position < len(fields):
+        first, count = int(fields[position]), int(fields[position + 1])
+        position += 2
+        for number in range(first, first + count):
+            if fields[position + 2] == b"n":
+                offsets[number] = int(fields[position])
+            position += 3
+
+    objects = {}
+    starts = sorted(offsets.items(), key=lambda item: item[1])
+    for (number, start), (_, end) in zip(starts, starts[1:] + [(None, xref)]):
+        content = document[start:end].rstrip()
+        content = content[content.index(b"obj") + 3 : -len(b"endobj")]
+        objects[number] = content.strip()
+    root = re.search(rb"/Root (\d+) 0 R", document[trailer:])
+    return objects, int(root.group(1))
+
+
+def mergePDFs(documents):
+    """
+    ```mergePDFs(documents: list) -> bytes``` <br/>
+    Merges pdf documents (see ```pdfObjects```), such as those drawn by **matplotlib** in several processes, into
+    a single one holding all their pages in order. The objects of every document are numbered again after those
+    of the previous ones, and their pages moved to a single page tree.
+    """
+    objects, kids = [None, None], []
+    for document in documents:
+        contents, root = pdfObjects(document)
+        pages = int(re.search(rb"/Pages (\d+) 0 R", contents[root]).group(1))
+        # The catalog and the page tree of every document are replaced by those of the merged one.
+        kept = sorted(number for number in contents if number not in (root, pages))
+        numbers = {
+            number: len(objects) + index + 1 for index, number in enumerate(kept)
+        }
+        numbers[pages] = 2
+
+        def renumber(match):
+            return b"%d 0 R" % numbers[int(match.group(1))]
+
+        tree = re.search(rb"/Kids\s*\[([^\]]*)\]", contents[pages]).group(1)
+        kids += [numbers[int(number)] for number in PDF_REFERENCE.findall(tree)]
+        for number in kept:
+            content = contents[number]
+            # Only the dictionary of a stream may refer to other objects, never its (binary) data.
+            stream = re.search(rb"stream\r?\n", content)
+            if stream is None:
+                objects.append(PDF_REFERENCE.sub(renumber, content))
+            else:
+                objects.append(
+                    PDF_REFERENCE.sub(renumber, content[: stream.start()])
+                    + content[stream.start() :]
+                )
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+    return writePDF(objects)
+
+
+def renderSVG(table):
+    """
+    ```renderSVG(table: list) -> bytes``` <br/>
+    Draws a 2D table as an **SVG** image, with the same layout as the pdf of ```renderNativePDF``` (the text is
+    aligned by the viewer, so no font metrics are needed).
+    """
+    cells = [[str(column) for column in range(len(table[0]))]] + [
+        [str(cell) for cell in row] for row in table
+    ]
+    columnWidth = TABLE_WIDTH / len(cells[0])
+    pageHeight = max(PAGE_HEIGHT, ROW_HEIGHT * (len(cells) + 2))
+    left = (PAGE_WIDTH - TABLE_WIDTH) / 2
+    top = (pageHeight - ROW_HEIGHT * len(cells)) / 2
+
+    parts = [
+        '<svg xmlns="http://www.w3.org/2000/svg" width="%g" height="%g" viewBox="0 0 %g %g" '
+        'font-family="Helvetica, Arial, sans-serif" font-size="%g">'
+        % (PAGE_WIDTH, pageHeight, PAGE_WIDTH, pageHeight, FONT_SIZE),
+        '<rect width="100%" height="100%" fill="white"/>',
+        '<g fill="none" stroke="black" stroke-width="%g">' % LINE_WIDTH,
+    ]
+    for rowIndex, row in enumerate(cells):
+        y = top + ROW_HEIGHT * rowIndex
+        for columnIndex in range(len(row)):
+            x = left + columnWidth * columnIndex
+            parts.append(
+                '<rect x="%.3f" y="%.3f" width="%.3f" height="%g"/>'
+                % (x, y, columnWidth, ROW_HEIGHT)
+            )
+    parts.append("</g>")
+
+    # Like the pdf, the first row is centered and the other cells are right aligned.
+    parts.append('<g text-anchor="middle">')
+    for rowIndex, row in enumerate(cells):
+        y = top + ROW_HEIGHT * (rowIndex + 1) - (ROW_HEIGHT - FONT_SIZE * 0.718) / 2
+        if rowIndex == 1:
+            parts.append('</g><g text-anchor="end">')
+        for columnIndex, text in enumerate(row):
+            if rowIndex == 0:
+                x = left + columnWidth * (columnIndex + 0.5)
+            else:
+                x = left + columnWidth * (columnIndex + 1 - CELL_PAD)
+            parts.append('<text x="%.3f" y="%.3f">%s</text>' % (x, y, escape(text)))
+    parts.append("</g></svg>")
+    return "\n".join(parts).encode()
+
+
+# The **templates** are the matplotlib figures kept by a process, one per table shape (rows, columns), laid out
+# once and then only refilled with the text of every new table. At most **TEMPLATE_LIMIT** of them are kept.
+# A figure is filled and saved by one thread at a time (holding the **template_lock**) : threads of a worker
+# drawing their own figures (without render processes) would otherwise mix the text of their tables.
+templates = {}
+TEMPLATE_LIMIT = 8
+template_lock = threading.Lock()
+
+
+def tableTemplate(rows, columns):
+    """
+    ```tableTemplate(rows: int, columns: int) -> (Figure, Table, float, Bbox)``` <br/>
+    Returns the figure and table (with ```rows``` rows below a header of column numbers) of the given shape,
+    creating them on first use, along with the initial font size of the cells and the bounding box of the saved
+    page. The figures are made without **pyplot**, so they are never kept alive by its list of open figures. The
+    **template_lock** must be held until the figure is saved (see ```filledTemplate```).
+    """
+    template = templates.pop((rows, columns), None)
+    if template is None:
+        from matplotlib import rcParams
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(12, 4))
+        ax = fig.subplots()
+        ax.axis("tight")
+        ax.axis("off")
+        the_table = ax.table(
+            cellText=[[""] * columns for _ in range(rows)],
+            colLabels=[str(column) for column in range(columns)],
+            loc="center",
+        )
+        fontSize = next(iter(the_table.get_celld().values())).get_fontsize()
+        # The page is cropped to the cells of the table (like ```bbox_inches="tight"```), which never move : the
+        # box is measured once here instead of drawing every table twice to measure it again.
+        bbox = fig.get_tightbbox(FigureCanvasAgg(fig).get_renderer()).padded(
+            rcParams["savefig.pad_inches"]
+        )
+        template = (fig, the_table, fontSize, bbox)
+        while len(templates) >= TEMPLATE_LIMIT:
+            # The oldest template is dropped, clearing its figure so nothing keeps its artists alive.
+            oldest = next(iter(templates))
+            templates.pop(oldest)[0].clear()
+    # The template is moved to the end : the first one is always the least recently used.
+    templates[(rows, columns)] = template
+    return template
+
+
+@contextmanager
+def filledTemplate(table):
+    """
+    ```filledTemplate(table: list) -> (Figure, Bbox)``` <br/>
+    Context manager filling the figure template of a 2D table's shape (see ```tableTemplate```) with its text, and
+    yielding the figure along with the bounding box to save it with. The **template_lock** is held until the
+    block (which saves the figure) ends.
+    """
+    with template_lock:
+        with timed("figure"):
+            fig, the_table, fontSize, bbox = tableTemplate(len(table), len(table[0]))
+            cells = the_table.get_celld()
+            for row, values in enumerate(table, 1):
+                for column, value in enumerate(values):
+                    cells[row, column].get_text().set_text(value)
+            # The font size shrunk to fit the text of an earlier table is reset.
+            the_table.set_fontsize(fontSize)
+        yield fig, bbox
+
+
+def renderMatplotlibPDF(tables):
+    """
+    ```renderMatplotlibPDF(tables: list) -> bytes``` <br/>
+    Draws the given 2D tables (one per page) as **matplotlib** figures and saves them as a pdf document. The
+    figure of every table shape is only laid out once per process (see ```tableTemplate```) : drawing a table
+    then swaps the text of its cells. **matplotlib** is only imported when this renderer is actually used.
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    buffer = BytesIO()
+    pp = PdfPages(buffer)
+    for table in tables:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("timetable :\n%s", "\n".join(map(str, table)))
+
+        with filledTemplate(table) as (fig, bbox):
+            with timed("figure_render"):
+                pp.savefig(fig, bbox_inches=bbox)
+    with timed("pdf_write"):
+        pp.close()
+    return buffer.getvalue()
+
+
+# The resolution of the **png** images, in dots per inch.
+PNG_DPI = 150
+
+
+def renderMatplotlibPNG(tables):
+    """
+    ```renderMatplotlibPNG(tables: list) -> bytes``` <br/>
+    Draws a 2D table (the only one of ```tables```) as a **png** image, with the figure templates of the
+    **matplotlib** renderer.
+    """
+    (table,) = tables
+    buffer = BytesIO()
+    with filledTemplate(table) as (fig, bbox):
+        with timed("figure_render"):
+            fig.savefig(buffer, format="png", dpi=PNG_DPI, bbox_inches=bbox)
+    return buffer.getvalue()
+
+
+def renderPDF(tables):
+    """
+    ```renderPDF(tables: list) -> bytes``` <br/>
+    Renders the given 2D tables (one per page) as a pdf document with the renderer selected by the
+    ```DHUNDO_RENDERER``` setting : **native** (default) or **matplotlib** (in the render processes of the
+    **render_pool**, see renderpool.py).
+    """
+    if RENDERER == "matplotlib":
+        if usePool():
+            with timed("render_pool"):
+                return render_pool.render(tables, "pdf")
+        return renderMatplotlibPDF(tables)
+    with timed("pdf_write"):
+        return renderNativePDF(tables)
+
+
+def TimeTableCreator(
+    _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher, dataset
+):
+    """
+    ```TimeTableCreator(_branch: str, _section: str, _e1_code: str, _e1_teacher: str, _e2_code: str, _e2_teacher: str, dataset: dict) -> (str, bytes)``` <br/>
+    Generates the actual timetable and renders it as a pdf in memory (see ```renderPDF```). Returns the name of the
+    pdf file along with its contents.
+    """
+    with timed("createTimetable"):
+        pdfName, result = createTimetable(
+            _branch,
+            _section,
+            (_e1_code, _e1_teacher),
+            (_e2_code, _e2_teacher),
+            dataset,
+        )
+    with timed("apply2DTransform"):
+        result2D = apply2DTransform(result)
+    return pdfName, renderPDF([result2D])
+
+
+# The **EXPORT_FORMATS** a timetable can be downloaded as, with their media types.
+EXPORT_FORMATS = {
+    "pdf": "application/pdf",
+    "ics": "text/calendar",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+
+
+def TimeTableExporter(
+    _format, _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher, dataset
+):
+    """
+    ```TimeTableExporter(_format: str, _branch: str, _section: str, _e1_code: str, _e1_teacher: str, _e2_code: str, _e2_teacher: str, dataset: dict) -> (str, bytes)``` <br/>
+    Generates the timetable and exports it in one of the **EXPORT_FORMATS** : **pdf** (see ```TimeTableCreator```),
+    **ics** (weekly events, see ical.py), **svg** (see ```renderSVG```) or **png** (drawn by **matplotlib**, in the
+    render processes).
+    Returns the name of the file along with its contents.
+    """
+    if _format == "pdf":
+        return TimeTableCreator(
+            _branch, _section, _e1_code, _e1_teacher, _e2_code, _e2_teacher, dataset
+        )
+    with timed("createTimetable"):
+        pdfName, result = createTimetable(
+            _branch,
+            _section,
+            (_e1_code, _e1_teacher),
+            (_e2_code, _e2_teacher),
+            dataset,
+        )
+    with timed("apply2DTransform"):
+        result2D = apply2DTransform(result)
+    name = pdfName[: -len(".pdf")]
+
+    with timed("export_" + _format):
+        if _format == "ics":
+            teachers = electiveTeachers(
+                _branch, [(_e1_code, _e1_teacher), (_e2_code, _e2_teacher)], dataset
+            )
+            # The ids of the events only depend on the timetable, so importing it again after the dataset
+            # changed updates the events instead of duplicating them.
+            uid = hashlib.sha256(name.encode()).hexdigest()[:16]
+            data = renderICS(name, result2D, teachers, uid)
+        elif _format == "svg":
+            data = renderSVG(result2D)
+        elif usePool():
+            data = render_pool.render([result2D], "png")
+        else:
+            data = renderMatplotlibPNG([result2D])
+    return name + "." + _format, data
@@ -0,0 +1,228 @@
+# Importing **dependencies** and **modules**
+import os
+import queue
+import logging
+import resource
+import threading
+import multiprocessing
+from app.config import (
+    RENDER_WORKERS,
+    RENDER_MAX_JOBS,
+    RENDER_MAX_GROWTH,
+    RENDER_TIMEOUT,
+)
+from app.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# The **matplotlib** renderer is slow to import and to lay out its first figure, and a process drawing figures
+# for days grows. The web workers therefore hand their tables to a few long lived **render processes**, which
+# keep matplotlib imported and their figure templates laid out (see ```tableTemplate```), and are replaced after
+# **RENDER_MAX_JOBS** renders or once their memory grew by more than **RENDER_MAX_GROWTH** megabytes. A process
+# which hangs is killed after **RENDER_TIMEOUT** seconds, so it never blocks the workers waiting for it.
+
+RENDER_RESTARTS = Counter(
+    "dhundo_render_process_restarts_total",
+    "Render processes replaced, by reason : jobs, memory, crash or timeout.",
+    ("reason",),
+)
+
+
+def residentMegabytes():
+    """
+    ```residentMegabytes() -> float``` <br/>
+    Returns the resident memory of the current process in megabytes (its peak where ```/proc``` is missing).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def renderProcess(connection):
+    """
+    ```renderProcess(connection: Connection)``` <br/>
+    Main loop of a render process : warms matplotlib up, then renders every ```(tables, format)``` job received on
+    the ```connection``` (as a ```pdf``` or a ```png```) and sends back ```(bytes, error, megabytes)``` until it
+    receives None, the megabytes being
+    how much its resident memory grew since it was warmed up (a forked process starts out sharing the memory of
+    its parent, which says nothing about its own growth).
+    """
+    from app.renderer import renderMatplotlibPDF, renderMatplotlibPNG
+
+    renderers = {"pdf": renderMatplotlibPDF, "png": renderMatplotlibPNG}
+    renderMatplotlibPDF([[["X"]]])
+    baseline = residentMegabytes()
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        tables, format = job
+        try:
+            data, error = renderers[format](tables), None
+        except Exception as failure:
+            data, error = None, repr(failure)
+        connection.send((data, error, residentMegabytes() - baseline))
+
+
+class RenderProcess:
+    """
+    ```RenderProcess()``` <br/>
+    A render process along with the parent end of its pipe and the number of renders it did.
+    """
+
+    def __init__(self):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=renderProcess, args=(child,), name="dhundo-renderer", daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def render(self, tables, format, timeout=RENDER_TIMEOUT):
+        """
+        ```render(tables: list, format: str, timeout: float) -> (bytes, str, float)``` <br/>
+        Sends tables to the process and waits for its answer. Raises an EOFError (or OSError) when it died, and a
+        TimeoutError when it did not answer within ```timeout``` seconds.
+        """
+        self.connection.send((tables, format))
+        if not self.connection.poll(timeout):
+            raise TimeoutError("no answer after %g seconds" % timeout)
+        answer = self.connection.recv()
+        self.jobs += 1
+        return answer
+
+    def stop(self):
+        """
+        ```stop()``` <br/>
+        Asks the process to exit once idle, killing it when it does not.
+        """
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        self.kill()
+
+    def kill(self):
+        """
+        ```kill()``` <br/>
+        Kills the process (when it is still alive) and closes its pipe.
+        """
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class RenderPool:
+    """
+    ```RenderPool(workers: int, maxJobs: int, maxGrowth: float, timeout: float)``` <br/>
+    Pool of ```workers``` render processes, started on first use. Every render takes an idle process (waiting for
+    one when they are all busy, for at most ```timeout``` seconds), and a process is replaced after ```maxJobs```
+    renders, once its memory grew by more than ```maxGrowth``` megabytes, when it died, or when it did not answer
+    within ```timeout``` seconds.
+    """
+
+    def __init__(
+        self,
+        workers=RENDER_WORKERS,
+        maxJobs=RENDER_MAX_JOBS,
+        maxGrowth=RENDER_MAX_GROWTH,
+        timeout=RENDER_TIMEOUT,
+    ):
+        self.workers = workers
+        self.maxJobs = maxJobs
+        self.maxGrowth = maxGrowth
+        self.timeout = timeout
+        self.idle = None
+        self.owner = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """
+        ```_start()``` <br/>
+        Starts the render processes in the current process. A pool inherited through a fork is started again
+        rather than sharing the pipes of its parent.
+        """
+        with self._lock:
+            if self.owner != os.getpid():
+                self.idle = queue.Queue()
+                for _ in range(self.workers):
+                    self.idle.put(RenderProcess())
+                self.owner = os.getpid()
+
+    def render(self, tables, format="pdf"):
+        """
+        ```render(tables: list, format: str) -> bytes``` <br/>
+        Renders tables as a ```pdf``` (see ```renderMatplotlibPDF```) or a ```png``` (see ```renderMatplotlibPNG```)
+        in a render process. A render which killed its process is tried once more in a new one, and its error is
+        raised when it fails again. A render which hung is not tried again : its process is killed and replaced,
+        and a RuntimeError raised.
+        """
+        if self.owner != os.getpid():
+            self._start()
+        for attempt in range(2):
+            try:
+                worker = self.idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise RuntimeError(
+                    "no render process was idle after %g seconds" % self.timeout
+                )
+            try:
+                data, error, growth = worker.render(tables, format, self.timeout)
+            except TimeoutError:
+                logger.warning(
+                    "render process %d hung for %g seconds, replacing it",
+                    worker.process.pid,
+                    self.timeout,
+                )
+                RENDER_RESTARTS.inc(reason="timeout")
+                worker.kill()
+                self.idle.put(RenderProcess())
+                raise RuntimeError("the render process timed out")
+            except (EOFError, OSError) as failure:
+                logger.warning(
+                    "render process %d died : %r", worker.process.pid, failure
+                )
+                RENDER_RESTARTS.inc(reason="crash")
+                worker.stop()
+                self.idle.put(RenderProcess())
+                if attempt:
+                    raise RuntimeError("the render process died")
+                continue
+
+            if worker.jobs >= self.maxJobs or growth > self.maxGrowth:
+                reason = "jobs" if worker.jobs >= self.maxJobs else "memory"
+                logger.info(
+                    "replacing render process %d (%d renders, grew by %.0f MB)",
+                    worker.process.pid,
+                    worker.jobs,
+                    growth,
+                )
+                RENDER_RESTARTS.inc(reason=reason)
+                worker.stop()
+                worker = RenderProcess()
+            self.idle.put(worker)
+            if error is not None:
+                raise RuntimeError("render failed : %s" % error)
+            return data
+
+
+# The **render_pool** of the process, used by ```renderPDF``` with the matplotlib renderer.
+render_pool = RenderPool()
+
+
+def usePool():
+    """
+    ```usePool() -> bool``` <br/>
+    Tells whether the current process should render through the **render_pool** : the web workers do, while
+    processes started by ```multiprocessing``` (batch, job and pre-warm pools, the render processes themselves)
+    already render away from the requests and draw their figures themselves.
+    """
+    return RENDER_WORKERS > 0 and multiprocessing.parent_process() is None
@@ -0,0 +1,158 @@
+# Importing **dependencies** and **modules**
+import io
+import os
+import json
+import time
+import pickle
+import struct
+import platform
+import tempfile
+from types import MappingProxyType
+
+# A **snapshot** is the whole dataset (rows, indexes and meta_data) compiled ahead of time into a single binary
+# file, so that a worker loads it in one read instead of parsing the CSV files and building every index again.
+# Loaded by the gunicorn master before forking (```DHUNDO_PRELOAD```), it is shared by all the workers.
+#
+# A snapshot file starts with the **SNAPSHOT_MAGIC** bytes and the **SNAPSHOT_FORMAT** number, followed by the
+# length of a JSON header (dataset version, creation time ...) and the header itself, and ends with the pickled
+# dataset. Snapshots are pickles : only load the ones you compiled yourself.
+SNAPSHOT_MAGIC = b"DHUNDOSS"
+
+# The **SNAPSHOT_FORMAT** is raised whenever the structure of the dataset changes, so older snapshots are
+# refused (and the CSV files are loaded instead) rather than served with a stale layout.
+SNAPSHOT_FORMAT = 2
+
+
+class SnapshotError(ValueError):
+    """
+    ```SnapshotError``` <br/>
+    Raised when a file is not a snapshot, a snapshot of another format, or a corrupt one.
+    """
+
+
+def frozen(mapping):
+    """
+    ```frozen(mapping: dict) -> MappingProxyType``` <br/>
+    Rebuilds a read-only index of the dataset when a snapshot is loaded.
+    """
+    return MappingProxyType(mapping)
+
+
+class SnapshotPickler(pickle.Pickler):
+    """
+    ```SnapshotPickler(file: file)``` <br/>
+    Pickler of the dataset : the read-only indexes (MappingProxyType, which pickle does not handle) are stored as
+    plain dictionaries and frozen again by ```frozen``` when they are loaded.
+    """
+
+    def reducer_override(self, value):
+        if type(value) is MappingProxyType:
+            return frozen, (dict(value),)
+        return NotImplemented
+
+
+def writeSnapshot(path, dataset):
+    """
+    ```writeSnapshot(path: str, dataset: dict) -> dict``` <br/>
+    Compiles a dataset (see ```loadDataset```) into a snapshot file and returns its header.
+    """
+    header = {
+        "version": dataset["version"],
+        "rows": len(dataset["rows"]),
+        "created": time.time(),
+        "python": platform.python_version(),
+    }
+    payload = io.BytesIO()
+    SnapshotPickler(payload, protocol=pickle.HIGHEST_PROTOCOL).dump(dataset)
+    encoded = json.dumps(header).encode()
+    # Written to a temporary file first and then renamed, so a worker starting meanwhile never reads a
+    # partially written snapshot.
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(descriptor, "wb") as snapshot:
+        snapshot.write(SNAPSHOT_MAGIC)
+        snapshot.write(struct.pack("<HI", SNAPSHOT_FORMAT, len(encoded)))
+        snapshot.write(encoded)
+        snapshot.write(payload.getbuffer())
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, path)
+    return header
+
+
+def readSnapshotHeader(snapshot):
+    """
+    ```readSnapshotHeader(snapshot: file) -> dict``` <br/>
+    Reads and checks the beginning of an open snapshot file and returns its header. Raises a SnapshotError when
+    the file is not a snapshot of the current **SNAPSHOT_FORMAT**.
+    """
+    if snapshot.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise SnapshotError("not a dataset snapshot")
+    try:
+        format, length = struct.unpack("<HI", snapshot.read(struct.calcsize("<HI")))
+    except struct.error:
+        raise SnapshotError("truncated dataset snapshot")
+    if format != SNAPSHOT_FORMAT:
+        raise SnapshotError(
+            "snapshot format %d, expected %d (compile it again)"
+            % (format, SNAPSHOT_FORMAT)
+        )
+    header = json.loads(snapshot.read(length))
+    if not isinstance(header, dict) or "version" not in header:
+        raise SnapshotError("invalid snapshot header")
+    return header
+
+
+def readSnapshot(path):
+    """
+    ```readSnapshot(path: str) -> (dict, dict)``` <br/>
+    Loads a snapshot file. Returns its header along with the dataset. Raises a SnapshotError when the file is
+    not a snapshot of the current format or its dataset cannot be unpickled (a truncated or corrupt file).
+    """
+    with open(path, "rb") as snapshot:
+        header = readSnapshotHeader(snapshot)
+        try:
+            return header, pickle.load(snapshot)
+        except (
+            pickle.UnpicklingError,
+            EOFError,
+            AttributeError,
+            ImportError,
+            IndexError,
+            TypeError,
+            MemoryError,
+        ) as error:
+            raise SnapshotError("corrupt dataset snapshot : %r" % error) from error
+
+
+# Compiles the configured CSV files into a snapshot, to be served with DHUNDO_SNAPSHOT=<path> :
+# python -m app.snapshot dataset.snapshot
+if __name__ == "__main__":
+    import argparse
+    from app.config import SCHEDULE_PATH, TEACHER_PATH, BRANCH_PATH, SNAPSHOT_PATH
+    from app.dataset import loadDataset
+
+    # Run as __main__, this module must still pickle app.snapshot.frozen for the workers to find it.
+    from app.snapshot import writeSnapshot
+
+    parser = argparse.ArgumentParser(
+        description="Compiles the schedule, teacher and branch CSV files into a dataset snapshot."
+    )
+    parser.add_argument(
+        "output", nargs="?", default=SNAPSHOT_PATH, help="default : DHUNDO_SNAPSHOT"
+    )
+    arguments = parser.parse_args()
+    if arguments.output is None:
+        parser.error("no output file given and DHUNDO_SNAPSHOT is not set")
+
+    start = time.perf_counter()
+    header = writeSnapshot(
+        arguments.output, loadDataset(SCHEDULE_PATH, TEACHER_PATH, BRANCH_PATH)
+    )
+    print(
+        "compiled %d rows (version %s) into %s in %.2fs"
+        % (
+            header["rows"],
+            header["version"][:12],
+            arguments.output,
+            time.perf_counter() - start,
+        )
+    )
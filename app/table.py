@@ -0,0 +1,67 @@
+# Importing **dependencies** and **modules**
+import sys
+from array import array
+
+
+class ScheduleTable:
+    """
+    ```ScheduleTable(header: list, rows: iterable)``` <br/>
+    Compact, read-only storage of the **rows** of the schedule. Every distinct cell value is stored once in a
+    symbol table (and interned), and the cells themselves are kept as integer codes in a single flat ```array```,
+    row after row, so the cell of a column is always at the same offset of its row. Indexing or iterating the
+    table gives back rows as lists of strings, exactly like the list of lists it replaces.
+    """
+
+    def __init__(self, header, rows):
+        self.header = list(header)
+        self.width = len(self.header)
+        self.symbols = []
+        self.codes = {}
+        cells = array("I")
+        for number, row in enumerate(rows, 1):
+            if len(row) != self.width:
+                raise ValueError(
+                    "row %d has %d columns, expected %d"
+                    % (number, len(row), self.width)
+                )
+            for value in row:
+                code = self.codes.get(value)
+                if code is None:
+                    code = self.codes[value] = len(self.symbols)
+                    self.symbols.append(sys.intern(value))
+                cells.append(code)
+
+        # Two bytes per cell are enough for the few hundred distinct values of a usual sheet.
+        self.cells = array("H", cells) if len(self.symbols) <= 0xFFFF else cells
+        self.length = len(cells) // self.width if self.width else 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("row index out of range")
+        start = index * self.width
+        symbols = self.symbols
+        return [symbols[code] for code in self.cells[start : start + self.width]]
+
+    def __iter__(self):
+        symbols, width, cells = self.symbols, self.width, self.cells
+        for start in range(0, len(cells), width):
+            yield [symbols[code] for code in cells[start : start + width]]
+
+    def cell(self, row, column):
+        """
+        ```cell(row: int, column: int) -> str``` <br/>
+        Returns a single cell of the table.
+        """
+        return self.symbols[self.cells[row * self.width + column]]
+
+    def column(self, column):
+        """
+        ```column(column: int) -> array``` <br/>
+        Returns the codes of every cell of a column (see ```symbols``` to decode them).
+        """
+        return self.cells[column :: self.width]
@@ -0,0 +1,177 @@
+# Importing **dependencies** and **modules**
+import os
+import csv
+import random
+import argparse
+
+# The **HEADER** of a schedule file, exactly as in **dhundo_db.csv**.
+HEADER = [
+    "DAY",
+    "Section",
+    "ROOM1",
+    "8 to 9",
+    "9 to 10",
+    "10 to 11",
+    "ROOM2",
+    "11 to 12",
+    "12 to 1",
+    "1 to 2",
+    "Section(DE)",
+    "ROOM3",
+    "3 to 4",
+    "ROOM4",
+    "4 to 5",
+    "ROOM5",
+    "5 to 6",
+]
+
+DAYS = ["MON", "TUE", "WED", "THU", "FRI"]
+
+# Teacher names are made up from these.
+FIRST_NAMES = ["Anita", "Arjun", "Deepa", "Kiran", "Meera", "Nikhil", "Priya", "Rahul"]
+LAST_NAMES = ["Das", "Mondal", "Rout", "Sahoo", "Mishra", "Panda", "Nayak", "Sarangi"]
+
+
+def letters(number, width=2):
+    """
+    ```letters(number: int, width: int) -> str``` <br/>
+    Spells a number with ```width``` uppercase letters (0 -> AA, 1 -> AB ...). Codes are made of letters only,
+    as digits would be taken for the section numbers of teacher codes (CRP_CS4).
+    """
+    word = ""
+    for _ in range(width):
+        number, letter = divmod(number, 26)
+        word = chr(ord("A") + letter) + word
+    return word
+
+
+def generateDataset(
+    directory, branches, sections, electives, electiveSections, rooms, seed=0
+):
+    """
+    ```generateDataset(directory: str, branches: int, sections: int, electives: int, electiveSections: int, rooms: int, seed: int) -> (str, str, str)``` <br/>
+    Writes a synthetic schedule, teacher and branch CSV file shaped like the real ones into ```directory``` and
+    returns their paths. Every branch has ```sections``` sections and offers ```electives``` electives (picked
+    from a shared pool, like AI is offered to several branches) of ```electiveSections``` sections each, every
+    elective section meeting three times a week. The same ```seed``` always gives the same files.
+    """
+    generator = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    schedulePath = os.path.join(directory, "dhundo_db.csv")
+    teacherPath = os.path.join(directory, "dhundo_teacher_db.csv")
+    branchPath = os.path.join(directory, "dhundo_branch_db.csv")
+
+    roomNames = ["C-LH-%03d" % (101 + room) for room in range(rooms)]
+    pool = ["E" + letters(elective) for elective in range(max(electives * 3, 12))]
+
+    branchCodes = [
+        ("B" + letters(branch), letters(branch)) for branch in range(branches)
+    ]
+    with open(branchPath, "w", newline="") as branchFile:
+        csv.writer(branchFile).writerows(branchCodes)
+
+    with open(schedulePath, "w", newline="") as scheduleFile, open(
+        teacherPath, "w", newline=""
+    ) as teacherFile:
+        schedule, teachers = csv.writer(scheduleFile), csv.writer(teacherFile)
+        schedule.writerow(HEADER)
+
+        plans = []
+        for branch, code in branchCodes:
+            subjects = ["S" + letters(generator.randrange(26 * 26)) for _ in range(8)]
+            offered = generator.sample(pool, electives)
+            # Every elective section meets on three days of the week, in one of the elective slots.
+            meetings = []
+            for elective in offered:
+                for DEId in range(1, electiveSections + 1):
+                    meetings.append(
+                        (
+                            "%s_%s-%d" % (elective, code, DEId),
+                            elective,
+                            {
+                                day: generator.randrange(3)
+                                for day in generator.sample(DAYS, 3)
+                            },
+                        )
+                    )
+                    teachers.writerow(
+                        [
+                            "%s_%s%d" % (elective, code, DEId),
+                            "Dr. %s %s"
+                            % (
+                                generator.choice(FIRST_NAMES),
+                                generator.choice(LAST_NAMES),
+                            ),
+                        ]
+                    )
+            plans.append((branch, subjects, meetings))
+
+        for day in DAYS:
+            for branch, subjects, meetings in plans:
+                for row in range(max(sections, len(meetings))):
+                    cells = [day]
+                    if row < sections:
+                        cells.append("%s-%d" % (branch, row + 1))
+                        for _ in range(2):
+                            block = [
+                                (
+                                    generator.choice(subjects)
+                                    if generator.random() < 0.7
+                                    else "X"
+                                )
+                                for _ in range(3)
+                            ]
+                            room = (
+                                generator.choice(roomNames)
+                                if block != ["X"] * 3
+                                else "X"
+                            )
+                            cells += [room] + block
+                    else:
+                        cells += ["X"] * 9
+
+                    if row < len(meetings):
+                        section, elective, slots = meetings[row]
+                        cells.append(section)
+                        for slot in range(3):
+                            if slots.get(day) == slot:
+                                cells += [
+                                    generator.choice(roomNames),
+                                    elective + "(DE)",
+                                ]
+                            else:
+                                cells += ["X", "X"]
+                    else:
+                        cells += ["X"] * 7
+                    schedule.writerow(cells)
+
+    return schedulePath, teacherPath, branchPath
+
+
+# Writes a synthetic university sized dataset, to be served with :
+# DHUNDO_SCHEDULE_CSV=<dir>/dhundo_db.csv DHUNDO_TEACHER_CSV=<dir>/dhundo_teacher_db.csv
+# DHUNDO_BRANCH_CSV=<dir>/dhundo_branch_db.csv gunicorn wsgi:app
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generates a synthetic schedule, teacher and branch CSV dataset."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--branches", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=60, help="per branch")
+    parser.add_argument("--electives", type=int, default=8, help="per branch")
+    parser.add_argument("--elective-sections", type=int, default=6, help="per elective")
+    parser.add_argument("--rooms", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    paths = generateDataset(
+        arguments.directory,
+        arguments.branches,
+        arguments.sections,
+        arguments.electives,
+        arguments.elective_sections,
+        arguments.rooms,
+        arguments.seed,
+    )
+    for path in paths:
+        print("written", path)
@@ -0,0 +1,91 @@
+# Importing **dependencies** and **modules**
+import os
+import sys
+import argparse
+import subprocess
+import statistics
+
+# The **ROOT** of the repository, from where gunicorn imports **wsgi.py**.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which must never be imported when a worker boots (they are only needed by the
+# **matplotlib** renderer and are imported lazily by it).
+FORBIDDEN_MODULES = ["pandas", "matplotlib"]
+
+# The snippet run in a fresh interpreter : imports the app exactly like gunicorn does and reports
+# the wall time along with the forbidden modules that got imported.
+SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import wsgi
+print(time.perf_counter() - start)
+print(",".join(module for module in %r if module in sys.modules))
+"""
+
+
+def measureImport():
+    """
+    ```measureImport() -> (float, list)``` <br/>
+    Imports **wsgi.py** in a fresh interpreter and returns the time taken (in seconds) along with the
+    forbidden modules that were imported.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", SNIPPET % FORBIDDEN_MODULES],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.splitlines()
+    return float(output[0]), [module for module in output[1].split(",") if module]
+
+
+def slowestImports(count):
+    """
+    ```slowestImports(count: int) -> list``` <br/>
+    Returns the ```count``` modules with the highest self import time (microseconds, module) reported
+    by ```python -X importtime```.
+    """
+    report = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import wsgi"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr.splitlines()
+    imports = []
+    for line in report:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:") :].split("|")
+        imports.append((int(own), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Checks that importing wsgi.py (worker boot) stays within a time budget."
+    )
+    parser.add_argument("--budget", type=float, default=0.75, help="seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    arguments = parser.parse_args()
+
+    timings, imported = [], set()
+    for _ in range(arguments.runs):
+        timing, forbidden = measureImport()
+        timings.append(timing)
+        imported.update(forbidden)
+    median = statistics.median(timings)
+
+    print("import wsgi : median %.3fs over %d runs" % (median, arguments.runs))
+    print("budget      : %.3fs" % arguments.budget)
+    for own, name in slowestImports(5):
+        print("  %8.1f ms  %s" % (own / 1000, name))
+
+    failed = False
+    if median > arguments.budget:
+        print("FAIL : import time is over budget")
+        failed = True
+    if imported:
+        print("FAIL : imported at boot : " + ", ".join(sorted(imported)))
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,304 @@
+# Importing **dependencies** and **modules**
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode, urlsplit, quote
+
+# The **ROOT** of the repository, from where gunicorn imports **wsgi.py**.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def startServer(port, workers, dataset=None, extra=()):
+    """
+    ```startServer(port: int, workers: int, dataset: str, extra: list) -> Popen``` <br/>
+    Starts gunicorn serving **wsgi.py** on ```127.0.0.1:port``` and waits until it answers. ```dataset``` is an
+    optional directory written by ```generate_dataset.py``` to serve instead of the shipped CSV files.
+    """
+    environment = dict(os.environ)
+    if dataset is not None:
+        environment["DHUNDO_SCHEDULE_CSV"] = os.path.join(dataset, "dhundo_db.csv")
+        environment["DHUNDO_TEACHER_CSV"] = os.path.join(
+            dataset, "dhundo_teacher_db.csv"
+        )
+        environment["DHUNDO_BRANCH_CSV"] = os.path.join(dataset, "dhundo_branch_db.csv")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "wsgi:app"]
+        + ["--workers", str(workers), "--bind", "127.0.0.1:%d" % port]
+        + list(extra),
+        cwd=ROOT,
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("gunicorn exited with status %d" % server.returncode)
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/branches")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("gunicorn did not answer within 120 seconds")
+
+
+def getJSON(host, port, path):
+    """
+    ```getJSON(host: str, port: int, path: str) -> dict``` <br/>
+    Returns the JSON body of a GET request, or None when it does not answer with 200.
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request("GET", path)
+    response = connection.getresponse()
+    body = response.read()
+    return json.loads(body) if response.status == 200 else None
+
+
+def requestPool(host, port, size, seed=0):
+    """
+    ```requestPool(host: str, port: int, size: int, seed: int) -> list``` <br/>
+    Builds ```size``` distinct timetable requests from the branches, sections and electives the server offers,
+    each with a second elective which does not clash with the first (as the frontend would only offer those).
+    """
+    generator = random.Random(seed)
+    branches = getJSON(host, port, "/meta")["branches"]
+    branches = {
+        branch: data for branch, data in branches.items() if len(data["electives"]) > 1
+    }
+    pool, attempts = set(), 0
+    while len(pool) < size and attempts < 20 * size:
+        attempts += 1
+        branch = generator.choice(sorted(branches))
+        elective = generator.choice(branches[branch]["electives"])
+        DEId = generator.randint(1, elective["DEIDs"])
+        compatible = getJSON(
+            host,
+            port,
+            "/branches/%s/electives/%s/%d/compatible"
+            % (quote(branch), quote(elective["code"]), DEId),
+        )
+        if not compatible or not compatible["compatible"]:
+            continue
+        second = generator.choice(compatible["compatible"])
+        pool.add(
+            (
+                branch,
+                generator.randint(1, branches[branch]["sections"]),
+                elective["code"],
+                DEId,
+                second["code"],
+                second["DEID"],
+            )
+        )
+    return sorted(pool)
+
+
+def buildRequest(timetable, formData):
+    """
+    ```buildRequest(timetable: tuple, formData: bool) -> (str, str, str, bytes, dict)``` <br/>
+    Returns the (endpoint, method, path, body, headers) of a request for a timetable, either as the query of
+    ```/generateTimeTable``` or as the form posted to ```/form-data```.
+    """
+    branch, section, e1_code, e1_teacher, e2_code, e2_teacher = timetable
+    if formData:
+        body = urlencode(
+            {
+                "class": "%s %d" % (branch, section),
+                "elective1": "%s_%s %d" % (e1_code, branch, e1_teacher),
+                "elective2": "%s_%s %d" % (e2_code, branch, e2_teacher),
+            }
+        ).encode()
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        return "/form-data", "POST", "/form-data", body, headers
+    query = urlencode(
+        {
+            "_branch": branch,
+            "_section": section,
+            "_e1_code": e1_code,
+            "_e1_teacher": e1_teacher,
+            "_e2_code": e2_code,
+            "_e2_teacher": e2_teacher,
+        }
+    )
+    return "/generateTimeTable", "GET", "/generateTimeTable?" + query, None, {}
+
+
+def percentile(timings, fraction):
+    """
+    ```percentile(timings: list, fraction: float) -> float``` <br/>
+    Returns the nearest rank percentile of sorted ```timings```.
+    """
+    if not timings:
+        return None
+    return timings[
+        min(len(timings) - 1, max(0, int(fraction * len(timings) + 0.5) - 1))
+    ]
+
+
+def run(host, port, pool, concurrency, duration, formShare, skew, seed=0):
+    """
+    ```run(host: str, port: int, pool: list, concurrency: int, duration: float, formShare: float, skew: float, seed: int) -> dict``` <br/>
+    Replays requests from the ```pool``` on ```concurrency``` keep-alive connections for ```duration``` seconds.
+    Popular timetables are asked for more often (Zipf like, with exponent ```skew```), and a ```formShare```
+    of the requests go through ```/form-data```. Returns the latencies and statuses of every request.
+    """
+    weights = [1 / (rank + 1) ** skew for rank in range(len(pool))]
+    results, results_lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(number):
+        generator = random.Random(seed + number)
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        local = []
+        while time.perf_counter() < deadline:
+            timetable = generator.choices(pool, weights)[0]
+            endpoint, method, path, body, headers = buildRequest(
+                timetable, generator.random() < formShare
+            )
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=60)
+                status = "error"
+            local.append((endpoint, status, time.perf_counter() - start))
+        with results_lock:
+            results.extend(local)
+
+    start = time.perf_counter()
+    clients = [
+        threading.Thread(target=client, args=(number,)) for number in range(concurrency)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return {"seconds": time.perf_counter() - start, "results": results}
+
+
+def report(measurement):
+    """
+    ```report(measurement: dict) -> dict``` <br/>
+    Summarizes a run : the throughput and the p50 / p95 / p99 latencies (in milliseconds) and status counts,
+    overall and per endpoint.
+    """
+
+    def summarize(results):
+        timings = sorted(latency for _, _, latency in results)
+        statuses = {}
+        for _, status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(results),
+            "throughput": len(results) / measurement["seconds"],
+            "p50_ms": percentile(timings, 0.50) * 1000 if timings else None,
+            "p95_ms": percentile(timings, 0.95) * 1000 if timings else None,
+            "p99_ms": percentile(timings, 0.99) * 1000 if timings else None,
+            "max_ms": timings[-1] * 1000 if timings else None,
+            "statuses": statuses,
+        }
+
+    endpoints = sorted({endpoint for endpoint, _, _ in measurement["results"]})
+    return {
+        "seconds": measurement["seconds"],
+        "total": summarize(measurement["results"]),
+        "endpoints": {
+            endpoint: summarize(
+                [result for result in measurement["results"] if result[0] == endpoint]
+            )
+            for endpoint in endpoints
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replays a realistic request mix against the app served by gunicorn and reports latencies."
+    )
+    parser.add_argument(
+        "--url", help="an already running server (default : start gunicorn)"
+    )
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dataset", help="directory written by generate_dataset.py")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds, not reported")
+    parser.add_argument("--distinct", type=int, default=300, help="distinct timetables")
+    parser.add_argument("--form-share", type=float, default=0.2)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file for the report")
+    arguments, extra = parser.parse_known_args()
+
+    server = None
+    if arguments.url:
+        address = urlsplit(arguments.url)
+        host, port = address.hostname, address.port or 80
+    else:
+        host, port = "127.0.0.1", arguments.port
+        # Arguments not known here are passed on to gunicorn (e.g. --threads 4).
+        server = startServer(port, arguments.workers, arguments.dataset, extra)
+
+    try:
+        pool = requestPool(host, port, arguments.distinct, arguments.seed)
+        if not pool:
+            raise SystemExit("the server offers no timetable to ask for")
+        settings = (arguments.form_share, arguments.skew, arguments.seed)
+        if arguments.warmup:
+            run(host, port, pool, arguments.concurrency, arguments.warmup, *settings)
+        measurement = run(
+            host, port, pool, arguments.concurrency, arguments.duration, *settings
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = report(measurement)
+    summary["settings"] = {
+        key: value for key, value in vars(arguments).items() if key != "output"
+    }
+    summary["settings"]["gunicorn"] = extra
+    print(
+        "%d requests in %.1fs (%d timetables, concurrency %d)"
+        % (
+            summary["total"]["requests"],
+            summary["seconds"],
+            len(pool),
+            arguments.concurrency,
+        )
+    )
+    for name, data in [("total", summary["total"])] + list(
+        summary["endpoints"].items()
+    ):
+        if not data["requests"]:
+            continue
+        print(
+            "  %-20s %8.1f req/s  p50 %7.2f ms  p95 %7.2f ms  p99 %7.2f ms  %s"
+            % (
+                name,
+                data["throughput"],
+                data["p50_ms"],
+                data["p95_ms"],
+                data["p99_ms"],
+                data["statuses"],
+            )
+        )
+    if arguments.output:
+        with open(arguments.output, "w") as saved:
+            json.dump(summary, saved, indent=2)
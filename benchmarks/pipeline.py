@@ -0,0 +1,329 @@
+# Importing **dependencies** and **modules**
+import os
+import csv
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+# The **ROOT** of the repository, added to the path so the **app** package can be imported when the script
+# is run as ```python benchmarks/pipeline.py```.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.config import SCHEDULE_PATH, TEACHER_PATH, BRANCH_PATH
+from app.dataset import readBranchMap, readCSV, readSchedule, buildHeaderMap
+from app.dataset import buildTeacherIndex, buildMetaData, buildTimetableIndex
+from app.dataset import buildRoomIndex, loadDataset, findTeacher, createTimetable
+from app.dataset import apply2DTransform
+from app.renderer import TimeTableCreator, renderNativePDF
+
+# The **RESULTS** directory where the results are written by default, one file per commit.
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+
+
+def scaleDataset(factor, directory):
+    """
+    ```scaleDataset(factor: int, directory: str) -> (str, str)``` <br/>
+    Writes a synthetic copy of the schedule and teacher CSV files ```factor``` times as large into
+    ```directory``` and returns their paths. Every copy renumbers the sections (CSE-1 -> CSE-21 ...), the
+    elective sections (CRP_CS-1 -> CRP_CS-21 ...) and the teacher codes, so the copies are distinct
+    timetables sharing the branches and electives of the original.
+    """
+    header, rows = readSchedule(SCHEDULE_PATH)
+    teacherData = readCSV(TEACHER_PATH)
+    header_map = buildHeaderMap(header)
+
+    def split(code, separator):
+        name, _, number = code.rpartition(separator)
+        return (name, int(number)) if name and number.isdigit() else (None, 0)
+
+    # Every branch (CSE) and elective of a branch (CRP_CS) is renumbered past its own highest number, so
+    # the sections of every copy stay contiguous.
+    highest = {}
+    for row in rows:
+        for column in ("SECTION", "SECTION(DE)"):
+            name, number = split(row[header_map[column]], "-")
+            highest[name] = max(number, highest.get(name, 0))
+
+    def renumber(code, separator, copy):
+        name, number = split(code, separator)
+        if name is None:
+            return code
+        return "%s%s%d" % (name, separator, number + copy * highest.get(name, 0))
+
+    schedulePath = os.path.join(directory, "dhundo_db_x%d.csv" % factor)
+    teacherPath = os.path.join(directory, "dhundo_teacher_db_x%d.csv" % factor)
+    with open(schedulePath, "w", newline="") as schedule:
+        writer = csv.writer(schedule)
+        writer.writerow(header)
+        for copy in range(factor):
+            for row in rows:
+                for column in ("SECTION", "SECTION(DE)"):
+                    row[header_map[column]] = renumber(
+                        row[header_map[column]], "-", copy
+                    )
+                writer.writerow(row)
+
+    with open(teacherPath, "w", newline="") as teachers:
+        writer = csv.writer(teachers)
+        for copy in range(factor):
+            for row in teacherData:
+                code, name = row[0], row[1]
+                elective = code.rstrip("0123456789")
+                number = code[len(elective) :]
+                if number:
+                    code = "%s%d" % (
+                        elective,
+                        int(number) + copy * highest.get(elective, 0),
+                    )
+                writer.writerow([code, name])
+    return schedulePath, teacherPath
+
+
+def sampleRequests(meta_data, count, seed=0):
+    """
+    ```sampleRequests(meta_data: dict, count: int, seed: int) -> list``` <br/>
+    Returns ```count``` random (but reproducible) timetable requests, each for two different electives of a
+    branch.
+    """
+    generator = random.Random(seed)
+    branches = [
+        branch
+        for branch in meta_data["branch_noOfSections"]
+        if len(
+            meta_data["branch_electives"].get(branch, {"electives": {}})["electives"]
+        )
+        > 1
+    ]
+    requests = []
+    for _ in range(count):
+        branch = generator.choice(branches)
+        electives = meta_data["branch_electives"][branch]["electives"]
+        first, second = generator.sample(sorted(electives), 2)
+        requests.append(
+            (
+                branch,
+                generator.randint(1, meta_data["branch_noOfSections"][branch]),
+                (
+                    first.replace("(DE)", ""),
+                    generator.choice(sorted(electives[first]["teachers"])),
+                ),
+                (
+                    second.replace("(DE)", ""),
+                    generator.choice(sorted(electives[second]["teachers"])),
+                ),
+            )
+        )
+    return requests
+
+
+def timeStage(function, repeat, calls=1):
+    """
+    ```timeStage(function: function, repeat: int, calls: int) -> dict``` <br/>
+    Runs ```function``` ```repeat``` times and returns the best, median and mean time of a single call (in
+    seconds), ```function``` making ```calls``` calls each time it runs.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) / calls)
+    return {
+        "calls": calls,
+        "repeat": repeat,
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+    }
+
+
+def benchmark(schedulePath, teacherPath, repeat, count, matplotlib=False):
+    """
+    ```benchmark(schedulePath: str, teacherPath: str, repeat: int, count: int, matplotlib: bool) -> dict``` <br/>
+    Times every stage of the pipeline separately on the given CSV files. The per request stages are timed over
+    ```count``` sampled requests, and the results are given per call.
+    """
+    header, rows = readSchedule(schedulePath)
+    teacherData = readCSV(teacherPath)
+    header_map = buildHeaderMap(header)
+    branch_to_elective = readBranchMap(BRANCH_PATH)
+    elective_to_branch = {code: branch for branch, code in branch_to_elective.items()}
+    teachers = buildTeacherIndex(teacherData, elective_to_branch)
+    meta_data = buildMetaData(rows, header_map, teachers, branch_to_elective)
+    dataset = loadDataset(schedulePath, teacherPath)
+
+    requests = sampleRequests(meta_data, count)
+    electives = [
+        (branch, elective, DEId)
+        for branch, data in meta_data["branch_electives"].items()
+        for elective, electiveData in data["electives"].items()
+        for DEId in electiveData["teachers"]
+    ]
+    timetables = [createTimetable(*request, dataset)[1] for request in requests]
+    tables = [apply2DTransform(timetable) for timetable in timetables]
+
+    stages = {
+        "csv_load": timeStage(
+            lambda: (readSchedule(schedulePath), readCSV(teacherPath)), repeat
+        ),
+        "header_map": timeStage(lambda: buildHeaderMap(header), repeat),
+        "teacher_index": timeStage(
+            lambda: buildTeacherIndex(teacherData, elective_to_branch), repeat
+        ),
+        "meta_data": timeStage(
+            lambda: buildMetaData(rows, header_map, teachers, branch_to_elective),
+            repeat,
+        ),
+        "timetable_index": timeStage(
+            lambda: buildTimetableIndex(rows, header_map), repeat
+        ),
+        "room_index": timeStage(lambda: buildRoomIndex(rows, header_map), repeat),
+        "load_dataset": timeStage(
+            lambda: loadDataset(schedulePath, teacherPath), repeat
+        ),
+        "findTeacher": timeStage(
+            lambda: [
+                findTeacher(*elective, teachers, meta_data) for elective in electives
+            ],
+            repeat,
+            max(1, len(electives)),
+        ),
+        "createTimetable": timeStage(
+            lambda: [createTimetable(*request, dataset) for request in requests],
+            repeat,
+            len(requests),
+        ),
+        "apply2DTransform": timeStage(
+            lambda: [apply2DTransform(timetable) for timetable in timetables],
+            repeat,
+            len(timetables),
+        ),
+        "render_native": timeStage(
+            lambda: [renderNativePDF([table]) for table in tables],
+            repeat,
+            len(tables),
+        ),
+        "TimeTableCreator": timeStage(
+            lambda: [
+                TimeTableCreator(
+                    branch, section, *elective1, *elective2, dataset=dataset
+                )
+                for branch, section, elective1, elective2 in requests
+            ],
+            repeat,
+            len(requests),
+        ),
+    }
+    if matplotlib:
+        from app.renderer import renderMatplotlibPDF
+
+        # The matplotlib renderer is slow : a handful of tables is enough.
+        stages["render_matplotlib"] = timeStage(
+            lambda: [renderMatplotlibPDF([table]) for table in tables[:10]],
+            1,
+            len(tables[:10]),
+        )
+
+    return {
+        "rows": len(rows),
+        "teachers": len(teacherData),
+        "branches": len(meta_data["branch_noOfSections"]),
+        "elective_sections": len(electives),
+        "stages": stages,
+    }
+
+
+def gitCommit():
+    """
+    ```gitCommit() -> str``` <br/>
+    Returns the commit the benchmark is run on (with a ```-dirty``` suffix for uncommitted changes), or None
+    outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    ```compare(results: dict, baseline: dict)``` <br/>
+    Prints the ratio of the median time of every stage to the one in the ```baseline``` results.
+    """
+    print("\ncompared to %s :" % baseline.get("commit"))
+    for scale, result in results["scales"].items():
+        if scale not in baseline["scales"]:
+            continue
+        for stage, timing in result["stages"].items():
+            before = baseline["scales"][scale]["stages"].get(stage)
+            if before is None or not before["median"]:
+                continue
+            print(
+                "  x%-5s %-18s %6.2fx"
+                % (scale, stage, timing["median"] / before["median"])
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Times every stage of the timetable pipeline on the real data and on scaled synthetic data."
+    )
+    parser.add_argument(
+        "--scales", default="1,10,100,1000", help="comma separated scale factors"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests timed per stage"
+    )
+    parser.add_argument(
+        "--matplotlib", action="store_true", help="also time the matplotlib renderer"
+    )
+    parser.add_argument("--output", help="JSON file (default benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON file of an earlier run")
+    arguments = parser.parse_args()
+
+    results = {
+        "commit": gitCommit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for factor in [int(scale) for scale in arguments.scales.split(",")]:
+            if factor == 1:
+                paths = SCHEDULE_PATH, TEACHER_PATH
+            else:
+                paths = scaleDataset(factor, directory)
+            # Larger datasets are only loaded once per stage, the per request stages stay cheap.
+            repeat = arguments.repeat if factor < 100 else 1
+            result = benchmark(*paths, repeat, arguments.requests, arguments.matplotlib)
+            results["scales"][str(factor)] = result
+
+            print("x%d : %d rows" % (factor, result["rows"]))
+            for stage, timing in result["stages"].items():
+                print("  %-18s %12.1f us" % (stage, timing["median"] * 1e6))
+
+    output = arguments.output or os.path.join(
+        RESULTS, "pipeline-%s.json" % (results["commit"] or "local")
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as saved:
+        json.dump(results, saved, indent=2)
+    print("results written to", output)
+
+    if arguments.compare:
+        with open(arguments.compare) as saved:
+            compare(results, json.load(saved))
@@ -0,0 +1,25 @@
+# Importing **dependencies** and **modules**
+import gc
+from app.config import PRELOAD
+
+# The **gunicorn** settings of the app, read by ```gunicorn wsgi:app``` from the root of the repository.
+#
+# With **DHUNDO_PRELOAD=1** the master imports the app, and so loads the dataset (from the snapshot when
+# **DHUNDO_SNAPSHOT** is set), once before forking the workers. The workers then share its memory pages copy on
+# write instead of each holding its own copy, and start without loading anything.
+preload_app = PRELOAD
+
+
+def pre_fork(server, worker):
+    # Moving the loaded objects out of the reach of the garbage collector, which would otherwise write to
+    # (and so copy) every page holding them in each worker.
+    if PRELOAD:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # The background threads are started in every worker, as threads do not survive the fork.
+    if PRELOAD:
+        from app.main import startBackground
+
+        startBackground()
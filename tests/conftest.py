@@ -0,0 +1,72 @@
+import os
+import atexit
+import shutil
+import tempfile
+
+import pytest
+
+# The configuration is read from the environment when the app is first imported (see config.py) : the tests serve
+# copies of the CSV files, which the reload tests edit, with an admin token and small process pools.
+DATA = tempfile.mkdtemp(prefix="dhundo-tests-")
+atexit.register(shutil.rmtree, DATA, True)
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+for name, variable in (
+    ("dhundo_db.csv", "DHUNDO_SCHEDULE_CSV"),
+    ("dhundo_teacher_db.csv", "DHUNDO_TEACHER_CSV"),
+):
+    shutil.copy(os.path.join(APP, name), os.path.join(DATA, name))
+    os.environ[variable] = os.path.join(DATA, name)
+os.environ["DHUNDO_ADMIN_TOKEN"] = ADMIN_TOKEN = "test-token"
+os.environ.setdefault("DHUNDO_BATCH_WORKERS", "2")
+os.environ.setdefault("DHUNDO_JOB_WORKERS", "1")
+os.environ.setdefault("DHUNDO_PREWARM_WORKERS", "1")
+for variable in ("DHUNDO_CACHE_DIR", "DHUNDO_SNAPSHOT", "DHUNDO_PRELOAD"):
+    os.environ.pop(variable, None)
+
+SCHEDULE_PATH = os.environ["DHUNDO_SCHEDULE_CSV"]
+TEACHER_PATH = os.environ["DHUNDO_TEACHER_CSV"]
+
+# The **QUERY** of a timetable whose two electives do not clash, and its fields.
+FIELDS = {
+    "_branch": "CSE",
+    "_section": "21",
+    "_e1_code": "CI",
+    "_e1_teacher": "2",
+    "_e2_code": "CRP",
+    "_e2_teacher": "4",
+}
+QUERY = "&".join("%s=%s" % item for item in FIELDS.items())
+
+
+@pytest.fixture
+def client():
+    from app.main import app
+
+    return app.test_client()
+
+
+@pytest.fixture
+def admin():
+    return {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@pytest.fixture
+def teachers():
+    # Rewrites the name of a teacher in the teacher file, which (along with the dataset) is restored afterwards.
+    from app.dataset import reloadDataset
+
+    with open(TEACHER_PATH, newline="") as data:
+        original = data.read()
+
+    def rename(code, name):
+        lines = [
+            '%s,"%s"' % (code, name) if line.split(",", 1)[0] == code else line
+            for line in original.splitlines()
+        ]
+        with open(TEACHER_PATH, "w", newline="") as data:
+            data.write("\n".join(lines) + "\n")
+
+    yield rename
+    with open(TEACHER_PATH, "w", newline="") as data:
+        data.write(original)
+    reloadDataset()
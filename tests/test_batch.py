@@ -0,0 +1,103 @@
+import io
+import re
+import zipfile
+
+import pytest
+from conftest import FIELDS
+from app.batch import parseBatch, buildTable
+from app.config import RENDERER
+from app.dataset import getDataset
+from app.renderer import renderPDF
+
+BRANCH = {field: value for field, value in FIELDS.items() if field != "_section"}
+CLASHING = dict(FIELDS, _section="20", _e1_code="AI")
+
+
+def pageCount(pdf):
+    return int(re.search(rb"/Type /Pages /Kids \[[^]]*\] /Count (\d+)", pdf).group(1))
+
+
+def test_batch_requests_are_parsed():
+    meta_data = getDataset()["meta_data"]
+    requests = parseBatch(BRANCH, meta_data)
+    assert len(requests) == 26
+    assert requests[20] == ("CSE", "21", "CI", "2", "CRP", "4")
+    assert parseBatch({"requests": [dict(FIELDS, _branch="cse")]}, meta_data) == [
+        ("CSE", "21", "CI", "2", "CRP", "4")
+    ]
+    for body, message in (
+        ([], "expected a JSON object"),
+        ({"requests": {}}, "requests must be a list"),
+        ({"requests": [{"_branch": "CSE"}]}, "request 0 must have the fields"),
+        ({"requests": [dict(FIELDS, _e2_code=" ")]}, "request 0 : missing fields"),
+        (dict(BRANCH, _branch="XYZ"), "unknown branch XYZ"),
+        ({"_branch": "CSE"}, "expected either requests or the fields"),
+    ):
+        with pytest.raises(ValueError, match=message):
+            parseBatch(body, meta_data)
+
+
+def test_batch_zip(client):
+    response = client.post(
+        "/generateTimeTable/batch", json={"requests": [FIELDS, CLASHING, FIELDS]}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    # The same timetable asked for twice is only archived once.
+    assert archive.namelist() == ["CSE-21 CI_CS-2 CRP_CS-4.pdf", "errors.txt"]
+    assert archive.read("CSE-21 CI_CS-2 CRP_CS-4.pdf").startswith(b"%PDF")
+    assert (
+        archive.read("errors.txt")
+        .decode()
+        .startswith("CSE 20 AI 2 CRP 4 : the electives clash on MON 3 TO 4")
+    )
+
+
+def test_batch_pdf_of_a_branch(client):
+    response = client.post("/generateTimeTable/batch", json=dict(BRANCH, format="pdf"))
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert pageCount(response.data) == 26
+    # The pages drawn in parallel are put together in the order of the sections.
+    if RENDERER == "native":
+        dataset = getDataset()
+        tables = [
+            buildTable(request, dataset)[0]
+            for request in parseBatch(BRANCH, dataset["meta_data"])
+        ]
+        assert response.data == renderPDF(tables)
+
+    # The same batch is then served from the cache.
+    again = client.post("/generateTimeTable/batch", json=dict(BRANCH, format="pdf"))
+    assert again.data == response.data
+
+
+def test_batch_pdf_errors(client):
+    response = client.post(
+        "/generateTimeTable/batch",
+        json={"requests": [FIELDS, CLASHING], "format": "pdf"},
+    )
+    assert response.status_code == 200
+    assert pageCount(response.data) == 1
+
+    response = client.post(
+        "/generateTimeTable/batch", json={"requests": [CLASHING], "format": "pdf"}
+    )
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "no timetable could be created"
+    assert len(response.get_json()["errors"]) == 1
+
+    response = client.post("/generateTimeTable/batch", json={"requests": "all"})
+    assert response.status_code == 400
+    assert client.post("/generateTimeTable/batch", data="{").status_code == 400
+
+
+def test_merged_matplotlib_pages():
+    pytest.importorskip("matplotlib")
+    from app.renderer import renderMatplotlibPDF, mergePDFs
+
+    table = [["DAY", "8 TO 9"], ["MON", "CN"]]
+    merged = mergePDFs([renderMatplotlibPDF([table]), renderMatplotlibPDF([table] * 2)])
+    assert merged.startswith(b"%PDF") and merged.rstrip().endswith(b"%%EOF")
+    assert int(re.findall(rb"/Count (\d+)", merged)[-1]) == 3
@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+
+import pytest
+from app.cache import RenderCache, normalizeRequest, renderKey, keyDigest
+from app.cache import CACHE_SUFFIX, LEGACY_SUFFIX
+
+SECTION = ("section", "CSE-21")
+TEACHER = ("teacher", "CRP_CS4")
+OTHER = ("section", "CSE-20")
+
+
+def entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(CACHE_SUFFIX))
+
+
+def test_request_keys():
+    from app.dataset import getDataset
+
+    dataset = getDataset()
+    request = normalizeRequest(" cse", 21, "ci ", "2", "crp", "4")
+    assert request == ("CSE", "21", "CI", "2", "CRP", "4")
+    with pytest.raises(ValueError, match="missing fields : _section, _e2_code"):
+        normalizeRequest("CSE", None, "CI", "2", " ", "4")
+    key = renderKey(dataset, "cse", "21", "ci", "2", "crp", "4")
+    assert key[0] == "pdf"
+    assert key[-6:] == ("CSE", "21", "CI", "2", "CRP", "4")
+    assert key == renderKey(dataset, "CSE", "21", "CI", "2", "CRP", "4")
+    assert keyDigest(key) != keyDigest(("svg",) + key[1:])
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = RenderCache(10)
+    cache.put("a", "a.pdf", b"aaaa")
+    cache.put("b", "b.pdf", b"bbbb")
+    assert cache.get("a") == ("a.pdf", b"aaaa")
+    cache.put("c", "c.pdf", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert (len(cache), cache.size) == (2, 8)
+    # An entry larger than the whole cache is not kept.
+    cache.put("d", "d.pdf", b"d" * 11)
+    assert cache.get("d") is None and len(cache) == 2
+
+
+def test_contains_counts_no_lookup(tmp_path):
+    cache = RenderCache(100, str(tmp_path))
+    cache.put("a", "a.pdf", b"aaaa", memory=False)
+    assert cache.contains("a") and not cache.contains("b")
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+
+def test_invalidate_only_evicts_the_changed_dependencies():
+    cache = RenderCache(1000)
+    cache.put("a", "a.pdf", b"a", dependencies=(SECTION, TEACHER))
+    cache.put("b", "b.pdf", b"b", dependencies=(OTHER,))
+    cache.put("c", "c.pdf", b"c", dependencies=(OTHER, TEACHER))
+    assert sorted(cache.invalidate({TEACHER, ("elective", "AI_CS-2")})) == ["a", "c"]
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.get("b") == ("b.pdf", b"b")
+    assert cache.invalidate(set()) == []
+    assert cache.size == 1
+
+    # A layout change (None) evicts everything.
+    assert cache.invalidate(None) == ["b"]
+    assert (len(cache), cache.size) == (0, 0)
+
+
+def test_directory_entries_keep_their_dependencies(tmp_path):
+    writer = RenderCache(1000, str(tmp_path))
+    writer.put("a", "a.pdf", b"%PDF a", dependencies=(SECTION, TEACHER))
+    writer.put("b", "b.pdf", b"%PDF b", dependencies=(OTHER,))
+
+    # Another worker loads the entries from the directory, along with their dependencies.
+    reader = RenderCache(1000, str(tmp_path))
+    assert reader.get("a") == ("a.pdf", b"%PDF a")
+    assert reader.getDigest(keyDigest("b")) == ("b.pdf", b"%PDF b")
+    assert reader.getDigest("../etc/passwd") is None
+    assert reader.invalidate({TEACHER}) == ["a"]
+    assert entries(tmp_path) == [keyDigest("b") + CACHE_SUFFIX]
+
+    # Entries which were never loaded by a worker are invalidated from the directory too.
+    RenderCache(1000, str(tmp_path)).invalidate({OTHER})
+    assert entries(tmp_path) == []
+
+
+def test_directory_is_trimmed_to_its_cap(tmp_path):
+    cache = RenderCache(0, str(tmp_path), maxDiskBytes=2000)
+    legacy = tmp_path / ("0" * 64 + LEGACY_SUFFIX)
+    legacy.write_bytes(b"x" * 500)
+    os.utime(legacy, (0, 0))
+    for number in range(10):
+        cache.put(number, "%d.pdf" % number, b"x" * 300, memory=False)
+        # The files are told apart by their modification time.
+        os.utime(cache._path(number), (number + 1, number + 1))
+    sizes = [
+        os.path.getsize(tmp_path / name)
+        for name in os.listdir(tmp_path)
+        if name.endswith((CACHE_SUFFIX, LEGACY_SUFFIX))
+    ]
+    assert sum(sizes) <= 2000
+    assert not legacy.exists()
+    # The most recently used entries are the ones kept.
+    assert cache.contains(9) and not cache.contains(0)
+
+
+def test_concurrent_renders_are_coalesced(tmp_path):
+    for directory in (None, str(tmp_path)):
+        cache, renders, results = RenderCache(1000, directory), [], []
+        started = threading.Event()
+
+        def render():
+            renders.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "a.pdf", b"%PDF a"
+
+        def request():
+            results.append(cache.coalesce("a", render, dependencies=(SECTION,)))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(renders) == 1
+        assert results == [("a.pdf", b"%PDF a")] * 5
+        assert cache.invalidate({SECTION}) == ["a"]
+
+
+def test_coalesced_render_errors_are_raised(tmp_path):
+    cache = RenderCache(1000, str(tmp_path))
+
+    def render():
+        raise KeyError("CSE-99")
+
+    with pytest.raises(KeyError):
+        cache.coalesce("a", render)
+    assert not cache.contains("a")
+    # The failed render is not remembered : the next call renders again.
+    assert cache.coalesce("a", lambda: ("a.pdf", b"a")) == ("a.pdf", b"a")
+
+
+def test_workers_share_renders_through_the_directory(tmp_path):
+    first, second = RenderCache(1000, str(tmp_path)), RenderCache(1000, str(tmp_path))
+    first.coalesce("a", lambda: ("a.pdf", b"a"), dependencies=(SECTION,))
+
+    def render():
+        raise AssertionError("rendered twice")
+
+    assert second.coalesce("a", render) == ("a.pdf", b"a")
@@ -0,0 +1,185 @@
+import pytest
+from conftest import QUERY
+
+CLASHING = QUERY.replace("_e1_code=CI", "_e1_code=AI")
+
+
+def test_teacher_by_code(client):
+    response = client.get("/teachers/crp_cs4")
+    assert response.status_code == 200
+    teacher = response.get_json()
+    assert (teacher["code"], teacher["section"]) == ("CRP_CS4", "CRP_CS-4")
+    assert {
+        "day": "MON",
+        "room": "C-LH-204",
+        "slot": "3 TO 4",
+        "subject": "CRP(DE)",
+    } in teacher["slots"]
+    assert client.get("/teachers/NOPE_CS1").status_code == 404
+
+
+def test_teacher_by_name(client):
+    response = client.get("/teachers?name=mrs.%20ADYASHA%20dash")
+    assert response.status_code == 200
+    assert [elective["code"] for elective in response.get_json()["electives"]] == [
+        "CRP_CS4"
+    ]
+    assert client.get("/teachers?name=nobody").status_code == 404
+    assert client.get("/teachers").status_code == 404
+
+
+def test_free_rooms(client):
+    response = client.get("/rooms/free?day=tue&slot=11%20to%2012")
+    assert response.status_code == 200
+    free = response.get_json()
+    assert (free["day"], free["slot"]) == ("TUE", "11 TO 12")
+    # A free room has no booking in that slot.
+    for room in free["rooms"]:
+        bookings = client.get("/rooms/" + room).get_json()["bookings"]
+        assert not [
+            booking
+            for booking in bookings
+            if (booking["day"], booking["slot"]) == ("TUE", "11 TO 12")
+        ]
+
+    response = client.get("/rooms/free?day=SUN&slot=11%20to%2012")
+    assert response.status_code == 400
+    assert "TUE" in response.get_json()["days"]
+
+
+def test_room_bookings(client):
+    response = client.get("/rooms/c-lh-204")
+    assert response.status_code == 200
+    assert response.get_json()["room"] == "C-LH-204"
+    assert {
+        "day": "MON",
+        "section": "CRP_CS-4",
+        "slot": "3 TO 4",
+        "subject": "CRP(DE)",
+    } in response.get_json()["bookings"]
+    assert client.get("/rooms/NOWHERE").status_code == 404
+
+
+def test_clashing_electives_are_refused(client):
+    for url in ("/generateTimeTable?", "/timetable?"):
+        response = client.get(url + CLASHING)
+        assert response.status_code == 409
+        assert {"day": "MON", "slot": "3 TO 4"} in response.get_json()["clashes"]
+    response = client.post("/jobs?" + CLASHING)
+    assert response.status_code == 409
+
+
+def test_compatible_electives(client):
+    response = client.get("/branches/cse/electives/crp/4/compatible")
+    assert response.status_code == 200
+    electives = response.get_json()
+    assert electives["elective"] == {"code": "CRP", "DEID": 4}
+    compatible = {
+        (elective["code"], elective["DEID"]) for elective in electives["compatible"]
+    }
+    clashing = {
+        (elective["code"], elective["DEID"]) for elective in electives["clashing"]
+    }
+    assert ("CI", 2) in compatible and ("AI", 2) in clashing
+    assert not compatible & clashing
+    # The clashes reported here are the ones refused when asking for the timetable.
+    assert client.get("/timetable?" + QUERY).status_code == 200
+    assert client.get("/timetable?" + CLASHING).status_code == 409
+
+    for url in ("XYZ/electives/CRP/4", "CSE/electives/ZZZ/4", "CSE/electives/CRP/99"):
+        assert client.get("/branches/%s/compatible" % url).status_code == 404
+
+
+@pytest.mark.parametrize(
+    "url", ["/meta", "/branches", "/branches/cse/sections", "/branches/CSE/electives"]
+)
+def test_metadata_is_revalidated(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.cache_control.public and response.cache_control.max_age
+    etag = response.headers["ETag"]
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag and not revalidated.data
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_metadata_of_unknown_branches(client):
+    assert client.get("/branches/XYZ/sections").status_code == 404
+    assert client.get("/branches/XYZ/electives").status_code == 404
+
+
+def test_timetable_json_is_revalidated(client):
+    response = client.get("/timetable?" + QUERY)
+    assert response.status_code == 200
+    timetable = response.get_json()
+    assert timetable["name"] == "CSE-21 CI_CS-2 CRP_CS-4"
+    assert timetable["timetable"][0][0] == "DAY"
+    etag = response.headers["ETag"]
+    revalidated = client.get("/timetable?" + QUERY, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and not revalidated.data
+    other = client.get("/timetable?" + QUERY.replace("=21", "=20"))
+    assert other.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "format, mimetype, start, attachment",
+    [
+        ("pdf", "application/pdf", b"%PDF", True),
+        ("ics", "text/calendar", b"BEGIN:VCALENDAR", True),
+        ("svg", "image/svg+xml", b"<svg", False),
+        ("png", "image/png", b"\x89PNG", False),
+    ],
+)
+def test_export_formats(client, format, mimetype, start, attachment):
+    if format == "png":
+        pytest.importorskip("matplotlib")
+    response = client.get("/generateTimeTable?format=%s&%s" % (format, QUERY))
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert response.data.lstrip().startswith(start)
+    disposition = response.headers["Content-Disposition"]
+    assert disposition.startswith("attachment") == attachment
+    assert "CSE-21 CI_CS-2 CRP_CS-4.%s" % format in disposition
+
+
+def test_calendar_events(client):
+    calendar = client.get("/generateTimeTable?format=ics&" + QUERY).data.decode()
+    assert calendar.endswith("END:VCALENDAR\r\n")
+    assert calendar.count("BEGIN:VEVENT") == calendar.count("END:VEVENT") > 0
+    assert "RRULE:FREQ=WEEKLY" in calendar
+    # Lines are folded at 75 octets.
+    assert all(len(line.encode()) <= 75 for line in calendar.split("\r\n"))
+
+
+def test_export_format_negotiation(client):
+    response = client.get(
+        "/generateTimeTable?" + QUERY, headers={"Accept": "image/svg+xml"}
+    )
+    assert response.mimetype == "image/svg+xml"
+    assert "Accept" in response.headers["Vary"]
+    response = client.get("/generateTimeTable?" + QUERY, headers={"Accept": "*/*"})
+    assert response.mimetype == "application/pdf"
+    response = client.get("/generateTimeTable?format=doc&" + QUERY)
+    assert response.status_code == 400
+    assert "ics" in response.get_json()["formats"]
+
+
+def test_metrics(client):
+    client.get("/generateTimeTable?" + QUERY)
+    client.get("/generateTimeTable?" + QUERY)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    metrics = response.data.decode()
+    assert (
+        'dhundo_requests_total{endpoint="/generateTimeTable",method="GET",status="200"}'
+        in metrics
+    )
+    assert 'dhundo_stage_seconds_count{stage="createTimetable"}' in metrics
+    assert "dhundo_render_cache_hit_ratio " in metrics
+    assert 'dhundo_render_cache_lookups_total{result="memory"}' in metrics
+    assert "dhundo_dataset_rows 390" in metrics
+    # Unknown URLs are counted under a single endpoint, not one per URL.
+    client.get("/no/such/page")
+    assert 'endpoint="unmatched"' in client.get("/metrics").data.decode()
@@ -0,0 +1,135 @@
+import csv
+
+import pytest
+from conftest import SCHEDULE_PATH, TEACHER_PATH
+from app.dataset import loadDataset, createTimetable
+from app.ingest import IngestError, Report, REPORT_SAMPLE
+from app.ingest import ingestSchedule, ingestTeachers, normalizeHeader
+
+REQUEST = ("CSE", "21", ("CI", "2"), ("CRP", "4"))
+
+
+def readRows(path):
+    with open(path, newline="") as data:
+        return list(csv.reader(data))
+
+
+def writeRows(path, rows):
+    with open(path, "w", newline="") as data:
+        csv.writer(data).writerows(rows)
+
+
+def test_ingest_round_trip(tmp_path):
+    schedule, teachers = str(tmp_path / "schedule.csv"), str(tmp_path / "teachers.csv")
+    report = Report()
+    ingestSchedule([(SCHEDULE_PATH, None)], schedule, report)
+    ingestTeachers([(TEACHER_PATH, None)], teachers, report)
+    assert report.errors == 0
+    assert report.counts[schedule] == {"read": 390, "written": 390}
+    assert report.counts[teachers] == {"read": 78, "written": 78}
+    # The files the app is served from come out as they went in (but for spaces in names).
+    with open(schedule, "rb") as ingested, open(SCHEDULE_PATH, "rb") as original:
+        assert ingested.read() == original.read()
+    dataset, original = loadDataset(schedule, teachers), loadDataset()
+    assert createTimetable(*REQUEST, dataset) == createTimetable(*REQUEST, original)
+    assert dataset["fingerprints"]["section"] == original["fingerprints"]["section"]
+    assert dataset["fingerprints"]["elective"] == original["fingerprints"]["elective"]
+    assert dataset["teachers"]["codes"].keys() == original["teachers"]["codes"].keys()
+
+    # Ingesting the ingested files changes nothing.
+    again = str(tmp_path / "again.csv")
+    ingestTeachers([(teachers, None)], again)
+    assert readRows(again) == readRows(teachers)
+
+
+def test_raw_sheets_are_normalized(tmp_path):
+    source, output = str(tmp_path / "raw.csv"), str(tmp_path / "schedule.csv")
+    header = readRows(SCHEDULE_PATH)[0]
+    rows = [row for row in readRows(SCHEDULE_PATH)[1:] if row[1] == "CSE-21"]
+    # A title above the header, the columns under other names and in another order, and spelled out days.
+    raw = [["Timetable", "2024"], ["Class", "Days"] + header[2:]]
+    for row in rows:
+        day = {"MON": "Monday", "TUE": "tuesday", "WED": "Wed", "THU": "THURSDAY"}
+        raw.append(["cse 21", day.get(row[0], row[0])] + row[2:])
+    writeRows(source, raw)
+
+    report = ingestSchedule([(source, None)], output)
+    assert report.errors == 0
+    assert readRows(output) == [header] + rows
+
+
+def test_rejected_rows_are_reported(tmp_path):
+    source, output = str(tmp_path / "raw.csv"), str(tmp_path / "schedule.csv")
+    rows = readRows(SCHEDULE_PATH)
+    bad = [
+        ["FUNDAY"] + rows[1][1:],
+        rows[2],
+        [rows[3][0], "NOT A SECTION"] + rows[3][2:],
+    ]
+    writeRows(source, rows[:4] + bad)
+
+    with Report(str(tmp_path / "errors.csv")) as report:
+        ingestSchedule([(source, None)], output, report)
+    assert report.counts[output] == {"read": 6, "written": 3}
+    with open(str(tmp_path / "errors.csv"), newline="") as data:
+        problems = [
+            (problem["row"], problem["column"], problem["message"])
+            for problem in csv.DictReader(data)
+            if problem["level"] == "error"
+        ]
+    assert problems == [
+        ("5", "DAY", "unknown day"),
+        ("6", "", "listed twice"),
+        ("7", "SECTION", "not a section (e.g. CSE-21)"),
+    ]
+    assert report.errors == 3
+
+    # With strict, nothing is written when rows are rejected.
+    with pytest.raises(IngestError, match="left unchanged"):
+        ingestSchedule([(source, None)], str(tmp_path / "strict.csv"), strict=True)
+    assert not (tmp_path / "strict.csv").exists()
+
+
+def test_report_keeps_a_bounded_sample(tmp_path):
+    path = str(tmp_path / "errors.csv")
+    with Report(path) as report:
+        for number in range(REPORT_SAMPLE * 5):
+            report.add("error", "raw.csv", number, "DAY", "FUNDAY", "unknown day")
+        report.add("warning", "raw.csv", 1, "ROOM1", "X", "classes without a room")
+    assert (report.errors, report.warnings) == (REPORT_SAMPLE * 5, 1)
+    assert len(report.problems) == REPORT_SAMPLE
+    assert len(readRows(path)) == 1 + REPORT_SAMPLE * 5 + 1
+
+
+def test_sheets_without_a_header(tmp_path):
+    source, output = str(tmp_path / "raw.csv"), str(tmp_path / "teachers.csv")
+    writeRows(source, [["Faculty list"], ["nothing", "here"]])
+    report = Report()
+    with pytest.raises(IngestError, match="no row was read"):
+        ingestTeachers([(source, None)], output, report)
+    assert report.problems[0]["message"].startswith("no header row found")
+    assert not (tmp_path / "teachers.csv").exists()
+
+
+def test_excel_workbooks(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    source, output = str(tmp_path / "raw.xlsx"), str(tmp_path / "teachers.csv")
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "CSE"
+    workbook.active.append(["Faculty Code", "Faculty Name"])
+    workbook.active.append(["crp_cs 4", "  Mrs.  Adyasha Dash "])
+    workbook.create_sheet("Empty").append(["Title"])
+    workbook.save(source)
+
+    report = Report()
+    with pytest.raises(IngestError):
+        ingestTeachers([(source, "Empty")], output, report)
+    ingestTeachers([(source, "CSE")], output, report)
+    assert readRows(output) == [["CRP_CS4", "Mrs. Adyasha Dash"]]
+
+
+def test_header_spellings():
+    assert normalizeHeader("08:00 - 08:55") == "8 TO 9"
+    assert normalizeHeader("1-2 PM") == "1 TO 2"
+    assert normalizeHeader("Room 1") == "ROOM1"
+    assert normalizeHeader("Section (DE)") == "SECTION(DE)"
@@ -0,0 +1,81 @@
+import pytest
+from conftest import FIELDS, QUERY
+from app.cache import RenderCache, renderKey
+from app.dataset import getDataset
+from app.jobs import JobQueue, QueueFull
+
+REQUEST = ("CSE", "21", "CI", "2", "CRP", "4")
+CLASHING = ("CSE", "20", "AI", "2", "CRP", "4")
+
+
+def test_job_round_trip(client):
+    response = client.post("/jobs", json=dict(FIELDS, _section="19"))
+    assert response.status_code in (200, 202)
+    job = response.get_json()
+    assert response.headers["Location"] == job["status"] == "/jobs/" + job["id"]
+
+    status = client.get(job["status"] + "?wait=30")
+    assert status.status_code == 200
+    assert status.get_json()["state"] == "done"
+    assert status.get_json()["name"] == "CSE-19 CI_CS-2 CRP_CS-4.pdf"
+    result = client.get(job["result"])
+    assert result.status_code == 200
+    assert result.data.startswith(b"%PDF")
+    direct = client.get("/generateTimeTable?" + QUERY.replace("=21", "=19"))
+    assert direct.data == result.data
+
+    # The same timetable (as a form, in lowercase) is the same job, already done.
+    again = client.post("/jobs", data=dict(FIELDS, _section="19", _branch="cse"))
+    assert again.status_code == 200
+    assert again.get_json()["id"] == job["id"]
+
+
+def test_job_errors(client):
+    response = client.post("/jobs", json={"_branch": "CSE"})
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("missing fields : _section")
+    assert client.post("/jobs", json=dict(FIELDS, _section="99")).status_code == 404
+    assert client.post("/jobs?" + QUERY.replace("CSE", "XYZ")).status_code == 404
+
+    unknown = "0" * 64
+    assert client.get("/jobs/" + unknown).status_code == 404
+    assert client.get("/jobs/%s/result" % unknown).status_code == 404
+    job = client.post("/jobs?" + QUERY).get_json()
+    assert client.get("/jobs/%s?wait=soon" % job["id"]).status_code == 400
+
+
+def test_cached_jobs_are_done_at_once():
+    dataset, cache = getDataset(), RenderCache(1000)
+    cache.put(renderKey(dataset, *REQUEST), "cached.pdf", b"%PDF cached")
+    queue = JobQueue(cache, workers=1, maxPending=0)
+    job, new = queue.submit(REQUEST, dataset)
+    assert new and job.done.is_set()
+    assert job.result == ("cached.pdf", b"%PDF cached")
+    assert queue.get(job.id) is job
+
+
+def test_full_queues_refuse_jobs():
+    queue = JobQueue(RenderCache(1000), workers=1, maxPending=0)
+    with pytest.raises(QueueFull):
+        queue.submit(REQUEST, getDataset())
+    assert queue.pool is None
+
+
+def test_failed_jobs_are_tried_again():
+    dataset, cache = getDataset(), RenderCache(100000)
+    queue = JobQueue(cache, workers=1)
+    job, new = queue.submit(CLASHING, dataset)
+    assert new and queue.wait(job, 30)
+    assert job.state == "failed"
+    assert "the electives clash" in job.describe()["error"]
+    assert not cache.contains(job.key)
+
+    retried, new = queue.submit(CLASHING, dataset)
+    assert new and retried is not job
+    queue.wait(retried, 30)
+
+    job, _ = queue.submit(REQUEST, dataset)
+    assert queue.wait(job, 30) and job.state == "done"
+    assert cache.get(job.key) == job.result
+    assert queue.submit(REQUEST, dataset) == (job, False)
+    queue.pool.shutdown()
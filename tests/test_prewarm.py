@@ -0,0 +1,99 @@
+import pytest
+from app.cache import RenderCache, renderKey
+from app.dataset import getDataset
+from app.prewarm import progress, queued, popularity
+from app.prewarm import prewarm, elected, runPrewarm, startPrewarm
+from app.prewarm import recordRequest, prewarmOrder, allRequests
+
+REQUEST = ("CSE", "21", "CI", "2", "CRP", "4")
+OTHER = ("CSE", "20", "CI", "2", "CRP", "4")
+CLASHING = ("CSE", "20", "AI", "2", "CRP", "4")
+
+
+@pytest.fixture(autouse=True)
+def idle():
+    # The pre-warming state of this worker is restored after every test.
+    saved = dict(progress), popularity.copy()
+    popularity.clear()
+    yield
+    progress.update(saved[0])
+    popularity.clear()
+    popularity.update(saved[1])
+    del queued[:]
+
+
+def cached(cache, dataset, *requests):
+    return [cache.contains(renderKey(dataset, *request)) for request in requests]
+
+
+def test_prewarm_renders_the_missing_timetables(tmp_path):
+    dataset, cache = getDataset(), RenderCache(100000, str(tmp_path))
+    cache.put(renderKey(dataset, *OTHER), "other.pdf", b"%PDF other")
+    prewarm(dataset, cache, requests=[REQUEST, OTHER, CLASHING])
+    # The timetable already cached is not rendered again, the clashing one is not rendered at all.
+    assert cached(cache, dataset, REQUEST, OTHER, CLASHING) == [True, True, False]
+    assert cache.get(renderKey(dataset, *OTHER)) == ("other.pdf", b"%PDF other")
+    assert (progress["total"], progress["done"], progress["failed"]) == (1, 1, 0)
+
+
+def test_popular_timetables_are_prewarmed_first():
+    meta_data = getDataset()["meta_data"]
+    for _ in range(3):
+        recordRequest(OTHER)
+    recordRequest(REQUEST)
+    order = prewarmOrder(meta_data)
+    assert order[:2] == [OTHER, REQUEST]
+    # Every timetable is then pre-warmed, once.
+    assert len(order) == len(set(order))
+    assert set(allRequests(meta_data)) <= set(order)
+
+
+def test_one_worker_is_elected(tmp_path):
+    cache = RenderCache(1000, str(tmp_path))
+    with elected(cache) as first:
+        with elected(RenderCache(1000, str(tmp_path))) as second:
+            assert (first, second) == (True, False)
+    with elected(cache) as again:
+        assert again
+    # Without a cache directory, every worker pre-warms its own memory.
+    with elected(RenderCache(1000)) as first, elected(RenderCache(1000)) as second:
+        assert first and second
+
+
+def test_requests_are_queued_during_a_run(tmp_path):
+    dataset, cache = getDataset(), RenderCache(100000, str(tmp_path))
+    progress["state"] = "running"
+    assert not startPrewarm(getDataset, cache, requests=[REQUEST])
+    assert not startPrewarm(getDataset, cache)
+    assert queued == [REQUEST]
+
+    # The run going on renders the queued timetables once it is over.
+    runPrewarm(getDataset, cache, requests=[])
+    assert progress["state"] == "finished"
+    assert queued == []
+    assert cached(cache, dataset, REQUEST) == [True]
+
+
+def test_only_the_elected_worker_prewarms(tmp_path):
+    dataset, cache = getDataset(), RenderCache(100000, str(tmp_path))
+    progress["state"] = "running"
+    queued.append(OTHER)
+    with elected(RenderCache(1000, str(tmp_path))):
+        runPrewarm(getDataset, cache, requests=[REQUEST])
+    assert progress["state"] == "finished"
+    assert queued == []
+    assert cached(cache, dataset, REQUEST, OTHER) == [False, False]
+
+
+def test_prewarm_endpoint(client, admin):
+    assert client.get("/admin/prewarm").status_code == 403
+    forbidden = client.post("/admin/prewarm", headers={"X-Admin-Token": "no"})
+    assert forbidden.status_code == 403
+    response = client.get("/admin/prewarm", headers=admin)
+    assert response.status_code == 200
+    assert set(response.get_json()["progress"]) >= {"state", "total", "done"}
+
+    progress["state"] = "running"
+    response = client.post("/admin/prewarm", headers=admin)
+    assert response.status_code == 409
+    assert response.get_json()["progress"]["state"] == "running"
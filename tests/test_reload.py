@@ -0,0 +1,85 @@
+from conftest import QUERY, SCHEDULE_PATH
+from app.cache import renderKey
+from app.dataset import getDataset, loadDataset, datasetChanges, reloadDataset
+
+REQUEST = ("CSE", "21", "CI", "2", "CRP", "4")
+OTHER = ("CSE", "21", "CI", "2", "CRP", "3")
+OTHER_QUERY = QUERY.replace("_e2_teacher=4", "_e2_teacher=3")
+
+
+def test_reload_is_for_admins(client, admin):
+    assert client.post("/admin/reload").status_code == 403
+    forbidden = client.post("/admin/reload", headers={"X-Admin-Token": "no"})
+    assert forbidden.status_code == 403
+    response = client.post("/admin/reload", headers=admin)
+    assert response.status_code == 200
+    assert response.get_json() == {"changed": False, "version": getDataset()["version"]}
+
+
+def test_reload_only_invalidates_the_changed_timetables(client, admin, teachers):
+    from app.main import render_cache
+
+    older = getDataset()
+    for query in (QUERY, OTHER_QUERY, "format=svg&" + QUERY):
+        assert client.get("/generateTimeTable?" + query).status_code == 200
+    etags = [
+        client.get("/timetable?" + query).headers["ETag"]
+        for query in (QUERY, OTHER_QUERY)
+    ]
+    keys = [renderKey(older, *request) for request in (REQUEST, OTHER)]
+    svg = ("svg",) + keys[0][1:]
+    assert all(render_cache.contains(key) for key in keys + [svg])
+
+    teachers("CRP_CS4", "Dr. New Teacher")
+    response = client.post("/admin/reload", headers=admin)
+    assert response.status_code == 200
+    assert response.get_json()["changed"]
+    newer = getDataset()
+    assert newer["version"] != older["version"]
+    assert datasetChanges(older, newer) == {("teacher", "CRP_CS4")}
+
+    # Only the timetables of the changed teacher are evicted, in every format.
+    assert not render_cache.contains(keys[0]) and not render_cache.contains(svg)
+    assert render_cache.contains(keys[1])
+    assert renderKey(newer, *OTHER) == keys[1]
+    assert renderKey(newer, *REQUEST) != keys[0]
+
+    # The clients holding the unchanged timetable keep it, the others get the new one.
+    unchanged = client.get(
+        "/timetable?" + OTHER_QUERY, headers={"If-None-Match": etags[1]}
+    )
+    assert unchanged.status_code == 304
+    changed = client.get("/timetable?" + QUERY, headers={"If-None-Match": etags[0]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etags[0]
+    assert client.get("/teachers?name=dr.%20new%20teacher").status_code == 200
+
+
+def test_layout_changes_change_every_timetable(tmp_path):
+    dataset = loadDataset()
+    with open(SCHEDULE_PATH) as data:
+        lines = data.read().splitlines()
+    # An added column changes the header every timetable is built from.
+    schedule = tmp_path / "schedule.csv"
+    schedule.write_text("\n".join(line + ",X" for line in lines) + "\n")
+    changed = loadDataset(str(schedule))
+    assert datasetChanges(dataset, changed) is None
+    assert datasetChanges(dataset, loadDataset()) == set()
+
+
+def test_failed_reloads_keep_the_current_dataset(client, admin):
+    with open(SCHEDULE_PATH) as data:
+        original = data.read()
+    version = getDataset()["version"]
+    try:
+        with open(SCHEDULE_PATH, "w") as data:
+            data.write("not,a,schedule\n")
+        response = client.post("/admin/reload", headers=admin)
+        assert response.status_code == 500
+        assert response.get_json()["error"].startswith("reload failed")
+        assert getDataset()["version"] == version
+        assert client.get("/timetable?" + QUERY).status_code == 200
+    finally:
+        with open(SCHEDULE_PATH, "w") as data:
+            data.write(original)
+        reloadDataset()
@@ -0,0 +1,44 @@
+from app.main import app
+
+QUERY = "_branch=%s&_section=%s&_e1_code=%s&_e1_teacher=%s&_e2_code=%s&_e2_teacher=%s"
+UPPER = QUERY % ("CSE", "21", "CI", "2", "CRP", "4")
+LOWER = QUERY % ("cse", "21", "ci", "2", "crp%20", "4")
+
+
+def test_lowercase_request_renders_the_uppercase_timetable():
+    client = app.test_client()
+    # The lowercase request is served first, so that the uppercase one is a cache hit.
+    lower = client.get("/generateTimeTable?format=svg&" + LOWER)
+    upper = client.get("/generateTimeTable?format=svg&" + UPPER)
+    assert lower.status_code == upper.status_code == 200
+    assert b"CRP(DE)" in upper.data
+    assert lower.data == upper.data
+    assert lower.headers["Content-Disposition"] == upper.headers["Content-Disposition"]
+
+
+def test_lowercase_request_returns_the_uppercase_json():
+    client = app.test_client()
+    lower = client.get("/timetable?" + LOWER)
+    upper = client.get("/timetable?" + UPPER)
+    assert lower.status_code == upper.status_code == 200
+    assert lower.get_json() == upper.get_json()
+    assert lower.headers["ETag"] == upper.headers["ETag"]
+
+
+def test_missing_fields_are_rejected():
+    client = app.test_client()
+    response = client.get("/generateTimeTable?_branch=CSE&_section=21")
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("missing fields : _e1_code")
+    response = client.get("/timetable?" + UPPER.replace("_e2_teacher=4", "_e2_teacher="))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "missing fields : _e2_teacher"}
+
+
+def test_unknown_timetables_are_not_found():
+    client = app.test_client()
+    for query in (UPPER.replace("CSE", "XYZ"), UPPER.replace("=21", "=999")):
+        for url in ("/generateTimeTable?", "/timetable?"):
+            response = client.get(url + query)
+            assert response.status_code == 404
+            assert response.get_json() == {"error": "unknown branch, section or elective"}
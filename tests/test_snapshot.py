@@ -0,0 +1,78 @@
+import struct
+from types import MappingProxyType
+
+import pytest
+import app.dataset
+from app.dataset import loadDataset, loadInitialDataset, createTimetable
+from app.snapshot import SnapshotError, SNAPSHOT_MAGIC, writeSnapshot, readSnapshot
+
+REQUEST = ("CSE", "21", ("CI", "2"), ("CRP", "4"))
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "dataset.snapshot")
+    writeSnapshot(path, loadDataset())
+    return path
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    # Records the datasets loaded from the CSV files instead of a snapshot.
+    loaded = []
+
+    def load():
+        loaded.append(1)
+        return {"version": "csv"}
+
+    monkeypatch.setattr(app.dataset, "loadDataset", load)
+    return loaded
+
+
+def test_snapshot_round_trip(snapshot):
+    dataset = loadDataset()
+    header, loaded = readSnapshot(snapshot)
+    assert header["version"] == dataset["version"] == loaded["version"]
+    assert header["rows"] == len(dataset["rows"]) == len(loaded["rows"])
+    assert loaded["header"] == dataset["header"]
+    assert loaded["meta_data"] == dataset["meta_data"]
+    assert loaded["fingerprints"] == dataset["fingerprints"]
+    # The read-only indexes stay read-only.
+    assert type(loaded["index"]) is MappingProxyType
+    assert type(loaded["fingerprints"]["section"]) is MappingProxyType
+    assert createTimetable(*REQUEST, loaded) == createTimetable(*REQUEST, dataset)
+
+
+def test_up_to_date_snapshot_is_loaded(snapshot, loads):
+    dataset = loadInitialDataset(snapshot)
+    assert loads == []
+    assert dataset["version"] == app.dataset.getDataset()["version"]
+    assert createTimetable(*REQUEST, dataset)[0] == "CSE-21 CI_CS-2 CRP_CS-4.pdf"
+
+
+def test_corrupt_snapshots_fall_back_to_the_csv_files(snapshot, loads):
+    with open(snapshot, "rb") as data:
+        contents = data.read()
+    corruptions = [
+        b"not a snapshot at all",
+        SNAPSHOT_MAGIC + b"\x02",
+        SNAPSHOT_MAGIC + struct.pack("<HI", 1, 2) + b"{}",
+        contents[: len(contents) // 2],
+    ]
+    for corrupt in corruptions:
+        with open(snapshot, "wb") as data:
+            data.write(corrupt)
+        with pytest.raises(SnapshotError):
+            readSnapshot(snapshot)
+        assert loadInitialDataset(snapshot) == {"version": "csv"}
+    assert len(loads) == len(corruptions)
+
+    # A missing snapshot is not an error either.
+    assert loadInitialDataset(snapshot + ".missing") == {"version": "csv"}
+
+
+def test_stale_snapshots_are_not_loaded(tmp_path, loads):
+    path = str(tmp_path / "dataset.snapshot")
+    writeSnapshot(path, {"version": "older", "rows": []})
+    assert loadInitialDataset(path) == {"version": "csv"}
+    assert loads == [1]